@@ -2,8 +2,8 @@ from abc import ABC, abstractmethod
 import logging
 import time
 from typing import Dict, Any, Optional
-from model_interface import ModelInterface
-from model_type import ModelType
+from core_abstract.model_interface import ModelInterface
+from core_abstract.model_type import ModelType
 
 class BaseModel(ModelInterface, ABC):
     """所有模型的抽象基类，实现模型的通用属性和方法"""
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from typing import Dict, Any
-from model_type import ModelType
+from core_abstract.model_type import ModelType
 
 class ModelInterface(ABC):
     """模型接口，定义所有模型必须实现的核心方法"""
@@ -0,0 +1,54 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+
+class StartupTimer:
+    """
+    记录各子系统（DeepSeek 客户端、嵌入模型、Qdrant、流水线节点等）的导入与初始化耗时
+    重量级依赖都改为首次使用时才导入/创建，这里的记录可以直接看出一次运行实际加载了哪些子系统
+    """
+
+    def __init__(self):
+        self._records: List[Dict[str, object]] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+
+    @contextmanager
+    def measure(self, subsystem: str, phase: str = "init") -> Iterator[None]:
+        """
+        Args:
+            subsystem: 子系统名称，如 "deepseek"、"embedding"
+            phase: "import"（导入依赖）或 "init"（创建实例、加载模型、建立连接）
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._records.append({
+                    "subsystem": subsystem,
+                    "phase": phase,
+                    "seconds": time.perf_counter() - start,
+                    "at": start - self._origin
+                })
+
+    def records(self) -> List[Dict[str, object]]:
+        with self._lock:
+            return list(self._records)
+
+    def report(self) -> str:
+        """按发生顺序列出每一项耗时"""
+        records = self.records()
+        if not records:
+            return "[启动耗时] 没有加载任何重量级子系统"
+        lines = ["[启动耗时] 子系统 / 阶段 / 耗时"]
+        for r in records:
+            lines.append(f"  {r['subsystem']:<16} {r['phase']:<7} {r['seconds'] * 1000:9.1f} ms")
+        lines.append(f"  {'合计':<16} {'':<7} {sum(r['seconds'] for r in records) * 1000:9.1f} ms")
+        return "\n".join(lines)
+
+
+# 进程级共享实例
+startup_timer = StartupTimer()
@@ -1,7 +1,7 @@
 from abc import ABC, abstractmethod
 import logging
 from typing import Dict, Any, Optional
-from tool_chain_type import ToolChainType
+from core_abstract.tool_chain_type import ToolChainType
 
 
 class ToolChainComponent(ABC):
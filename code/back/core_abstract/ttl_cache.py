@@ -0,0 +1,179 @@
+import heapq
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """粗略估算对象占用的字节数：numpy 数组取 nbytes，容器递归累加（最多 3 层）"""
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(value)
+    if _depth >= 3:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(v, _depth + 1) for v in value)
+    return size
+
+
+class LRUTTLCache:
+    """
+    有界的 LRU + TTL 内存缓存，线程安全
+    - 容量：条目数上限 max_entries 和/或字节数上限 max_bytes，超出时按最近最少使用淘汰（O(1)）
+    - 过期：读取时惰性检查；另外每隔 sweep_interval 秒按过期时间顺序批量清理，
+      即使过期键不再被读取也不会一直占用内存
+    - 统计：命中、未命中、淘汰、过期次数
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = 1024,
+        max_bytes: Optional[int] = None,
+        ttl: Optional[float] = 3600,
+        sweep_interval: float = 60.0,
+        sizeof: Callable[[Any], int] = estimate_size
+    ):
+        """
+        Args:
+            max_entries: 最大条目数，None 表示不限制
+            max_bytes: 最大字节数（由 sizeof 估算），None 表示不限制
+            ttl: 默认过期时间（秒），None 表示永不过期
+            sweep_interval: 定期清理过期条目的间隔（秒）
+            sizeof: 估算值大小的函数，只在设置了 max_bytes 时使用
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._sizeof = sizeof
+
+        # key -> (value, 过期时间, 大小)；OrderedDict 的顺序即 LRU 顺序，末尾为最近使用
+        self._data: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        # 过期时间小顶堆 (过期时间, 序号, key)；键被覆盖或删除后留下的旧记录在清理时跳过
+        self._expiry: List[Tuple[float, int, Hashable]] = []
+        self._seq = 0
+        self._bytes = 0
+        self._last_sweep = time.monotonic()
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _count=False) is not None
+
+    def get(self, key: Hashable, default: Any = None, _count: bool = True) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            self._maybe_sweep(now)
+            entry = self._data.get(key)
+            if entry is None:
+                if _count:
+                    self._stats["misses"] += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at <= now:
+                self._remove(key)
+                self._stats["expirations"] += 1
+                if _count:
+                    self._stats["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            if _count:
+                self._stats["hits"] += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存，ttl 为 None 时使用默认过期时间"""
+        now = time.monotonic()
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = now + ttl if ttl is not None else float("inf")
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            self._maybe_sweep(now)
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            if expires_at != float("inf"):
+                self._seq += 1
+                heapq.heappush(self._expiry, (expires_at, self._seq, key))
+            self._evict()
+            self._compact()
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._remove(key)
+            return entry[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._expiry.clear()
+            self._bytes = 0
+
+    def sweep(self) -> int:
+        """立即清理所有已过期条目，返回清理数量"""
+        with self._lock:
+            return self._sweep(time.monotonic())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl
+            }
+
+    # ---- 内部方法（调用方持有锁） ----
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def _evict(self) -> None:
+        while self._data and (
+            (self.max_entries is not None and len(self._data) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            key, (_, _, size) = self._data.popitem(last=False)
+            self._bytes -= size
+            self._stats["evictions"] += 1
+
+    def _maybe_sweep(self, now: float) -> None:
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(now)
+
+    def _sweep(self, now: float) -> int:
+        self._last_sweep = now
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            expires_at, _, key = heapq.heappop(self._expiry)
+            entry = self._data.get(key)
+            # 只删除过期时间与堆记录一致的条目，被重新写入的键保留
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+                self._stats["expirations"] += 1
+                removed += 1
+        return removed
+
+    def _compact(self) -> None:
+        """覆盖写入、淘汰留下的旧堆记录过多时重建堆，避免堆无限增长（均摊 O(1)）"""
+        if len(self._expiry) > 2 * len(self._data) + 64:
+            self._expiry = [(e, i, k) for i, (k, (_, e, _)) in enumerate(self._data.items()) if e != float("inf")]
+            heapq.heapify(self._expiry)
+            self._seq = len(self._expiry)
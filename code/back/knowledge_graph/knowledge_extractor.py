@@ -1,5 +1,4 @@
 from typing import Dict, Any, List, Optional, Set
-from tool_chain.knowledge_graph_component import KnowledgeGraphComponent
 
 
 class KnowledgeExtractor:
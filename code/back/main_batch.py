@@ -0,0 +1,60 @@
+import argparse
+import asyncio
+import csv
+import os
+from core_abstract.startup_timer import startup_timer
+from risk_graph import risk_graph
+
+
+def run_batch(file_path: str, output_path: str, max_concurrency: int, use_async: bool = False,
+              batch_size: int = 1000):
+    graph = risk_graph()
+
+    # --- 1. 流式读取并按行并发评分，结果逐条写出 ---
+    print(f"正在批量评分: {file_path}（并发上限 {max_concurrency}，{'异步' if use_async else '线程池'}模式）")
+    with open(output_path, mode="w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["姓名", "身份证号", "risk", "report", "error"])
+
+        def write(r):
+            row = r["data"][0] if r["data"] else {}
+            writer.writerow([row.get("姓名", ""), row.get("身份证号", ""), r["risk"], r["report"], r["error"]])
+            return bool(r["error"])
+
+        if use_async:
+            async def consume():
+                total = failed = 0
+                async for r in graph.aiter_score_file(file_path, max_concurrency=max_concurrency,
+                                                      batch_size=batch_size):
+                    total += 1
+                    failed += write(r)
+                return total, failed
+            total, failed = asyncio.run(consume())
+        else:
+            total = failed = 0
+            for r in graph.iter_score_file(file_path, max_concurrency=max_concurrency, batch_size=batch_size):
+                total += 1
+                failed += write(r)
+
+    # --- 2. 汇总输出 ---
+    print("\n" + "="*30 + " 批量评分结果 " + "="*30)
+    print(f"共 {total} 人，成功 {total - failed} 人，失败 {failed} 人")
+    print(f"结果已写入: {output_path}")
+    print("="*74)
+
+
+if __name__ == "__main__":
+    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="背债人批量评分")
+    parser.add_argument("file", nargs="?", default=os.path.join(BASE_DIR, "2.csv"), help="申请人 CSV 文件")
+    parser.add_argument("-o", "--output", default=os.path.join(BASE_DIR, "batch_result.csv"), help="结果输出路径")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="最大并发数")
+    parser.add_argument("-b", "--batch-size", type=int, default=1000, help="每批读取的行数")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="使用 asyncio 单线程执行（适合高并发）")
+    parser.add_argument("--timing", action="store_true", help="结束时输出各子系统的导入/初始化耗时")
+    args = parser.parse_args()
+
+    run_batch(args.file, args.output, args.concurrency, args.use_async, args.batch_size)
+    if args.timing:
+        print(startup_timer.report())
+
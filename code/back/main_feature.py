@@ -1,61 +1,49 @@
-import pandas as pd
+import argparse
+import json
 import os
-from tool_chain.state import State
 from tool_chain.feature_mining import feature_mining
+from tool_chain.applicant_store import ApplicantStore
+from core_abstract.startup_timer import startup_timer
 
-def run_analysis(file_path: str):
+def run_analysis(file_path: str, max_concurrency: int = 8, max_tokens: int = None):
     # --- 1. 读取 CSV 数据 ---
     try:
-        # 只读取前 n 条，dtype=str 避免长数字被截断
-        df = pd.read_csv(
-            file_path,
-            nrows=50,
-            dtype=str,
-            encoding="gbk"
-        )
-        
-        # 将空值填充为空字符串，防止 LLM 处理时报错
-        df = df.fillna("")
-        
-        # 转换为 List[Dict] 格式
-        # 结果示例: [{"姓名": "张三", "身份证号": "..."}, {...}]
-        user_records = df.to_dict(orient='records')
-        
+        # 首次运行时转换为列式存储，之后内存映射读取，长数字按字符串保存不会被截断
+        # 按批流式产出 Dict，空值为空字符串，全量数据无需一次性载入内存
+        store = ApplicantStore()
+        store.ensure(file_path)
+        user_records = (record for batch in store.iter_records(file_path) for record in batch)
+
     except Exception as e:
         print(f"读取 CSV 文件失败: {e}")
         return
 
-    # --- 2. 初始化 State ---
-    # 按照你定义的 State 结构进行完整初始化
-    state: State = {
-        "data": user_records,
-        "text": "",
-        "new_feature": "",
-        "new_rule": "",
-        "feature": "",
-        "feature_matching": "",
-        "rule": "",
-        "rule_matching": "",
-        "report": "",
-        "risk": "",
-        "response": ""
-    }
+    # --- 2. 分片并发挖掘，再合并去重 ---
+    print(f"正在分片挖掘全部用户数据（并发上限 {max_concurrency}），寻找隐藏的‘背债人’特征...")
 
-    # --- 3. 调用大模型分析节点 ---
-    print(f"正在分析 {len(state['data'])} 条用户数据，寻找隐藏的‘背债人’特征...")
-    
     miner = feature_mining()
-    final_state = miner.mine_features(state)
-    # --- 5. 输出挖掘出的新特征 ---
+    result = miner.mine_features_sharded(user_records, max_concurrency=max_concurrency, max_tokens=max_tokens)
+
+    # --- 3. 输出挖掘出的新特征 ---
     print("\n" + "="*30 + " 挖掘结果 " + "="*30)
-    if final_state["new_feature"]:
-        print(final_state["new_feature"])
+    print(f"共 {result['rows']} 名用户，{result['shards']} 个分片，失败 {result['failed_shards']} 个")
+    if result["mined_features"]:
+        print(json.dumps({"mined_features": result["mined_features"]}, ensure_ascii=False, indent=2))
     else:
         print("未发现显著新特征或模型未返回结果。")
     print("="*68)
 
 if __name__ == "__main__":
-    # 指定你的文件名 1.csv
+    # 默认分析 1.csv
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    csv_path = os.path.join(BASE_DIR, "1.csv")
-    run_analysis(csv_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="背债人特征挖掘（分片 map-reduce）")
+    parser.add_argument("file", nargs="?", default=os.path.join(BASE_DIR, "1.csv"), help="用户 CSV 文件")
+    parser.add_argument("-c", "--concurrency", type=int, default=8, help="最大并发分片数")
+    parser.add_argument("-t", "--max-tokens", type=int, default=None,
+                        help=f"单个分片提示词的 token 上限，默认 {feature_mining.SHARD_MAX_TOKENS}")
+    parser.add_argument("--timing", action="store_true", help="结束时输出各子系统的导入/初始化耗时")
+    args = parser.parse_args()
+
+    run_analysis(args.file, args.concurrency, args.max_tokens)
+    if args.timing:
+        print(startup_timer.report())
@@ -1,25 +1,31 @@
-import pandas as pd
+import argparse
+import json
 import os
+import re
 from tool_chain.state import State
 from tool_chain.rule_mining import rule_mining  # 确保你的类名和文件名正确
+from tool_chain.applicant_store import ApplicantStore
+from tool_chain.association_miner import AssociationMiner
 
-def run_analysis(file_path: str):
+
+def print_metrics(rules):
+    """打印规则在全量数据上的支持度/置信度/提升度"""
+    for r in rules:
+        if r.get("error"):
+            print(f"- [{r.get('rule_name')}] 无法验证：{r['error']}")
+            continue
+        confidence = "-" if r["confidence"] is None else f"{r['confidence']:.2%}"
+        lift = "-" if r["lift"] is None else f"{r['lift']:.2f}"
+        print(f"- [{r.get('rule_name')}] 支持度 {r['support']:.2%}（{r['count']} 人） | "
+              f"置信度 {confidence} | 提升度 {lift} | {r['logic_expression']}")
+
+
+def run_analysis(file_path: str, label_column: str = None):
     # --- 1. 读取 CSV 数据 ---
     try:
-        # 只读取前 n 条，dtype=str 避免长数字被截断
-        df = pd.read_csv(
-            file_path,
-            nrows=50,
-            dtype=str,
-            encoding="gbk"
-        )
-        
-        # 将空值填充为空字符串，防止 LLM 处理时报错
-        df = df.fillna("")
-        
-        # 转换为 List[Dict] 格式
-        # 结果示例: [{"姓名": "张三", "身份证号": "..."}, {...}]
-        user_records = df.to_dict(orient='records')
+        # 只读取前 n 条；首次运行时转换为列式存储，之后内存映射读取，长数字按字符串保存不会被截断
+        # 结果示例: [{"姓名": "张三", "身份证号": "..."}, {...}]，空值为空字符串
+        user_records = ApplicantStore().load_records(file_path, nrows=50)
         
     except Exception as e:
         print(f"读取 CSV 文件失败: {e}")
@@ -55,9 +61,59 @@ def run_analysis(file_path: str):
         print("未发现显著新特征或模型未返回结果。")
     print("="*68)
 
+    # --- 5. 在全量数据上复核大模型提出的规则 ---
+    match = re.search(r"\{.*\}", final_state["new_rule"] or "", re.S)
+    try:
+        rules = json.loads(match.group(0)).get("rules", []) if match else []
+    except json.JSONDecodeError:
+        rules = []
+    if rules:
+        miner = AssociationMiner(ApplicantStore().load_frame(file_path), label_column=label_column)
+        print("\n" + "="*30 + " 全量数据复核 " + "="*30)
+        print_metrics(miner.verify(rules))
+        print("="*74)
+
+
+def run_mining(file_path: str, label_column: str = None, min_support: float = 0.1,
+               min_confidence: float = 0.6, min_lift: float = 1.2, max_len: int = 3):
+    """不调用大模型：在全量数据上挖掘关联规则，并复核 rule.json 中的现有规则；只有提供标签列时才输出 rule.json 格式的规则"""
+    df = ApplicantStore().load_frame(file_path)
+    miner = AssociationMiner(df, label_column=label_column)
+    rules = miner.mine(min_support=min_support, min_confidence=min_confidence, min_lift=min_lift, max_len=max_len)
+
+    print("\n" + "="*30 + " 挖掘结果 " + "="*30)
+    if miner.labeled:
+        print(f"共 {len(df)} 条用户数据，挖掘出 {len(rules)} 条规则")
+        print(json.dumps({"rules": rules}, ensure_ascii=False, indent=2))
+    else:
+        # 没有标签列时只能得到字段共现模式，无法据此判定背债人，不输出 rule.json 格式
+        print(f"共 {len(df)} 条用户数据，未指定标签列（--label），以下 {len(rules)} 条仅为字段共现模式，"
+              f"需人工复核后才能整理为规则")
+        print_metrics(rules)
+    print("="*68)
+
+    rule_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_strategies", "rule.json")
+    with open(rule_file, "r", encoding="utf-8") as f:
+        existing = json.load(f).get("rules", [])
+    print("\n" + "="*30 + " rule.json 复核 " + "="*30)
+    print_metrics(miner.verify(existing))
+    print("="*74)
+
 
 if __name__ == "__main__":
-    # 指定你的文件名 1.csv
+    # 默认分析 1.csv
     BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    csv_path = os.path.join(BASE_DIR, "1.csv")
-    run_analysis(csv_path)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="背债人规则挖掘")
+    parser.add_argument("file", nargs="?", default=os.path.join(BASE_DIR, "1.csv"), help="用户 CSV 文件")
+    parser.add_argument("--data-driven", action="store_true", help="不调用大模型，用关联规则算法在全量数据上挖掘")
+    parser.add_argument("--label", default=None, help="标签列（1/是 表示背债人），用于计算置信度与提升度")
+    parser.add_argument("--min-support", type=float, default=0.1, help="最小支持度")
+    parser.add_argument("--min-confidence", type=float, default=0.6, help="最小置信度")
+    parser.add_argument("--min-lift", type=float, default=1.2, help="最小提升度")
+    parser.add_argument("--max-len", type=int, default=3, help="规则最多包含的条件数")
+    args = parser.parse_args()
+
+    if args.data_driven:
+        run_mining(args.file, args.label, args.min_support, args.min_confidence, args.min_lift, args.max_len)
+    else:
+        run_analysis(args.file, args.label)
\ No newline at end of file
@@ -1,6 +1,207 @@
-from langchain_deepseek import ChatDeepSeek
 from dotenv import load_dotenv
+from typing import TYPE_CHECKING, Any, Dict, List, Set, Tuple
+import asyncio
 import os
+import threading
+import weakref
+from core_abstract.startup_timer import startup_timer
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_deepseek import ChatDeepSeek
+
+
+class DeepSeekClientRegistry:
+    """
+    进程级 DeepSeek 客户端注册表
+    同一组模型参数只创建一个 ChatDeepSeek，所有节点共享其 HTTP 连接池，
+    避免重复 load_dotenv、重复建连与 TLS 握手
+
+    连接池参数可通过环境变量调整：
+        DEEPSEEK_MAX_CONCURRENCY: 最大并发连接数（即并发请求上限），默认 32
+        DEEPSEEK_KEEPALIVE_EXPIRY: 空闲连接保活时间（秒），默认 60
+        DEEPSEEK_TIMEOUT: 单次请求超时（秒），默认 120
+    响应缓存默认挂载 llm_cache.get_llm_cache() 返回的持久化缓存，可通过 LLM_CACHE_ENABLED=0 关闭
+    langchain_deepseek（连带 openai SDK）导入较慢，推迟到第一次创建客户端时才导入
+    httpx.AsyncClient 只能在创建它的事件循环中使用，事件循环内获取的是按循环单独创建的实例；
+    异步批量评分结束前（事件循环退出前）应 await aclear() 关闭该循环的异步连接池
+    """
+
+    _lock = threading.Lock()
+    # 事件循环之外使用的实例：key -> ChatDeepSeek，及其 (同步, 异步) HTTP 客户端
+    _clients: Dict[Tuple, "ChatDeepSeek"] = {}
+    _http_clients: Dict[Tuple, Tuple["httpx.Client", "httpx.AsyncClient"]] = {}
+    # httpx.AsyncClient 绑定首次使用它的事件循环，事件循环内按循环分别创建实例（共享同步连接池）：
+    # loop -> {key: (ChatDeepSeek, AsyncClient)}，循环被回收后条目随之消失
+    _loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple, Tuple]]" = \
+        weakref.WeakKeyDictionary()
+    # 在运行中的事件循环里 clear 时，异步客户端的关闭任务在此保留引用直到完成
+    _closing: Set["asyncio.Task"] = set()
+    _env_loaded = False
+
+    @classmethod
+    def _load_env(cls) -> None:
+        """只在进程内加载一次 .env"""
+        if not cls._env_loaded:
+            load_dotenv()
+            cls._env_loaded = True
+
+    @classmethod
+    def max_concurrency(cls) -> int:
+        """连接池并发上限，批量评分的默认并发数应不超过该值"""
+        cls._load_env()
+        return int(os.getenv("DEEPSEEK_MAX_CONCURRENCY", "32"))
+
+    @classmethod
+    def _http_options(cls) -> Dict[str, Any]:
+        """同步/异步 HTTP 客户端共用的连接池与超时配置"""
+        import httpx
+
+        max_conn = cls.max_concurrency()
+        limits = httpx.Limits(
+            max_connections=max_conn,
+            max_keepalive_connections=max_conn,
+            keepalive_expiry=float(os.getenv("DEEPSEEK_KEEPALIVE_EXPIRY", "60")),
+        )
+        # pool=None：连接池占满时排队等待空闲连接，而不是直接报错，从而形成并发上限
+        timeout = httpx.Timeout(float(os.getenv("DEEPSEEK_TIMEOUT", "120")), pool=None)
+        return {"limits": limits, "timeout": timeout}
+
+    @classmethod
+    def _build_http_clients(cls) -> Tuple["httpx.Client", "httpx.AsyncClient"]:
+        """创建共享的同步/异步 HTTP 客户端（长连接池）"""
+        import httpx
+        return httpx.Client(**cls._http_options()), cls._build_async_client()
+
+    @classmethod
+    def _build_async_client(cls) -> "httpx.AsyncClient":
+        import httpx
+        return httpx.AsyncClient(**cls._http_options())
+
+    @classmethod
+    def _create(cls, model: str, kwargs: Dict[str, Any], http_client: "httpx.Client",
+                http_async_client: "httpx.AsyncClient") -> "ChatDeepSeek":
+        cls._load_env()
+        api_key = os.getenv('DEEPSEEK_KEY')
+        base_url = os.getenv('DEEPSEEK_URL')
+        if not api_key:
+            raise ValueError("环境变量 DEEPSEEK_KEY 未配置，请检查 .env 文件")
+        if not base_url:
+            raise ValueError("环境变量 DEEPSEEK_URL 未配置，请检查 .env 文件")
+
+        with startup_timer.measure("deepseek", "import"):
+            from langchain_deepseek import ChatDeepSeek
+            from model_components.llm_cache import get_llm_cache
+        with startup_timer.measure("deepseek", "init"):
+            kwargs = dict(kwargs)
+            kwargs.setdefault("cache", get_llm_cache())
+            return ChatDeepSeek(
+                model=model,
+                base_url=base_url,
+                api_key=api_key,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **kwargs
+            )
+
+    @classmethod
+    def get(cls, model: str = "deepseek-chat", **kwargs) -> "ChatDeepSeek":
+        """
+        获取（必要时创建）共享的 ChatDeepSeek 实例
+        在事件循环中调用时返回绑定当前循环的实例，多次 asyncio.run 之间不会复用已关闭循环上的异步连接
+        """
+        key = (model, tuple(sorted(kwargs.items())))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None:
+            client = cls._clients.get(key)
+            if client is not None:
+                return client
+            with cls._lock:
+                cls._shared_http_client(model, kwargs, key)
+                return cls._clients[key]
+
+        entry = cls._loop_clients.get(loop, {}).get(key)
+        if entry is not None:
+            return entry[0]
+        # 同步连接池与事件循环无关，各循环的实例共享循环外实例的同步客户端
+        with cls._lock:
+            per_loop = cls._loop_clients.setdefault(loop, {})
+            if key not in per_loop:
+                http_client = cls._shared_http_client(model, kwargs, key)
+                http_async_client = cls._build_async_client()
+                per_loop[key] = (cls._create(model, kwargs, http_client, http_async_client), http_async_client)
+            return per_loop[key][0]
+
+    @classmethod
+    def _shared_http_client(cls, model: str, kwargs: Dict[str, Any], key: Tuple) -> "httpx.Client":
+        """取（必要时创建）循环外实例的同步客户端；调用方持有 _lock"""
+        if key not in cls._clients:
+            http_client, http_async_client = cls._build_http_clients()
+            cls._clients[key] = cls._create(model, kwargs, http_client, http_async_client)
+            cls._http_clients[key] = (http_client, http_async_client)
+        return cls._http_clients[key][0]
+
+    @classmethod
+    def _detach(cls) -> List["httpx.AsyncClient"]:
+        """
+        清空注册表并关闭同步客户端，返回可在当前上下文关闭的异步客户端：
+        循环外实例的异步客户端（不会在事件循环中发起请求，未绑定循环）以及当前事件循环的异步客户端；
+        其他事件循环上的异步客户端不能跨循环关闭，只从注册表中移除
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        with cls._lock:
+            http_clients = list(cls._http_clients.values())
+            current = [c for _, c in cls._loop_clients.get(loop, {}).values()] if loop is not None else []
+            cls._http_clients.clear()
+            cls._clients.clear()
+            cls._loop_clients.clear()
+        for http_client, _ in http_clients:
+            http_client.close()
+        return [async_client for _, async_client in http_clients] + current
+
+    @staticmethod
+    async def _aclose_all(async_clients: List["httpx.AsyncClient"]) -> None:
+        await asyncio.gather(*(c.aclose() for c in async_clients), return_exceptions=True)
+
+    @classmethod
+    def clear(cls) -> None:
+        """
+        关闭并清空所有共享客户端（同步与异步连接池）
+        在事件循环中调用时异步客户端的关闭被调度到当前循环，需要等待关闭完成请使用 aclear；
+        其他（已结束的）事件循环上的异步客户端无法再关闭，只是从注册表中移除
+        """
+        async_clients = cls._detach()
+        if not async_clients:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            asyncio.run(cls._aclose_all(async_clients))
+            return
+        task = loop.create_task(cls._aclose_all(async_clients))
+        cls._closing.add(task)
+        task.add_done_callback(cls._closing.discard)
+
+    @classmethod
+    async def aclear(cls) -> None:
+        """
+        在事件循环中关闭并清空所有共享客户端，等待异步连接池关闭完成
+        异步连接池绑定创建它的事件循环，须在该循环结束前（如 asyncio.run 的主协程返回前）调用，
+        否则该循环上的连接只能随循环一起被回收
+        """
+        await cls._aclose_all(cls._detach())
+
+
+def get_deepseek_llm(model: str = "deepseek-chat", **kwargs) -> "ChatDeepSeek":
+    """获取进程内共享的 DeepSeek 客户端，各工具链节点应通过此函数获取 llm"""
+    return DeepSeekClientRegistry.get(model, **kwargs)
 
 
 class DeepSeekLLM:
@@ -8,30 +209,18 @@ class DeepSeekLLM:
     DeepSeek 大模型客户端封装类
     用于便捷地初始化和调用 DeepSeek 模型
     """
-    
+
     def __init__(self):
-        """初始化方法：加载环境变量并创建 ChatDeepSeek 实例"""
-        # 加载 .env 文件中的环境变量
-        load_dotenv()
-        
-        # 获取环境变量，并做非空校验
+        """初始化方法：加载环境变量并获取共享的 ChatDeepSeek 实例"""
+        DeepSeekClientRegistry._load_env()
+
+        # 获取环境变量
         self.DEEPSEEK_KEY = os.getenv('DEEPSEEK_KEY')
-        self.DEEPSEEK_URL = os.getenv('DEEPSEEK_URL')    
-        
-        if not self.DEEPSEEK_KEY:
-            raise ValueError("环境变量 DEEPSEEK_KEY 未配置，请检查 .env 文件")
-        if not self.DEEPSEEK_URL:
-            raise ValueError("环境变量 DEEPSEEK_URL 未配置，请检查 .env 文件")
-        
-        # 初始化 DeepSeek 客户端
+        self.DEEPSEEK_URL = os.getenv('DEEPSEEK_URL')
+
+        # 初始化 DeepSeek 客户端（进程内共享，非空校验在注册表中完成）
         self.llm = self._init_llm()
-    
+
     def _init_llm(self):
-        """私有方法：创建并返回 ChatDeepSeek 实例"""
-        return ChatDeepSeek(
-            model="deepseek-chat",
-            base_url=self.DEEPSEEK_URL,
-            api_key=self.DEEPSEEK_KEY,
-            # 可根据需要添加其他参数，比如温度、最大令牌数等
-        )
-    
\ No newline at end of file
+        """私有方法：返回共享的 ChatDeepSeek 实例"""
+        return get_deepseek_llm()
@@ -1,14 +1,33 @@
-from typing import Dict, Any, Optional, Union, List
+from typing import Dict, Any, Callable, Optional, Union, List
+import hashlib
+import os
 import numpy as np
 import threading
 from core_abstract.base_model import BaseModel
+from core_abstract.ttl_cache import LRUTTLCache
 from core_abstract.model_type import ModelType
-from tool_chain.knowledge_graph_component import KnowledgeGraphComponent
+from model_components.embedding_store import EmbeddingStore
+
+# 编码函数：输入一批文本，输出同样条数的向量
+Encoder = Callable[[List[str]], Any]
 
 
 class EmbeddingModel(BaseModel):
-    """嵌入模型封装，支持文本到向量的转换"""
+    """
+    嵌入模型封装，支持文本到向量的转换
+    两级缓存：进程内 LRU（float32）+ 磁盘向量库（float16，按文本哈希索引，重启后仍有效；多进程共享时追加持文件锁），
+    一次调用内先去重，只有两级缓存都未命中的文本才按 batch_size 分批送入模型
+    """
     def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: 除通用模型配置外，包含以下键：
+                - embedding_dim / normalize / batch_size: 向量维度、是否 L2 归一化、单批编码条数
+                - cache_enabled / cache_ttl / cache_max_entries / cache_max_bytes: 内存缓存配置
+                - store_path: 磁盘向量库目录，默认 code/back/.cache/embeddings/<模型名哈希>，为 None 时不落盘
+                - encoder: 文档编码函数，不提供时 load() 用 sentence-transformers 加载 model_path
+                - query_encoder: 查询编码函数（如带检索指令的模型），默认同 encoder
+        """
         super().__init__(config)
         self._model_type = ModelType.EMBEDDING  # 指定模型类型
         # 从配置初始化属性
@@ -17,30 +36,117 @@ class EmbeddingModel(BaseModel):
         self.batch_size = config.get("batch_size", 32)
         self.cache_enabled = config.get("cache_enabled", True)
         self.cache_ttl = config.get("cache_ttl", 3600)
-        
+        self.model_path = config.get("model_path", self._model_name)
+        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        model_id = hashlib.md5(self._model_name.encode("utf-8")).hexdigest()[:12]
+        self.store_path = config.get("store_path", os.path.join(base_dir, ".cache", "embeddings", model_id))
+        self._encoders: Dict[str, Optional[Encoder]] = {
+            "text": config.get("encoder"),
+            "query": config.get("query_encoder") or config.get("encoder"),
+        }
+
         # 缓存相关私有属性
-        self._cache: Dict[str, np.ndarray] = {}
-        self._cache_times: Dict[str, float] = {}
+        self._cache = LRUTTLCache(
+            max_entries=config.get("cache_max_entries", 1024),
+            max_bytes=config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
+        self._store: Optional[EmbeddingStore] = None
         self._lock = threading.Lock()
+        self._encoded_count = 0
+
+    def embed(self, text: Union[str, List[str]], kind: str = "text") -> np.ndarray:
+        """
+        生成文本嵌入
+        Args:
+            text: 单条文本或文本列表
+            kind: "text"（文档）或 "query"（查询），两者缓存互不混用
+        Returns:
+            单条文本返回 (dim,) 向量，列表返回 (n, dim) 矩阵，行顺序与输入一致
+        """
+        single = isinstance(text, str)
+        texts = [text] if single else list(text)
+        unique = list(dict.fromkeys(texts))
+        keys = [self._get_cache_key(t, kind) for t in unique]
+        vectors: Dict[bytes, np.ndarray] = {}
+
+        # 1. 内存缓存
+        pending = []
+        for key, t in zip(keys, unique):
+            cached = self._get_cached_embedding(key) if self.cache_enabled else None
+            if cached is not None:
+                vectors[key] = cached
+            else:
+                pending.append((key, t))
+
+        # 2. 磁盘向量库
+        store = self._get_store() if self.cache_enabled else None
+        if pending and store is not None:
+            found, hits = store.get_many([key for key, _ in pending])
+            for (key, _), vector in zip((p for p, f in zip(pending, found) if f), hits):
+                vectors[key] = vector
+                self._set_cached_embedding(key, vector)
+            pending = [p for p, f in zip(pending, found) if not f]
+
+        # 3. 只对未命中的文本分批编码
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            encoded = self._encode([t for _, t in batch], kind)
+            batch_keys = [key for key, _ in batch]
+            if store is not None:
+                store.put_many(batch_keys, encoded)
+            for key, vector in zip(batch_keys, encoded):
+                vectors[key] = vector
+                if self.cache_enabled:
+                    self._set_cached_embedding(key, vector)
+
+        if not texts:
+            return np.zeros((0, self.embedding_dim), dtype=np.float32)
+        key_of = dict(zip(unique, keys))
+        result = np.stack([vectors[key_of[t]] for t in texts])
+        return result[0] if single else result
+
+    def _encode(self, texts: List[str], kind: str) -> np.ndarray:
+        """调用模型编码一批文本；结果按 float16 取整，保证与磁盘缓存读出的向量一致"""
+        if not self._is_loaded:
+            self.load()
+        encoder = self._encoders.get(kind) or self._encoders["text"]
+        vectors = np.asarray(encoder(texts), dtype=np.float32)
+        if vectors.shape != (len(texts), self.embedding_dim):
+            raise ValueError(f"编码结果形状 {vectors.shape} 与预期 ({len(texts)}, {self.embedding_dim}) 不一致")
+        if self.normalize:
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            vectors = vectors / np.where(norms == 0, 1.0, norms)
+        self._encoded_count += len(texts)
+        return vectors.astype(np.float16).astype(np.float32)
 
-    def embed(self, text: Union[str, List[str]]) -> np.ndarray:
-        """生成文本嵌入（具体实现后续补充）"""
-        pass
+    def _get_store(self) -> Optional[EmbeddingStore]:
+        if self._store is None and self.store_path:
+            with self._lock:
+                if self._store is None:
+                    self._store = EmbeddingStore(self.store_path, self.embedding_dim, self._model_name)
+        return self._store
 
-    def _get_cache_key(self, text: str) -> str:
-        """生成缓存键（具体实现后续补充）"""
-        pass
+    def _get_cache_key(self, text: str, kind: str = "text") -> bytes:
+        """生成缓存键：类型 + 文本的哈希（磁盘库按模型分目录，键中无需包含模型名）"""
+        return EmbeddingStore.hash_text(f"{kind}\0{text}")
 
-    def _get_cached_embedding(self, cache_key: str) -> Optional[np.ndarray]:
-        """获取缓存的嵌入（具体实现后续补充）"""
-        pass
+    def _get_cached_embedding(self, cache_key: bytes) -> Optional[np.ndarray]:
+        """获取内存缓存中的嵌入"""
+        return self._cache.get(cache_key)
 
-    def _set_cached_embedding(self, cache_key: str, embedding: np.ndarray) -> None:
-        """设置缓存的嵌入（具体实现后续补充）"""
-        pass
+    def _set_cached_embedding(self, cache_key: bytes, embedding: np.ndarray) -> None:
+        """设置内存缓存中的嵌入"""
+        self._cache.set(cache_key, embedding)
 
     # 实现父类抽象方法
     def load(self) -> None:
+        """未提供 encoder 时按 model_path 加载 sentence-transformers 模型"""
+        if self._encoders["text"] is None:
+            from sentence_transformers import SentenceTransformer
+            model = SentenceTransformer(self.model_path, trust_remote_code=True)
+            encoder = lambda texts: model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True)
+            self._encoders = {"text": encoder, "query": self._encoders["query"] or encoder}
         self._is_loaded = True
 
     def unload(self) -> None:
@@ -54,5 +160,8 @@ class EmbeddingModel(BaseModel):
             "model_name": self._model_name,
             "model_type": self._model_type.value,
             "embedding_dim": self.embedding_dim,
-            "version": self._model_version
-        }
\ No newline at end of file
+            "version": self._model_version,
+            "encoded_count": self._encoded_count,
+            "store_size": len(self._store) if self._store is not None else 0,
+            "cache_stats": self._cache.stats()
+        }
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows：没有 fcntl，只保证进程内安全
+    fcntl = None
+
+
+class EmbeddingStore:
+    """
+    按文本哈希索引的磁盘向量库（只追加）
+    - vectors.f16：float16 向量矩阵，np.memmap 映射，容量不足时按倍数扩容
+    - keys.bin：每行 16 字节的 blake2b 文本哈希，与向量行一一对应
+    先写向量再追加哈希，进程中途退出时未写完哈希的行会在下次打开时被忽略
+    多进程共享同一目录时，追加在 store.lock 文件锁（fcntl）内进行：先读入其他进程新追加的哈希，
+    再在文件末尾之后写入，保证各进程的行号不冲突；读取发现未命中时也会补读其他进程追加的哈希
+    没有 fcntl 的平台（Windows）只保证进程内线程安全，不应让多个进程同时写同一目录
+    """
+
+    KEY_SIZE = 16
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, path: str, dim: int, model_name: str = ""):
+        """
+        Args:
+            path: 存储目录
+            dim: 向量维度
+            model_name: 生成向量的模型名，与目录中记录的不一致时拒绝打开，避免混用不同模型的向量
+        """
+        self.path = path
+        self.dim = dim
+        self.model_name = model_name
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("dim") != dim or meta.get("model_name") != model_name:
+                raise ValueError(
+                    f"向量库 {path} 由 {meta.get('model_name')}（{meta.get('dim')} 维）生成，"
+                    f"与当前 {model_name}（{dim} 维）不一致"
+                )
+        else:
+            with open(meta_path, "w", encoding="utf-8") as f:
+                json.dump({"dim": dim, "model_name": model_name}, f, ensure_ascii=False)
+
+        self._keys_path = os.path.join(path, "keys.bin")
+        self._vectors_path = os.path.join(path, "vectors.f16")
+        self._lock_path = os.path.join(path, "store.lock")
+        self._count = 0
+        self._rows: Dict[bytes, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        with self._lock, self._file_lock():
+            if os.path.exists(self._keys_path):
+                size = os.path.getsize(self._keys_path)
+                if size % self.KEY_SIZE:
+                    # 上次写入哈希时中断，截掉不完整的尾部，保证后续追加按行对齐（持有文件锁，不会截到其他进程正在写的行）
+                    with open(self._keys_path, "r+b") as f:
+                        f.truncate(size - size % self.KEY_SIZE)
+            self._reload_keys()
+            self._open_vectors(max(self._count, self.INITIAL_CAPACITY))
+
+    @staticmethod
+    def hash_text(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=EmbeddingStore.KEY_SIZE).digest()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._rows
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """跨进程互斥（fcntl.flock），没有 fcntl 时为空操作"""
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a+b") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _reload_keys(self) -> None:
+        """读入 keys.bin 中本进程尚未见过的完整行（其他进程追加的哈希），调用方持有 self._lock"""
+        size = os.path.getsize(self._keys_path) if os.path.exists(self._keys_path) else 0
+        total = size // self.KEY_SIZE
+        if total <= self._count:
+            return
+        with open(self._keys_path, "rb") as f:
+            f.seek(self._count * self.KEY_SIZE)
+            tail = f.read((total - self._count) * self.KEY_SIZE)
+        for i in range(len(tail) // self.KEY_SIZE):
+            self._rows.setdefault(tail[i * self.KEY_SIZE:(i + 1) * self.KEY_SIZE], self._count + i)
+        self._count += len(tail) // self.KEY_SIZE
+        if self._vectors is not None and self._count > self._vectors.shape[0]:
+            # 其他进程已扩容向量文件，按当前文件大小重新映射
+            self._open_vectors(self._count)
+
+    def _open_vectors(self, capacity: int) -> None:
+        """以至少 capacity 行的容量映射向量文件，文件不足时扩展；调用方持有 self._lock"""
+        row_bytes = self.dim * np.dtype(np.float16).itemsize
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        if size < capacity * row_bytes:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            with open(self._vectors_path, "ab") as f:
+                f.truncate(capacity * row_bytes)
+            size = capacity * row_bytes
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float16, mode="r+",
+                                  shape=(size // row_bytes, self.dim))
+
+    def get_many(self, keys: Iterable[bytes]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns:
+            (命中掩码, 命中行的 float32 向量)，向量按 keys 中命中项的顺序排列
+        """
+        keys = list(keys)
+        # 扩容时 _vectors 会被替换，读取与 put_many 使用同一把锁
+        with self._lock:
+            if any(k not in self._rows for k in keys):
+                self._reload_keys()
+            rows = [self._rows.get(k, -1) for k in keys]
+            found = np.array([r >= 0 for r in rows], dtype=bool)
+            hit_rows = [r for r in rows if r >= 0]
+            if not hit_rows:
+                return found, np.zeros((0, self.dim), dtype=np.float32)
+            return found, np.asarray(self._vectors[hit_rows], dtype=np.float32)
+
+    def put_many(self, keys: List[bytes], vectors: np.ndarray) -> None:
+        """追加向量，已存在的哈希跳过（包括其他进程刚写入的）"""
+        with self._lock, self._file_lock():
+            self._reload_keys()
+            new = [(k, v) for k, v in zip(keys, vectors) if k not in self._rows]
+            # 同一批内重复的哈希只写一次
+            new = list({k: v for k, v in new}.items())
+            if not new:
+                return
+            start = self._count
+            if start + len(new) > self._vectors.shape[0]:
+                self._open_vectors(max(2 * self._vectors.shape[0], start + len(new)))
+            self._vectors[start:start + len(new)] = np.stack([v for _, v in new]).astype(np.float16)
+            self._vectors.flush()
+            with open(self._keys_path, "ab") as f:
+                f.write(b"".join(k for k, _ in new))
+            for i, (k, _) in enumerate(new):
+                self._rows[k] = start + i
+            self._count += len(new)
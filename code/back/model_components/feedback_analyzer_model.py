@@ -1,6 +1,7 @@
 from typing import Dict, Any, Optional
 import threading
 from core_abstract.base_model import BaseModel
+from core_abstract.ttl_cache import LRUTTLCache
 
 # 前置声明基础模型（实际应导入）
 class FoundationModel:
@@ -15,8 +16,11 @@ class FeedbackAnalyzerModel(BaseModel):
         self.batch_size: int = config.get("batch_size", 16)
         self.cache_enabled: bool = config.get("cache_enabled", True)
         self.cache_ttl: int = config.get("cache_ttl", 3600)
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._cache_times: Dict[str, float] = {}
+        self._cache = LRUTTLCache(
+            max_entries=config.get("cache_max_entries", 1024),
+            max_bytes=config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
         self._lock: threading.Lock = threading.Lock()
 
     def load(self) -> None:
@@ -51,10 +55,8 @@ class FeedbackAnalyzerModel(BaseModel):
 
     def _get_cached_analysis(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """获取缓存分析结果"""
-        # 后续实现
-        pass
+        return self._cache.get(cache_key)
 
     def _set_cached_analysis(self, cache_key: str, analysis: Dict[str, Any]) -> None:
         """设置缓存分析结果"""
-        # 后续实现
-        pass
\ No newline at end of file
+        self._cache.set(cache_key, analysis)
@@ -1,8 +1,12 @@
 from typing import Dict, Any, Optional, List, Union
 import numpy as np
+import json
+import os
 import threading
 from core_abstract.base_model import BaseModel
 from core_abstract.model_type import ModelType
+from core_abstract.ttl_cache import LRUTTLCache
+from model_components.llm_cache import PersistentLLMCache
 
 
 class FoundationModel(BaseModel):
@@ -22,10 +26,23 @@ class FoundationModel(BaseModel):
         self.response_format = config.get("response_format", "text")
         self.cache_enabled = config.get("cache_enabled", True)
         self.cache_ttl = config.get("cache_ttl", 3600)  # 缓存过期时间（秒）
+        self.cache_path = config.get("cache_path", os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), ".cache", "llm_cache.sqlite"))
+        self.cache_max_entries = config.get("cache_max_entries", 100000)
         
-        # 缓存相关私有属性
-        self._cache: Dict[str, str] = {}
-        self._cache_times: Dict[str, float] = {}
+        # 缓存相关私有属性（SQLite 持久化，跨进程共享、重启后仍有效）
+        # 前面再加一层进程内 LRU，热点响应不必每次查询 SQLite
+        self._cache: Optional[PersistentLLMCache] = None
+        self._memory_cache: Optional[LRUTTLCache] = None
+        if self.cache_enabled:
+            self._cache = PersistentLLMCache(
+                self.cache_path, ttl=self.cache_ttl, max_entries=self.cache_max_entries
+            )
+            self._memory_cache = LRUTTLCache(
+                max_entries=config.get("memory_cache_max_entries", 1024),
+                max_bytes=config.get("memory_cache_max_bytes"),
+                ttl=self.cache_ttl
+            )
         self._lock = threading.Lock()
 
     def generate(self, prompt: str, **kwargs) -> str:
@@ -37,16 +54,39 @@ class FoundationModel(BaseModel):
         pass
 
     def _get_cache_key(self, prompt: str,** kwargs) -> str:
-        """生成缓存键（具体实现后续补充）"""
-        pass
+        """生成缓存键：模型名 + 生成参数（含调用时覆盖项）+ 完整提示词的哈希"""
+        params = {
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "top_p": self.top_p,
+            "frequency_penalty": self.frequency_penalty,
+            "presence_penalty": self.presence_penalty,
+            "stop_sequences": self.stop_sequences,
+            "response_format": self.response_format,
+            **kwargs
+        }
+        llm_string = json.dumps(
+            {"model_name": self._model_name, "version": self._model_version, "params": params},
+            ensure_ascii=False, sort_keys=True, default=str
+        )
+        return PersistentLLMCache.make_key(llm_string, prompt)
 
     def _get_cached_response(self, cache_key: str) -> Optional[str]:
-        """获取缓存的响应（具体实现后续补充）"""
-        pass
+        """获取缓存的响应（过期检查与命中统计由持久化缓存完成）"""
+        if self._cache is None:
+            return None
+        response = self._memory_cache.get(cache_key)
+        if response is None:
+            response = self._cache.get(cache_key)
+            if response is not None:
+                self._memory_cache.set(cache_key, response)
+        return response
 
     def _set_cached_response(self, cache_key: str, response: str) -> None:
-        """设置缓存的响应（具体实现后续补充）"""
-        pass
+        """设置缓存的响应"""
+        if self._cache is not None:
+            self._cache.set(cache_key, response)
+            self._memory_cache.set(cache_key, response)
 
     # 实现父类抽象方法
     def load(self) -> None:
@@ -1,7 +1,7 @@
 from typing import Dict, Any, Optional, List
 import threading
 from core_abstract.base_model import BaseModel
-from tool_chain.knowledge_graph_component import KnowledgeGraphComponent
+from core_abstract.ttl_cache import LRUTTLCache
 
 # 前置声明知识图谱接口（实际应导入）
 class KnowledgeGraphInterface:
@@ -14,8 +14,11 @@ class KnowledgeGraphModel(BaseModel):
         self.graph_db: KnowledgeGraphInterface = config.get("graph_db")  # 实际应初始化接口实现
         self.cache_enabled: bool = config.get("cache_enabled", True)
         self.cache_ttl: int = config.get("cache_ttl", 3600)
-        self._query_cache: Dict[str, Any] = {}
-        self._cache_times: Dict[str, float] = {}
+        self._query_cache = LRUTTLCache(
+            max_entries=config.get("cache_max_entries", 1024),
+            max_bytes=config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
         self._lock: threading.Lock = threading.Lock()
 
     def load(self) -> None:
@@ -60,10 +63,8 @@ class KnowledgeGraphModel(BaseModel):
 
     def _get_cached_result(self, cache_key: str) -> Optional[Any]:
         """获取缓存结果"""
-        # 后续实现
-        pass
+        return self._query_cache.get(cache_key)
 
     def _set_cached_result(self, cache_key: str, result: Any) -> None:
         """设置缓存结果"""
-        # 后续实现
-        pass
\ No newline at end of file
+        self._query_cache.set(cache_key, result)
@@ -0,0 +1,271 @@
+from typing import Any, Dict, Optional
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.messages import message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, Generation
+
+
+class PersistentLLMCache(BaseCache):
+    """
+    基于 SQLite 的持久化 LLM 响应缓存（跨进程、重启后仍有效）
+    缓存键为 sha256(模型名+参数+完整提示词)，支持 TTL 过期、条目数/字节数上限的 LRU 淘汰，
+    并在库内累计命中/未命中次数
+
+    命中只执行 SELECT：访问时间与计数先记在内存中，每累计 STATS_FLUSH_INTERVAL 次或间隔 STATS_FLUSH_SECONDS 秒
+    合并成一个写事务落库（淘汰、统计前及进程退出时也会落库），避免每次命中都争用 SQLite 的单写锁
+
+    既可作为 LangChain 的 BaseCache 挂到 ChatDeepSeek(cache=...) 上，
+    也可通过 make_key/get/set 直接存取字符串响应（FoundationModel 使用此方式）
+    """
+
+    # 每写入多少次检查一次容量，避免每次写入都统计全表
+    EVICT_CHECK_INTERVAL = 64
+    # 访问时间与计数的落库间隔（次数 / 秒）
+    STATS_FLUSH_INTERVAL = 64
+    STATS_FLUSH_SECONDS = 5.0
+
+    def __init__(
+        self,
+        db_path: str,
+        ttl: Optional[float] = 7 * 24 * 3600,
+        max_entries: Optional[int] = 100000,
+        max_bytes: Optional[int] = None
+    ):
+        """
+        Args:
+            db_path: SQLite 文件路径，多个进程可共用同一文件
+            ttl: 过期时间（秒），None 表示永不过期
+            max_entries: 最大条目数，None 表示不限制
+            max_bytes: 响应内容总字节数上限，None 表示不限制
+        """
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+        # 尚未落库的访问时间（key -> 最近访问时间）与计数增量
+        self._touched: Dict[str, float] = {}
+        self._pending: Dict[str, int] = {}
+        self._pending_ops = 0
+        self._last_flush = time.monotonic()
+
+        db_dir = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(db_dir, exist_ok=True)
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS llm_cache_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            conn.executemany(
+                "INSERT OR IGNORE INTO llm_cache_stats(name, value) VALUES (?, 0)",
+                [("hits",), ("misses",), ("evictions",), ("expirations",)]
+            )
+        atexit.register(self.flush)
+
+    def _conn(self) -> sqlite3.Connection:
+        """每个线程使用独立连接；WAL 模式允许多进程并发读写"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(llm_string: str, prompt: str) -> str:
+        """由模型描述（模型名+参数）与完整提示词生成内容寻址键"""
+        digest = hashlib.sha256()
+        digest.update(llm_string.encode("utf-8"))
+        digest.update(b"\x00")
+        digest.update(prompt.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _bump(self, conn: sqlite3.Connection, name: str, n: int = 1) -> None:
+        conn.execute("UPDATE llm_cache_stats SET value = value + ? WHERE name = ?", (n, name))
+
+    def _record(self, key: Optional[str], now: float, **counts: int) -> None:
+        """在内存中记录一次访问，达到落库间隔时合并写入"""
+        with self._lock:
+            if key is not None:
+                self._touched[key] = now
+            for name, n in counts.items():
+                self._pending[name] = self._pending.get(name, 0) + n
+            self._pending_ops += 1
+            should_flush = (self._pending_ops >= self.STATS_FLUSH_INTERVAL
+                            or time.monotonic() - self._last_flush >= self.STATS_FLUSH_SECONDS)
+        if should_flush:
+            self.flush()
+
+    def flush(self) -> None:
+        """把内存中的访问时间与计数增量在一个写事务内落库"""
+        with self._lock:
+            touched, pending = self._touched, self._pending
+            self._touched, self._pending = {}, {}
+            self._pending_ops = 0
+            self._last_flush = time.monotonic()
+        if not touched and not pending:
+            return
+        conn = self._conn()
+        with conn:
+            conn.executemany(
+                "UPDATE llm_cache SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in touched.items()]
+            )
+            for name, n in pending.items():
+                self._bump(conn, name, n)
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存值（只读查询），过期条目视为未命中并删除"""
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self._record(None, now, misses=1)
+            return None
+        value, created_at = row
+        if self.ttl is not None and now - created_at >= self.ttl:
+            with conn:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+            self._record(None, now, expirations=1, misses=1)
+            return None
+        self._record(key, now, hits=1)
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        """写入缓存值，并按需执行过期清理与 LRU 淘汰"""
+        now = time.time()
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache(key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value.encode("utf-8")), now, now)
+            )
+        with self._lock:
+            self._writes += 1
+            should_check = self._writes % self.EVICT_CHECK_INTERVAL == 0
+        if should_check:
+            self.evict()
+
+    def evict(self) -> int:
+        """删除过期条目，并按最近访问时间淘汰超出容量的条目，返回删除数量"""
+        self.flush()
+        conn = self._conn()
+        removed = 0
+        with conn:
+            if self.ttl is not None:
+                cur = conn.execute("DELETE FROM llm_cache WHERE created_at <= ?", (time.time() - self.ttl,))
+                if cur.rowcount:
+                    self._bump(conn, "expirations", cur.rowcount)
+                    removed += cur.rowcount
+
+            count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+            excess = 0
+            if self.max_entries is not None and count > self.max_entries:
+                excess = count - self.max_entries
+            if self.max_bytes is not None and total_bytes > self.max_bytes:
+                # 按最久未访问顺序累加，找到需要淘汰的条数
+                freed = 0
+                for i, (size,) in enumerate(conn.execute("SELECT size FROM llm_cache ORDER BY accessed_at")):
+                    freed += size
+                    if total_bytes - freed <= self.max_bytes:
+                        excess = max(excess, i + 1)
+                        break
+            if excess:
+                cur = conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at LIMIT ?)",
+                    (excess,)
+                )
+                self._bump(conn, "evictions", cur.rowcount)
+                removed += cur.rowcount
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        """返回累计命中/未命中/淘汰次数及当前容量（跨进程累计，其他进程尚未落库的增量不计入）"""
+        self.flush()
+        conn = self._conn()
+        counters = dict(conn.execute("SELECT name, value FROM llm_cache_stats").fetchall())
+        count, total_bytes = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        lookups = counters.get("hits", 0) + counters.get("misses", 0)
+        return {
+            **counters,
+            "hit_rate": counters.get("hits", 0) / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl": self.ttl
+        }
+
+    # ---- LangChain BaseCache 接口 ----
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        value = self.get(self.make_key(llm_string, prompt))
+        if value is None:
+            return None
+        return [self._load_generation(item) for item in json.loads(value)]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        value = json.dumps([self._dump_generation(g) for g in return_val], ensure_ascii=False)
+        self.set(self.make_key(llm_string, prompt), value)
+
+    def clear(self, **kwargs: Any) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    @staticmethod
+    def _dump_generation(generation: Generation) -> Dict[str, Any]:
+        if isinstance(generation, ChatGeneration):
+            return {"message": message_to_dict(generation.message)}
+        return {"text": generation.text}
+
+    @staticmethod
+    def _load_generation(item: Dict[str, Any]) -> Generation:
+        if "message" in item:
+            return ChatGeneration(message=messages_from_dict([item["message"]])[0])
+        return Generation(text=item["text"])
+
+
+_default_cache: Optional[PersistentLLMCache] = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[PersistentLLMCache]:
+    """
+    获取进程内共享的默认 LLM 缓存，参数来自环境变量：
+        LLM_CACHE_ENABLED: 是否启用，默认 1
+        LLM_CACHE_PATH: SQLite 文件路径，默认 code/back/.cache/llm_cache.sqlite
+        LLM_CACHE_TTL: 过期时间（秒），默认 7 天
+        LLM_CACHE_MAX_ENTRIES: 最大条目数，默认 100000
+        LLM_CACHE_MAX_BYTES: 最大字节数，默认不限制
+    """
+    global _default_cache
+    if os.getenv("LLM_CACHE_ENABLED", "1").lower() in ("0", "false", "no"):
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            max_bytes = os.getenv("LLM_CACHE_MAX_BYTES")
+            _default_cache = PersistentLLMCache(
+                db_path=os.getenv("LLM_CACHE_PATH", os.path.join(base_dir, ".cache", "llm_cache.sqlite")),
+                ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600))),
+                max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "100000")),
+                max_bytes=int(max_bytes) if max_bytes else None
+            )
+        return _default_cache
@@ -1,6 +1,7 @@
 from typing import Dict, Any, Optional, List, Tuple
 import threading
 from core_abstract.base_model import BaseModel
+from core_abstract.ttl_cache import LRUTTLCache
 
 class OCRModel(BaseModel):
     """OCR模型封装"""
@@ -11,8 +12,11 @@ class OCRModel(BaseModel):
         self.max_image_size: Tuple[int, int] = config.get("max_image_size", (1024, 1024))
         self.cache_enabled: bool = config.get("cache_enabled", True)
         self.cache_ttl: int = config.get("cache_ttl", 3600)
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._cache_times: Dict[str, float] = {}
+        self._cache = LRUTTLCache(
+            max_entries=config.get("cache_max_entries", 1024),
+            max_bytes=config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
         self._lock: threading.Lock = threading.Lock()
 
     def load(self) -> None:
@@ -47,10 +51,8 @@ class OCRModel(BaseModel):
 
     def _get_cached_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """获取缓存结果"""
-        # 后续实现
-        pass
+        return self._cache.get(cache_key)
 
     def _set_cached_result(self, cache_key: str, result: Dict[str, Any]) -> None:
         """设置缓存结果"""
-        # 后续实现
-        pass
\ No newline at end of file
+        self._cache.set(cache_key, result)
@@ -1,43 +1,194 @@
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, Callable, List, Tuple, Optional
+import hashlib
 import threading
+import numpy as np
 from core_abstract.base_model import BaseModel
+from core_abstract.ttl_cache import LRUTTLCache
 from core_abstract.model_type import ModelType
 
+# 打分函数：输入一批 (query, document) 对，输出同样条数的相关性分数（logit）
+PairScorer = Callable[[List[Tuple[str, str]]], Any]
+
 
 class RerankerModel(BaseModel):
-    """重排序模型封装，用于优化检索结果排序"""
+    """
+    重排序模型封装（交叉编码器），用于优化检索结果排序
+    一次 rerank 内先按 (query, document) 哈希查缓存并去重，未命中的文档对按 batch_size 分批前向，
+    只在 CPU 上运行：默认用 transformers 加载模型，也可用 onnxruntime 加载导出（可 int8 量化）的模型
+    """
     def __init__(self, config: Dict[str, Any]):
+        """
+        Args:
+            config: 除通用模型配置外，包含以下键：
+                - top_k / min_score_threshold: 重排后保留的条数 / 最低分数
+                - max_candidates: 送入交叉编码器的候选上限，提供首轮分数时先按其截断
+                - batch_size / max_length: 单批文档对数 / 最大 token 长度
+                - normalize_scores: 是否对 logit 取 sigmoid，使分数落在 0-1（min_score_threshold 按此口径）
+                - backend: "torch"（默认）或 "onnx"
+                - onnx_path: backend 为 "onnx" 时的模型文件，可先用 quantize_onnx 做 int8 动态量化
+                - num_threads: 推理的算子内线程数，None 表示由运行时决定
+                - scorer: 自定义打分函数，提供时不加载模型
+                - cache_enabled / cache_ttl / cache_max_entries / cache_max_bytes: 文档对分数缓存配置
+        """
         super().__init__(config)
         self._model_type = ModelType.RERANKER  # 指定模型类型
         # 从配置初始化属性
         self.top_k = config.get("top_k", 10)
         self.min_score_threshold = config.get("min_score_threshold", 0.0)
+        self.max_candidates = config.get("max_candidates", 50)
+        self.batch_size = config.get("batch_size", 32)
+        self.max_length = config.get("max_length", 512)
+        self.normalize_scores = config.get("normalize_scores", True)
+        self.backend = config.get("backend", "torch")
+        self.model_path = config.get("model_path", self._model_name)
+        self.onnx_path = config.get("onnx_path")
+        self.num_threads = config.get("num_threads")
         self.cache_enabled = config.get("cache_enabled", True)
         self.cache_ttl = config.get("cache_ttl", 3600)
-        
-        # 缓存相关私有属性
-        self._cache: Dict[str, List[Tuple[str, float]]] = {}
-        self._cache_times: Dict[str, float] = {}
+        self._scorer: Optional[PairScorer] = config.get("scorer")
+        if self.backend not in ("torch", "onnx"):
+            raise ValueError(f"不支持的重排后端: {self.backend}")
+
+        # 缓存相关私有属性：文档对哈希 -> 分数
+        self._cache = LRUTTLCache(
+            max_entries=config.get("cache_max_entries", 1024),
+            max_bytes=config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
         self._lock = threading.Lock()
+        self._scored_count = 0
 
     def rerank(self, query: str, documents: List[str], scores: List[float] = None) -> List[Tuple[str, float]]:
-        """对文档进行重排序（具体实现后续补充）"""
-        pass
+        """
+        对文档进行重排序
+        Args:
+            query: 查询文本
+            documents: 候选文档
+            scores: 首轮检索分数（可选）；候选超过 max_candidates 时只保留首轮分数最高的部分
+        Returns:
+            [(文档, 重排分数), ...]，按分数降序，最多 top_k 条且不低于 min_score_threshold
+        """
+        if not documents:
+            return []
+        if scores is not None and len(documents) > self.max_candidates:
+            keep = np.argsort(-np.asarray(scores, dtype=np.float32), kind="stable")[:self.max_candidates]
+            documents = [documents[i] for i in keep]
+        else:
+            documents = documents[:self.max_candidates]
+
+        pair_scores = self.score_pairs(query, documents)
+        order = np.argsort(-pair_scores, kind="stable")
+        results = []
+        for i in order:
+            if pair_scores[i] < self.min_score_threshold or len(results) >= self.top_k:
+                break
+            results.append((documents[i], float(pair_scores[i])))
+        self.record_usage()
+        return results
+
+    def score_pairs(self, query: str, documents: List[str]) -> np.ndarray:
+        """返回 query 与每个文档的相关性分数，顺序与 documents 一致"""
+        unique = list(dict.fromkeys(documents))
+        keys = [self._get_cache_key(query, d) for d in unique]
+        found: Dict[bytes, float] = {}
+        pending = []
+        for key, doc in zip(keys, unique):
+            cached = self._cache.get(key) if self.cache_enabled else None
+            if cached is not None:
+                found[key] = cached
+            else:
+                pending.append((key, doc))
+
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            for (key, _), score in zip(batch, self._score([(query, doc) for _, doc in batch])):
+                found[key] = float(score)
+                if self.cache_enabled:
+                    self._cache.set(key, float(score))
+
+        key_of = dict(zip(unique, keys))
+        return np.array([found[key_of[d]] for d in documents], dtype=np.float32)
+
+    def _score(self, pairs: List[Tuple[str, str]]) -> np.ndarray:
+        """对一批文档对做一次前向"""
+        if not self._is_loaded:
+            self.load()
+        logits = np.asarray(self._scorer(pairs), dtype=np.float32).reshape(len(pairs), -1)[:, -1]
+        self._scored_count += len(pairs)
+        return 1.0 / (1.0 + np.exp(-logits)) if self.normalize_scores else logits
+
+    def _get_cache_key(self, query: str, document: str) -> bytes:
+        """生成缓存键：模型名 + 查询 + 文档的哈希"""
+        return hashlib.blake2b(f"{self._model_name}\0{query}\0{document}".encode("utf-8"), digest_size=16).digest()
+
+    # ---- 模型加载 ----
+
+    def _tokenize(self, tokenizer, pairs: List[Tuple[str, str]], return_tensors: str):
+        return tokenizer([q for q, _ in pairs], [d for _, d in pairs], padding=True,
+                         truncation=True, max_length=self.max_length, return_tensors=return_tensors)
+
+    def _load_torch(self) -> PairScorer:
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+        model = AutoModelForSequenceClassification.from_pretrained(self.model_path).eval()
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+
+        def scorer(pairs):
+            with torch.inference_mode():
+                return model(**self._tokenize(tokenizer, pairs, "pt")).logits.float().numpy()
+        return scorer
+
+    def _load_onnx(self) -> PairScorer:
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        if not self.onnx_path:
+            raise ValueError("backend 为 onnx 时必须提供 onnx_path")
+        options = ort.SessionOptions()
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        session = ort.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+        input_names = {i.name for i in session.get_inputs()}
+        tokenizer = AutoTokenizer.from_pretrained(self.model_path)
+
+        def scorer(pairs):
+            encoded = self._tokenize(tokenizer, pairs, "np")
+            return session.run(None, {k: v.astype(np.int64) for k, v in encoded.items() if k in input_names})[0]
+        return scorer
+
+    @staticmethod
+    def quantize_onnx(src_path: str, dst_path: str) -> str:
+        """把导出的 ONNX 交叉编码器做 int8 动态量化（权重量化，CPU 推理提速、模型缩小约 4 倍）"""
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(src_path, dst_path, weight_type=QuantType.QInt8)
+        return dst_path
 
     # 实现父类抽象方法
     def load(self) -> None:
-        self._is_loaded = True
+        """未提供 scorer 时按 backend 加载交叉编码器"""
+        with self._lock:
+            if self._is_loaded:
+                return
+            if self._scorer is None:
+                self._scorer = self._load_onnx() if self.backend == "onnx" else self._load_torch()
+            self._is_loaded = True
 
     def unload(self) -> None:
         self._is_loaded = False
+        if "scorer" not in self._config:
+            self._scorer = None
 
     def validate_config(self) -> bool:
-        return True
+        return self.backend != "onnx" or bool(self.onnx_path) or self._scorer is not None
 
     def get_model_info(self) -> Dict[str, Any]:
         return {
             "model_name": self._model_name,
             "model_type": self._model_type.value,
             "top_k": self.top_k,
-            "version": self._model_version
-        }
\ No newline at end of file
+            "backend": self.backend,
+            "version": self._model_version,
+            "scored_count": self._scored_count,
+            "cache_stats": self._cache.stats()
+        }
@@ -0,0 +1,281 @@
+"""
+检索基准测试（离线）
+按多个规模生成 rule.json 格式的合成规则，经 DataIngestor 入库后，对各检索后端测量：
+入库吞吐、查询延迟 p50/p95/p99、内存增量与 recall@k
+嵌入使用本地的字符 n-gram 哈希向量代替 bge 模型，不需要下载模型或联网
+
+用法（在 code/back 下）：
+    python -m retrieval_strategies.benchmark --scales 100 1000 10000 --queries 200 --out bench.json
+"""
+import argparse
+import gc
+import hashlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from model_components.embedding_model import EmbeddingModel
+from retrieval_strategies.config import RAGConfig
+from retrieval_strategies.ingestion import DataIngestor
+from retrieval_strategies.retrieval import DataRetriever
+
+BACKENDS = ("exact", "qdrant", "semantic", "keyword", "hybrid")
+
+# 合成规则的条件池：字段 -> 可选的条件写法（与真实规则库的表述风格一致）
+CONDITIONS = {
+    "公积金账户状态": ["公积金账户状态为'未缴纳'或'冻结'", "公积金账户状态为'正常缴存'"],
+    "公积金缴存月数": ["公积金缴存月数 < {n}"],
+    "社保缴纳状态": ["社保缴纳状态为'断缴'", "社保缴纳状态为'补缴'"],
+    "申请贷款次数": ["近12个月申请贷款次数 >= {n}", "近3个月申请贷款次数 >= {n}"],
+    "征信查询次数": ["近6个月征信查询次数 >= {n}", "近1个月征信查询次数 >= {n}"],
+    "手机在网时长": ["手机在网时长 < {n}个月"],
+    "学历": ["学历为高中/中专", "学历为初中及以下", "学历为大专"],
+    "年龄": ["年龄 < {n}", "年龄 >= {n}"],
+    "负债收入比": ["负债收入比 > {n}0%"],
+    "工作单位": ["工作单位成立时间 < {n}个月", "工作单位为空壳公司"],
+    "收入流水": ["月均收入流水 < {n}000元", "收入流水集中于发薪日前后"],
+    "婚姻状况": ["婚姻状况为'离异'", "婚姻状况为'未婚'"],
+    "居住地": ["居住地与工作地不在同一城市", "近6个月变更居住地址次数 >= {n}"],
+    "信用卡": ["信用卡使用率 > {n}0%", "近3个月新增信用卡 >= {n}张"],
+    "逾期": ["当前逾期笔数 >= {n}", "近24个月最长逾期天数 > {n}0"],
+    "担保": ["对外担保笔数 >= {n}", "作为共同借款人笔数 >= {n}"],
+}
+VERDICTS = ["高风险背债人", "疑似背债人", "中风险", "低风险", "需人工复核"]
+TOPICS = ["断缴", "突击借贷", "多头借贷", "空壳包装", "新号", "高负债", "频繁查询", "异地", "担保链", "逾期"]
+
+
+def generate_rules(n: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """生成 n 条 rule.json 格式的合成规则，每条 2-4 个条件，rule_name 唯一"""
+    rng = random.Random(seed)
+    fields = list(CONDITIONS)
+    rules = []
+    for i in range(n):
+        picked = rng.sample(fields, rng.randint(2, 4))
+        clauses = [rng.choice(CONDITIONS[f]).format(n=rng.randint(1, 9)) for f in picked]
+        rules.append({
+            "rule_name": f"{rng.choice(TOPICS)}{rng.choice(TOPICS)}规则{i:07d}",
+            "logic_expression": " AND ".join(clauses),
+            "risk_verdict": rng.choice(VERDICTS)
+        })
+    return rules
+
+
+def generate_queries(rules: List[Dict[str, Any]], n: int, seed: int = 1) -> List[Tuple[str, str]]:
+    """
+    从规则中抽样构造查询：保留部分条件并打乱顺序、去掉逻辑连接词，模拟特征匹配节点的自然语言描述
+    Returns:
+        [(查询文本, 目标 rule_name), ...]
+    """
+    rng = random.Random(seed)
+    queries = []
+    for rule in rng.sample(rules, min(n, len(rules))):
+        clauses = rule["logic_expression"].split(" AND ")
+        kept = rng.sample(clauses, max(1, round(len(clauses) * 0.7)))
+        queries.append(("，".join(kept) + f"，{rule['risk_verdict']}", rule["rule_name"]))
+    return queries
+
+
+class HashingEncoder:
+    """
+    嵌入模型的离线替身：字符 1-3 gram 做带符号的特征哈希后 L2 归一化
+    语义能力远不如真实模型，但字面相近的文本向量相近，足以比较各后端的开销与相对召回
+    """
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+        self._buckets: Dict[str, Tuple[int, float]] = {}  # 合成语料的 n-gram 词表很小，哈希结果直接缓存
+
+    def _bucket(self, gram: str) -> Tuple[int, float]:
+        bucket = self._buckets.get(gram)
+        if bucket is None:
+            h = int.from_bytes(hashlib.blake2b(gram.encode("utf-8"), digest_size=8).digest(), "little")
+            bucket = self._buckets[gram] = (h % self.dim, 1.0 if (h >> 63) & 1 else -1.0)
+        return bucket
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for n in (1, 2, 3):
+                for i in range(len(text) - n + 1):
+                    col, sign = self._bucket(text[i:i + n])
+                    vectors[row, col] += sign
+        return vectors
+
+
+def make_embedding_model(encoder: HashingEncoder) -> EmbeddingModel:
+    """不落盘的嵌入模型；每个后端测试前换一个新实例，查询向量不会沿用上一个后端的缓存"""
+    return EmbeddingModel({
+        "model_name": f"hashing-{encoder.dim}",
+        "embedding_dim": encoder.dim,
+        "batch_size": 512,
+        "encoder": encoder,
+        "store_path": None
+    })
+
+
+def rss_mb() -> float:
+    """当前进程常驻内存（MB）；没有 /proc 时退化为峰值常驻内存"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def build_backend(name: str, config: RAGConfig, rule_file: str, top_k: int):
+    """返回 (检索函数 query -> 结果列表, 后端对象)"""
+    if name in ("exact", "qdrant"):
+        retriever = DataRetriever(config, exact_max_size=sys.maxsize if name == "exact" else 0)
+        return (lambda q: retriever.search_rules(q, top_k=top_k)), retriever
+
+    from retrieval_strategies.keyword_retrieval import KeywordRetrievalStrategy
+    from retrieval_strategies.semantic_retrieval import SemanticRetrievalStrategy
+    semantic_config = {"top_k": top_k, "similarity_threshold": -1.0, "cache_enabled": False}
+    keyword_config = {"top_k": top_k, "min_score": 0.0, "cache_enabled": False, "rule_file": rule_file}
+    if name == "semantic":
+        strategy = SemanticRetrievalStrategy({**semantic_config, "retriever": DataRetriever(config)})
+    elif name == "keyword":
+        strategy = KeywordRetrievalStrategy(keyword_config)
+    elif name == "hybrid":
+        from retrieval_strategies.hybrid_retrieval import HybridRetrievalStrategy
+        strategy = HybridRetrievalStrategy({
+            "top_k": top_k,
+            "relevancy_threshold": 0.0,
+            "cache_enabled": False,
+            "latency_budget": None,
+            "semantic_strategy_config": {**semantic_config, "retriever": DataRetriever(config)},
+            "keyword_strategy_config": keyword_config
+        })
+    else:
+        raise ValueError(f"未知的检索后端: {name}")
+    return (lambda q: strategy.retrieve(q, {})), strategy
+
+
+def bench_backend(name: str, config: RAGConfig, rule_file: str, queries: List[Tuple[str, str]],
+                  top_k: int, warmup: int = 5) -> Dict[str, Any]:
+    config.embedding_model = make_embedding_model(config.embedding_model.config["encoder"])
+    gc.collect()
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    search, backend = build_backend(name, config, rule_file, top_k)
+    build_seconds = time.perf_counter() - started
+    rss_after_build = rss_mb()
+
+    for query, _ in queries[:warmup]:
+        search(query)
+    latencies, hits = [], 0
+    for query, target in queries:
+        t0 = time.perf_counter()
+        results = search(query)
+        latencies.append(time.perf_counter() - t0)
+        hits += any(r.get("rule_name") == target for r in results[:top_k])
+
+    ms = np.asarray(latencies) * 1000
+    result = {
+        "backend": name,
+        "build_seconds": build_seconds,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "qps": len(ms) / (ms.sum() / 1000) if ms.sum() else 0.0,
+        f"recall@{top_k}": hits / len(queries) if queries else 0.0,
+        "index_mb": rss_after_build - rss_before,
+        "rss_mb": rss_mb()
+    }
+    del search, backend
+    return result
+
+
+def bench_scale(scale: int, workdir: str, backends: List[str], n_queries: int, top_k: int,
+                dim: int, seed: int) -> Dict[str, Any]:
+    scale_dir = os.path.join(workdir, f"rules_{scale}")
+    shutil.rmtree(scale_dir, ignore_errors=True)
+    os.makedirs(scale_dir)
+    rules = generate_rules(scale, seed)
+    rule_file = os.path.join(scale_dir, "rule.json")
+    with open(rule_file, "w", encoding="utf-8") as f:
+        json.dump({"rules": rules}, f, ensure_ascii=False)
+    queries = generate_queries(rules, n_queries, seed + 1)
+
+    config = RAGConfig(collection_name=f"bench_{scale}", storage_path=os.path.join(scale_dir, "qdrant"))
+    config.embedding_model = make_embedding_model(HashingEncoder(dim))
+    ingestor = DataIngestor(config)
+
+    rss_before = rss_mb()
+    started = time.perf_counter()
+    summary = ingestor.ingest_rules(rule_file)
+    ingest_seconds = time.perf_counter() - started
+    if not summary or len(summary["added"]) != scale:
+        raise RuntimeError(f"规模 {scale} 入库失败: {summary}")
+    # 再入库一次：规则未变化时应只有比对开销
+    started = time.perf_counter()
+    ingestor.ingest_rules(rule_file)
+    reingest_seconds = time.perf_counter() - started
+
+    report = {
+        "scale": scale,
+        "ingest_seconds": ingest_seconds,
+        "ingest_rules_per_sec": scale / ingest_seconds if ingest_seconds else 0.0,
+        "reingest_seconds": reingest_seconds,
+        "ingest_mb": rss_mb() - rss_before,
+        "backends": []
+    }
+    for name in backends:
+        print(f"[基准] 规模 {scale}：测试 {name} ...")
+        report["backends"].append(bench_backend(name, config, rule_file, queries, top_k))
+    config.client.close()
+    return report
+
+
+def format_report(reports: List[Dict[str, Any]], top_k: int) -> str:
+    lines = []
+    for r in reports:
+        lines.append(f"规模 {r['scale']:>8}：入库 {r['ingest_seconds']:.2f}s（{r['ingest_rules_per_sec']:.0f} 条/秒），"
+                     f"重复入库 {r['reingest_seconds']:.2f}s，入库内存 {r['ingest_mb']:+.1f} MB")
+        lines.append(f"  {'后端':<10}{'构建s':>8}{'p50ms':>9}{'p95ms':>9}{'p99ms':>9}{'QPS':>9}"
+                     f"{f'R@{top_k}':>8}{'索引MB':>9}")
+        for b in r["backends"]:
+            lines.append(f"  {b['backend']:<10}{b['build_seconds']:>8.2f}{b['p50_ms']:>9.2f}{b['p95_ms']:>9.2f}"
+                         f"{b['p99_ms']:>9.2f}{b['qps']:>9.0f}{b[f'recall@{top_k}']:>8.3f}{b['index_mb']:>+9.1f}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    parser = argparse.ArgumentParser(description="检索后端离线基准测试")
+    parser.add_argument("--scales", type=int, nargs="+", default=[100, 1000, 10000],
+                        help="合成规则条数，可取到 1000000（本地 Qdrant 在百万级入库较慢）")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--queries", type=int, default=200, help="每个规模的查询条数")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=256, help="哈希嵌入维度")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="合成规则与向量库目录，默认临时目录（结束后删除）")
+    parser.add_argument("--out", default=None, help="结果 JSON 输出路径")
+    args = parser.parse_args(argv)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="retrieval_bench_")
+    reports = []
+    try:
+        for scale in args.scales:
+            reports.append(bench_scale(scale, workdir, args.backends, args.queries, args.top_k, args.dim, args.seed))
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(format_report(reports, args.top_k))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(reports, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入 {args.out}")
+    return reports
+
+
+if __name__ == "__main__":
+    main()
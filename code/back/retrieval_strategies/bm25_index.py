@@ -0,0 +1,268 @@
+import json
+import math
+import os
+import re
+import shutil
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from retrieval_strategies.payload_filter import Filters, PayloadFieldIndex
+
+_CJK_RUN = re.compile(r"[一-鿿]+")
+_WORD_RUN = re.compile(r"[A-Za-z0-9_.]+")
+
+
+def tokenize(text: str, ngram_range: Tuple[int, int] = (1, 2),
+             dictionary: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    中文按字 n-gram 切分，英文/数字按连续字符切分（转小写）
+    提供 dictionary 时，词典中出现在文本里的词额外作为完整词元输出（如“公积金”“在网时长”）
+    """
+    text = text or ""
+    tokens: List[str] = []
+    lo, hi = ngram_range
+    for run in _CJK_RUN.findall(text):
+        for n in range(lo, hi + 1):
+            tokens.extend(run[i:i + n] for i in range(len(run) - n + 1))
+        if dictionary:
+            tokens.extend(w for w in dictionary if len(w) > hi and w in run)
+    tokens.extend(w.lower() for w in _WORD_RUN.findall(text))
+    return tokens
+
+
+class BM25Index:
+    """
+    支持增量增删的 BM25 倒排索引
+    - 基础段：从磁盘加载的 CSR 倒排表（np.load(mmap_mode="r")，不整体读入内存）
+    - 增量段：加载后新增文档的倒排表，保存在内存中
+    - 删除通过墓碑标记实现，save() 时合并两段并剔除已删除文档
+    """
+
+    VERSION = 1
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, ngram_range: Tuple[int, int] = (1, 2),
+                 dictionary: Optional[Sequence[str]] = None):
+        self.k1 = k1
+        self.b = b
+        self.ngram_range = tuple(ngram_range)
+        self.dictionary = sorted(set(dictionary or []), key=len, reverse=True)
+
+        # 文档：内部序号只增不减，删除只打墓碑
+        self._doc_ids: List[str] = []
+        self._payloads: List[Any] = []
+        self._index_of: Dict[str, int] = {}
+        self._alive = bytearray()
+        self._live_count = 0
+        self._live_len = 0.0
+
+        # 基础段（磁盘 CSR）
+        self._base_terms: Dict[str, int] = {}
+        self._base_offsets = np.zeros(1, dtype=np.int64)
+        self._base_docs = np.zeros(0, dtype=np.int32)
+        self._base_tfs = np.zeros(0, dtype=np.float32)
+        self._base_len = np.zeros(0, dtype=np.float32)
+
+        # 增量段
+        self._delta: Dict[str, Tuple[List[int], List[float]]] = {}
+        self._delta_len: List[float] = []
+        self._doc_len_cache: Optional[np.ndarray] = None
+        self._alive_cache: Optional[np.ndarray] = None
+        self._payload_index = PayloadFieldIndex(self._payloads)
+
+    def __len__(self) -> int:
+        return self._live_count
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._index_of
+
+    def tokenize(self, text: str) -> List[str]:
+        return tokenize(text, self.ngram_range, self.dictionary)
+
+    # ---- 增删 ----
+
+    def add(self, doc_id: str, text: str, payload: Any = None) -> None:
+        """新增文档；同 id 的文档已存在时先删除再写入"""
+        self.remove(doc_id)
+        idx = len(self._doc_ids)
+        tokens = self.tokenize(text)
+        for term, tf in Counter(tokens).items():
+            docs, tfs = self._delta.setdefault(term, ([], []))
+            docs.append(idx)
+            tfs.append(float(tf))
+        self._doc_ids.append(doc_id)
+        self._payloads.append(payload)
+        self._index_of[doc_id] = idx
+        self._alive.append(1)
+        self._delta_len.append(float(len(tokens)))
+        self._live_count += 1
+        self._live_len += len(tokens)
+        self._doc_len_cache = None
+        self._alive_cache = None
+        self._payload_index.invalidate()
+
+    def add_documents(self, documents: Iterable[Tuple[str, str, Any]]) -> None:
+        for doc_id, text, payload in documents:
+            self.add(doc_id, text, payload)
+
+    def remove(self, doc_id: str) -> bool:
+        idx = self._index_of.pop(doc_id, None)
+        if idx is None:
+            return False
+        self._alive[idx] = 0
+        self._alive_cache = None
+        self._payloads[idx] = None
+        self._payload_index.invalidate()
+        self._live_count -= 1
+        self._live_len -= float(self._doc_lengths()[idx])
+        return True
+
+    def get(self, doc_id: str) -> Any:
+        idx = self._index_of.get(doc_id)
+        return None if idx is None else self._payloads[idx]
+
+    # ---- 检索 ----
+
+    def _doc_lengths(self) -> np.ndarray:
+        if self._doc_len_cache is None:
+            self._doc_len_cache = np.concatenate(
+                [np.asarray(self._base_len, dtype=np.float32), np.asarray(self._delta_len, dtype=np.float32)]
+            )
+        return self._doc_len_cache
+
+    def _alive_mask(self) -> np.ndarray:
+        if self._alive_cache is None:
+            self._alive_cache = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        return self._alive_cache
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """合并基础段与增量段的倒排列表"""
+        parts_docs, parts_tfs = [], []
+        t = self._base_terms.get(term)
+        if t is not None:
+            start, end = self._base_offsets[t], self._base_offsets[t + 1]
+            parts_docs.append(self._base_docs[start:end])
+            parts_tfs.append(self._base_tfs[start:end])
+        delta = self._delta.get(term)
+        if delta is not None:
+            parts_docs.append(np.asarray(delta[0], dtype=np.int32))
+            parts_tfs.append(np.asarray(delta[1], dtype=np.float32))
+        if not parts_docs:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+        if len(parts_docs) == 1:
+            return parts_docs[0], parts_tfs[0]
+        return np.concatenate(parts_docs), np.concatenate(parts_tfs)
+
+    def search(self, query: str, top_k: int = 10, filters: Optional[Filters] = None) -> List[Tuple[str, float, Any]]:
+        """
+        Args:
+            filters: payload 过滤条件 {字段: 取值或取值列表}，不满足条件的文档不参与打分；
+                     idf 与平均文档长度仍按全部文档统计，过滤前后同一文档的分数不变
+        Returns:
+            [(doc_id, BM25 分数, payload), ...]，按分数降序，只包含分数大于 0 的文档
+        """
+        if self._live_count == 0:
+            return []
+        alive = self._alive_mask()
+        mask = self._payload_index.mask(filters)
+        if mask is not None and not mask.any():
+            return []
+        doc_len = self._doc_lengths()
+        avgdl = self._live_len / self._live_count or 1.0
+        scores = np.zeros(len(self._doc_ids), dtype=np.float32)
+        for term in set(self.tokenize(query)):
+            docs, tfs = self._postings(term)
+            if docs.size == 0:
+                continue
+            keep = alive[docs]
+            docs, tfs = docs[keep], tfs[keep]
+            df = docs.size
+            if df == 0:
+                continue
+            idf = math.log(1.0 + (self._live_count - df + 0.5) / (df + 0.5))
+            if mask is not None:
+                keep = mask[docs]
+                docs, tfs = docs[keep], tfs[keep]
+                if docs.size == 0:
+                    continue
+            norm = self.k1 * (1.0 - self.b + self.b * doc_len[docs] / avgdl)
+            scores[docs] += idf * tfs * (self.k1 + 1.0) / (tfs + norm)
+
+        hits = np.flatnonzero(scores > 0)
+        if hits.size > top_k:
+            hits = hits[np.argpartition(-scores[hits], top_k - 1)[:top_k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [(self._doc_ids[i], float(scores[i]), self._payloads[i]) for i in hits]
+
+    # ---- 持久化 ----
+
+    def save(self, path: str) -> None:
+        """合并基础段与增量段并剔除已删除文档，写入目录 path（先写临时目录再替换）"""
+        alive = self._alive_mask()
+        remap = np.full(len(self._doc_ids), -1, dtype=np.int64)
+        remap[alive] = np.arange(int(alive.sum()))
+
+        terms, offsets, all_docs, all_tfs = [], [0], [], []
+        for term in sorted(set(self._base_terms) | set(self._delta)):
+            docs, tfs = self._postings(term)
+            keep = alive[docs]
+            if not keep.any():
+                continue
+            terms.append(term)
+            all_docs.append(remap[docs[keep]].astype(np.int32))
+            all_tfs.append(tfs[keep].astype(np.float32))
+            offsets.append(offsets[-1] + int(keep.sum()))
+
+        live = np.flatnonzero(alive)
+        meta = {
+            "version": self.VERSION,
+            "k1": self.k1,
+            "b": self.b,
+            "ngram_range": list(self.ngram_range),
+            "dictionary": self.dictionary,
+            "terms": terms,
+            "doc_ids": [self._doc_ids[i] for i in live],
+            "payloads": [self._payloads[i] for i in live],
+        }
+
+        tmp = f"{path.rstrip(os.sep)}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        np.save(os.path.join(tmp, "docs.npy"),
+                np.concatenate(all_docs) if all_docs else np.zeros(0, dtype=np.int32))
+        np.save(os.path.join(tmp, "tfs.npy"),
+                np.concatenate(all_tfs) if all_tfs else np.zeros(0, dtype=np.float32))
+        np.save(os.path.join(tmp, "doc_len.npy"), self._doc_lengths()[live].astype(np.float32))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        old = f"{path.rstrip(os.sep)}.old"
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old)
+        os.replace(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        """从目录加载索引，倒排数组以内存映射方式打开"""
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != cls.VERSION:
+            raise ValueError(f"索引版本不兼容: {meta.get('version')}")
+        index = cls(k1=meta["k1"], b=meta["b"], ngram_range=tuple(meta["ngram_range"]),
+                    dictionary=meta.get("dictionary"))
+        mode = "r" if mmap else None
+        index._base_offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode=mode)
+        index._base_docs = np.load(os.path.join(path, "docs.npy"), mmap_mode=mode)
+        index._base_tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode=mode)
+        index._base_len = np.load(os.path.join(path, "doc_len.npy"), mmap_mode=mode)
+        index._base_terms = {term: i for i, term in enumerate(meta["terms"])}
+        index._doc_ids = list(meta["doc_ids"])
+        index._payloads = list(meta["payloads"])
+        index._payload_index = PayloadFieldIndex(index._payloads)
+        index._index_of = {doc_id: i for i, doc_id in enumerate(index._doc_ids)}
+        index._alive = bytearray(b"\x01" * len(index._doc_ids))
+        index._live_count = len(index._doc_ids)
+        index._live_len = float(np.sum(index._base_len))
+        return index
@@ -0,0 +1,38 @@
+from typing import Any, List
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+from model_components.embedding_model import EmbeddingModel
+
+
+class CachedEmbedding(BaseEmbedding):
+    """
+    将 EmbeddingModel 适配为 llama_index 的嵌入模型
+    规则入库、CSV 入库和查询都经过 EmbeddingModel 的去重与两级缓存，已算过的文本不再送入模型
+    """
+
+    _model: EmbeddingModel = PrivateAttr()
+
+    def __init__(self, model: EmbeddingModel, **kwargs: Any):
+        super().__init__(model_name=model.config.get("model_name", "unknown"),
+                         embed_batch_size=model.batch_size, **kwargs)
+        self._model = model
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    @property
+    def model(self) -> EmbeddingModel:
+        return self._model
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._model.embed(query, kind="query").tolist()
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._model.embed(text).tolist()
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._model.embed(texts).tolist()
@@ -1,50 +1,162 @@
 import os
-from llama_index.core import Settings, StorageContext
-from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-from llama_index.vector_stores.qdrant import QdrantVectorStore
-import qdrant_client
-from llama_index.core.llms import MockLLM
+import threading
+from core_abstract.startup_timer import startup_timer
+from model_components.embedding_model import EmbeddingModel
 
 class RAGConfig:
+    """
+    检索配置：嵌入模型 + Qdrant 向量库
+    llama_index / HuggingFace / Qdrant 都在首次使用时才导入和初始化：
+    - 只查看向量库（inspect_db）时不加载嵌入模型
+    - 查询文本的向量已在磁盘缓存中时不加载 HuggingFace 模型
+    需要在服务启动时一次性完成初始化的场景调用 warmup()
+    """
     def __init__(
         self,
         collection_name: str = "risk_rules_collection",
-        storage_path: str = "./qdrant_storage"
+        storage_path: str = "./qdrant_storage",
+        applicant_collection_name: str = None
     ):
+        """
+        Args:
+            collection_name: 规则集合，DataRetriever 只在该集合中检索
+            storage_path: Qdrant 本地存储目录
+            applicant_collection_name: ingest_csv 写入申请人数据的集合，默认为“规则集合名_applicants”，
+                                       与规则集合分开，申请人行不会作为规则被检索出来
+        """
         self.collection_name = collection_name
+        self.applicant_collection_name = applicant_collection_name or f"{collection_name}_applicants"
         self.storage_path = storage_path
+        self.local_model_path = r"E:\embeddingmodel\bge-base-zh"
 
-        # 1. 配置 Embedding（本地模型，不使用 LLM）
-        self._setup_settings()
+        self._lock = threading.RLock()
+        self._hf_model = None
+        self._embed_model = None
+        self._client = None
+        self._vector_store = None
 
-        # 2. 初始化 Qdrant（本地持久化模式）
-        self.client = qdrant_client.QdrantClient(
-            path=self.storage_path
-        )
+        # 嵌入缓存层本身很轻，直接创建；真正的模型在第一次缓存未命中时才加载
+        self.embedding_model = EmbeddingModel({
+            "model_name": self.local_model_path,
+            "embedding_dim": 768,  # bge-base-zh
+            "batch_size": 32,
+            "encoder": lambda texts: self._get_hf_model().get_text_embedding_batch(texts),
+            "query_encoder": self._encode_queries
+        })
 
-        self.vector_store = QdrantVectorStore(
-            client=self.client,
-            collection_name=self.collection_name
-        )
+    def _get_hf_model(self):
+        if self._hf_model is None:
+            with self._lock:
+                if self._hf_model is None:
+                    with startup_timer.measure("huggingface", "import"):
+                        from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+                    with startup_timer.measure("huggingface", "init"):
+                        self._hf_model = HuggingFaceEmbedding(
+                            model_name=self.local_model_path,
+                            trust_remote_code=True
+                        )
+        return self._hf_model
+
+    def _encode_queries(self, queries):
+        """
+        一批查询一次前向：直接调用底层 SentenceTransformer，以 llama_index 对该模型使用的查询指令作为 prompt，
+        结果与逐条 get_query_embedding 一致；拿不到底层模型（llama_index 版本差异）时退回逐条编码
+        """
+        hf_model = self._get_hf_model()
+        encoder = getattr(hf_model, "_model", None)
+        if hasattr(encoder, "encode"):
+            instruction = getattr(hf_model, "query_instruction", None)
+            if instruction is None:
+                try:
+                    from llama_index.embeddings.huggingface.utils import get_query_instruct_for_model_name
+                    instruction = get_query_instruct_for_model_name(hf_model.model_name)
+                except ImportError:
+                    instruction = None
+            return encoder.encode(
+                list(queries),
+                prompt=instruction or None,
+                batch_size=self.embedding_model.batch_size,
+                normalize_embeddings=getattr(hf_model, "normalize", True),
+                convert_to_numpy=True
+            )
+        return [hf_model.get_query_embedding(q) for q in queries]
+
+    @property
+    def embed_model(self):
+        """llama_index 使用的嵌入模型（首次访问时配置全局 Settings）"""
+        if self._embed_model is None:
+            with self._lock:
+                if self._embed_model is None:
+                    self._setup_settings()
+        return self._embed_model
 
     def _setup_settings(self):
         """
         仅配置向量化模型，显式关闭 LLM
         """
-        self.local_model_path = r"E:\embeddingmodel\bge-base-zh" 
-        
-        Settings.embed_model = HuggingFaceEmbedding(
-            model_name=self.local_model_path,
-            trust_remote_code=True
-        )
+        with startup_timer.measure("llama_index", "import"):
+            from llama_index.core import Settings
+            from llama_index.core.llms import MockLLM
+            from retrieval_strategies.cached_embedding import CachedEmbedding
+
+        # 套一层去重 + 内存/磁盘缓存，重复入库或重跑批处理时不重新计算已知文本的向量
+        embed_model = CachedEmbedding(self.embedding_model)
+        Settings.embed_model = embed_model
 
         # 明确关闭 LLM，防止 llamaindex 任何隐式调用
         Settings.llm = MockLLM()
+        self._embed_model = embed_model
+
+    @property
+    def client(self):
+        """Qdrant 客户端（本地持久化模式），首次访问时打开"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    with startup_timer.measure("qdrant", "import"):
+                        import qdrant_client
+                    with startup_timer.measure("qdrant", "init"):
+                        self._client = qdrant_client.QdrantClient(
+                            path=self.storage_path
+                        )
+        return self._client
+
+    @property
+    def vector_store(self):
+        if self._vector_store is None:
+            client = self.client
+            with self._lock:
+                if self._vector_store is None:
+                    with startup_timer.measure("llama_index", "import"):
+                        from llama_index.vector_stores.qdrant import QdrantVectorStore
+                    self._vector_store = QdrantVectorStore(
+                        client=client,
+                        collection_name=self.collection_name
+                    )
+        return self._vector_store
+
+    def get_vector_store(self, collection_name: str = None):
+        """指定集合的 QdrantVectorStore，默认（或与规则集合同名时）返回规则集合的 vector_store"""
+        if collection_name is None or collection_name == self.collection_name:
+            return self.vector_store
+        client = self.client
+        with startup_timer.measure("llama_index", "import"):
+            from llama_index.vector_stores.qdrant import QdrantVectorStore
+        return QdrantVectorStore(client=client, collection_name=collection_name)
 
     def get_storage_context(self):
         """
         返回 Qdrant 存储上下文
         """
+        from llama_index.core import StorageContext
+        # 入库时 llama_index 从全局 Settings 取嵌入模型，先确保已配置
+        self.embed_model
         return StorageContext.from_defaults(
             vector_store=self.vector_store
         )
+
+    def warmup(self) -> None:
+        """一次性完成全部初始化（导入、加载嵌入模型、打开向量库），供常驻服务启动时调用"""
+        self.embed_model
+        self.vector_store
+        self._get_hf_model()
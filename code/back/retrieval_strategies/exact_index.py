@@ -0,0 +1,128 @@
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from retrieval_strategies.payload_filter import Filters, PayloadFieldIndex
+
+
+class ExactVectorIndex:
+    """
+    精确向量检索（暴力余弦相似度）
+    所有向量 L2 归一化后按行存放在一个连续矩阵中（float32，可选 float16 以减半内存），
+    单条查询是一次矩阵-向量乘，多条查询是一次矩阵-矩阵乘；
+    规则库只有几条到几千条时，比经由 llama_index + Qdrant 本地文件检索快得多，且结果精确；
+    带 payload 过滤条件时只对满足条件的行打分
+    """
+
+    # float16 矩阵分块转回 float32 计算，避免 numpy 对 float16 走非 BLAS 的慢路径
+    FLOAT16_BLOCK_ROWS = 4096
+
+    def __init__(self, vectors: np.ndarray, ids: Sequence[str], payloads: Sequence[Dict[str, Any]],
+                 dtype: Any = np.float32):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(ids) or len(ids) != len(payloads):
+            raise ValueError("向量、id 与 payload 的数量不一致")
+        self.dtype = np.dtype(dtype)
+        self.ids = list(ids)
+        self.payloads = list(payloads)
+        self._matrix = np.ascontiguousarray(self._normalize(vectors), dtype=self.dtype)
+        self._payload_index = PayloadFieldIndex(self.payloads)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self._matrix.shape[1]
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.where(norms == 0, 1.0, norms)
+
+    @classmethod
+    def from_qdrant(cls, client, collection_name: str, dtype: Any = np.float32,
+                    page_size: int = 256) -> "ExactVectorIndex":
+        """从 Qdrant 集合中读出全部向量与 payload 构建索引"""
+        ids, vectors, payloads = [], [], []
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                limit=page_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            for p in points:
+                ids.append(str(p.id))
+                vectors.append(p.vector)
+                payloads.append(p.payload or {})
+            if offset is None:
+                break
+        if not vectors:
+            return cls(np.zeros((0, 0), dtype=np.float32), [], [], dtype=dtype)
+        return cls(np.asarray(vectors, dtype=np.float32), ids, payloads, dtype=dtype)
+
+    @staticmethod
+    def payload_text(payload: Dict[str, Any]) -> str:
+        """llama_index 写入 Qdrant 的节点正文保存在 _node_content 的 text 字段中"""
+        content = payload.get("_node_content")
+        if not content:
+            return ""
+        try:
+            return json.loads(content).get("text", "")
+        except (TypeError, ValueError):
+            return ""
+
+    # ---- 检索 ----
+
+    def _scores(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """queries: (m, dim) 归一化查询矩阵 -> (m, n) 余弦相似度；给出 rows 时只计算这些行"""
+        matrix = self._matrix if rows is None else self._matrix[rows]
+        if self.dtype == np.float32:
+            return queries @ matrix.T
+        scores = np.empty((len(queries), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), self.FLOAT16_BLOCK_ROWS):
+            block = matrix[start:start + self.FLOAT16_BLOCK_ROWS].astype(np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        return scores
+
+    def _top_k(self, scores: np.ndarray, top_k: int, min_score: Optional[float],
+               rows: Optional[np.ndarray] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return []
+        idx = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        idx = idx[np.argsort(-scores[idx], kind="stable")]
+        return [
+            (self.ids[row], float(scores[i]), self.payloads[row])
+            for i, row in ((i, i if rows is None else rows[i]) for i in idx)
+            if min_score is None or scores[i] >= min_score
+        ]
+
+    def search(self, query_vector: np.ndarray, top_k: int = 3, min_score: Optional[float] = None,
+               filters: Optional[Filters] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        Returns:
+            [(id, 余弦相似度, payload), ...]，按相似度降序
+        """
+        return self.search_batch(np.asarray(query_vector, dtype=np.float32)[None, :], top_k, min_score, filters)[0]
+
+    def search_batch(self, query_vectors: np.ndarray, top_k: int = 3, min_score: Optional[float] = None,
+                     filters: Optional[Filters] = None) -> List[List[Tuple[str, float, Dict[str, Any]]]]:
+        """
+        多条查询一次矩阵乘完成，返回与 query_vectors 行顺序一致的结果列表
+        Args:
+            filters: payload 过滤条件 {字段: 取值或取值列表}，先由 payload 倒排选出候选行再打分
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        if len(self) == 0:
+            return [[] for _ in range(len(queries))]
+        if queries.shape[1] != self.dim:
+            raise ValueError(f"查询向量维度 {queries.shape[1]} 与索引维度 {self.dim} 不一致")
+        mask = self._payload_index.mask(filters)
+        rows = None if mask is None else np.flatnonzero(mask)
+        if rows is not None and rows.size == 0:
+            return [[] for _ in range(len(queries))]
+        scores = self._scores(self._normalize(queries), rows)
+        return [self._top_k(row, top_k, min_score, rows) for row in scores]
@@ -1,9 +1,11 @@
 from typing import Dict, List, Any, Optional
-import time
+from concurrent.futures import ThreadPoolExecutor, wait
 import threading
-from retrieval_strategy import RetrievalStrategy
-from semantic_retrieval import SemanticRetrievalStrategy
-from keyword_retrieval import KeywordRetrievalStrategy
+from core_abstract.ttl_cache import LRUTTLCache
+from retrieval_strategies.payload_filter import filters_key
+from retrieval_strategies.retrieval_strategy import RetrievalStrategy
+from retrieval_strategies.semantic_retrieval import SemanticRetrievalStrategy
+from retrieval_strategies.keyword_retrieval import KeywordRetrievalStrategy
 
 
 class HybridRetrievalStrategy(RetrievalStrategy):
@@ -16,16 +18,28 @@ class HybridRetrievalStrategy(RetrievalStrategy):
                 - semantic_weight: 语义检索结果权重（0-1）
                 - keyword_weight: 关键词检索结果权重（0-1）
                 - top_k: 最终返回的top-k结果数量
-                - relevancy_threshold: 最低相关性阈值
+                - relevancy_threshold: 最低相关性阈值，作用于各路归一化后的单条分数（加权之前）
                 - semantic_strategy_config: 语义检索子策略配置
                 - keyword_strategy_config: 关键词检索子策略配置
                 - cache_enabled: 是否启用缓存
                 - cache_ttl: 缓存过期时间（秒）
+                - cache_max_entries / cache_max_bytes: 缓存条目数 / 字节数上限
+                - fusion: 融合方式，"weighted"（加权归一化分数，默认）或 "rrf"（加权倒数排名融合）
+                - rrf_k: RRF 平滑常数，默认 60
+                - keyword_score_scale: BM25 分数的固定归一化尺度，分数等于该值时归一化为 0.5，默认 3.0
+                - latency_budget: 单次检索的时间预算（秒），超时未返回的子策略结果被丢弃，None 表示不限；
+                  首次检索前先 warmup（加载嵌入模型），模型加载不计入预算
         """
         self.semantic_weight = config.get("semantic_weight", 0.7)
         self.keyword_weight = config.get("keyword_weight", 0.3)
         self.top_k = config.get("top_k", 10)
         self.relevancy_threshold = config.get("relevancy_threshold", 0.3)
+        self.fusion = config.get("fusion", "weighted")
+        self.rrf_k = config.get("rrf_k", 60)
+        self.keyword_score_scale = config.get("keyword_score_scale", 3.0)
+        self.latency_budget = config.get("latency_budget", 0.5)
+        if self.fusion not in ("weighted", "rrf"):
+            raise ValueError(f"不支持的融合方式: {self.fusion}")
         
         # 初始化子策略
         self.semantic_strategy = SemanticRetrievalStrategy(
@@ -38,61 +52,135 @@ class HybridRetrievalStrategy(RetrievalStrategy):
         # 缓存相关属性
         self.cache_enabled = config.get("cache_enabled", True)
         self.cache_ttl = config.get("cache_ttl", 3600)
-        self._cache: Dict[str, List[Dict[str, Any]]] = {}
-        self._cache_times: Dict[str, float] = {}
+        self._cache = LRUTTLCache(
+            max_entries=config.get("cache_max_entries", 1024),
+            max_bytes=config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
+
+        # 两个子策略并行执行；超时的子任务继续在线程池中跑完，但结果不再等待
+        self._executor = ThreadPoolExecutor(max_workers=config.get("max_workers", 4),
+                                            thread_name_prefix="hybrid-retrieval")
+        self._timeouts = {"semantic": 0, "keyword": 0}
         self._lock = threading.Lock()
+        self._warmed = False
+
+    def warmup(self) -> None:
+        """预先加载子策略依赖的模型，避免首次检索因模型加载超出时间预算而丢掉语义结果"""
+        with self._lock:
+            if self._warmed:
+                return
+            self.semantic_strategy.warmup()
+            self._warmed = True
 
     def retrieve(self, query: str, context: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """执行混合检索（框架实现，具体逻辑待补充）"""
-        # 1. 检查缓存
-        cache_key = self._get_cache_key(query, context.get("domain"))
+        """执行混合检索：两个子策略并行执行，在时间预算内收集结果后融合"""
+        # 1. 检查缓存（context 中的 domain / filters 原样交给两个子策略，各自在检索内部过滤）
+        cache_key = self._get_cache_key(query, self.get_filters(context), context.get("top_k"))
         if self.cache_enabled:
             cached_result = self._get_cached_results(cache_key)
             if cached_result is not None:
                 return cached_result
         
-        # 2. 分别执行子策略检索
-        semantic_results = self.semantic_strategy.retrieve(query, context)
-        keyword_results = self.keyword_strategy.retrieve(query, context)
+        # 2. 并行执行子策略检索，耗时约为两者中的较大值（模型加载在计时之前完成）
+        if not self._warmed:
+            self.warmup()
+        futures = {
+            "semantic": self._executor.submit(self.semantic_strategy.retrieve, query, context),
+            "keyword": self._executor.submit(self.keyword_strategy.retrieve, query, context)
+        }
+        wait(futures.values(), timeout=self.latency_budget)
+        arrived: Dict[str, List[Dict[str, Any]]] = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                with self._lock:
+                    self._timeouts[name] += 1
+                print(f"[混合检索] {name} 检索超出时间预算 {self.latency_budget}s，本次结果已忽略")
+                continue
+            try:
+                arrived[name] = future.result()
+            except Exception as e:
+                print(f"[混合检索] {name} 检索失败: {e}")
         
-        # 3. 融合结果（待实现）
-        # 此处仅为框架，实际需基于权重融合分数并排序
-        fused_results = self._fuse_results(semantic_results, keyword_results)
+        # 3. 融合结果
+        fused_results = self._fuse_results(arrived.get("semantic"), arrived.get("keyword"))
         
-        # 4. 缓存结果
-        if self.cache_enabled:
+        # 4. 缓存结果（只缓存两路都按时返回的完整结果）
+        if self.cache_enabled and len(arrived) == len(futures):
             self._set_cached_results(cache_key, fused_results)
         
         return fused_results
 
-    def _fuse_results(self, semantic_results: List[Dict], keyword_results: List[Dict]) -> List[Dict]:
-        """融合语义检索和关键词检索结果（待实现）"""
-        # 示例逻辑框架：合并结果并按加权分数排序
-        fused = []
-        # ... 实际融合逻辑 ...
-        return fused[:self.top_k]  # 截断到top_k
+    @staticmethod
+    def _doc_key(result: Dict[str, Any]) -> str:
+        """同一文档在两路结果中的标识"""
+        return str(result.get("id") or result.get("rule_name") or result.get("full_text") or result.get("text"))
 
-    def _get_cache_key(self, query: str, domain: Optional[str] = None) -> str:
-        """生成缓存键"""
-        return f"{domain}:{query}" if domain else query
+    def _normalize(self, name: str, score: Optional[float]) -> float:
+        """
+        按固定尺度归一化到 [0, 1]，不依赖本次结果中的最高/最低分：
+        语义分数为余弦相似度，截断到 [0, 1]；BM25 分数无上界，按 s / (s + keyword_score_scale) 压缩
+        """
+        score = float(score or 0.0)
+        if name == "semantic":
+            return min(max(score, 0.0), 1.0)
+        score = max(score, 0.0)
+        return score / (score + self.keyword_score_scale) if self.keyword_score_scale > 0 else 1.0
+
+    def _fuse_results(self, semantic_results: Optional[List[Dict]], keyword_results: Optional[List[Dict]]) -> List[Dict]:
+        """
+        融合语义检索和关键词检索结果
+        - weighted：各路分数按固定尺度归一化后按 semantic_weight/keyword_weight 加权求和
+        - rrf：按 权重 / (rrf_k + 排名) 累加，不依赖两路分数的量纲
+        两种方式都先丢弃归一化分数低于 relevancy_threshold 的单条结果再加权，
+        因此只被一路检索到的高相关文档不会因另一路权重缺席而被阈值滤掉；
+        某一路未按时返回（None）时，权重在已返回的各路之间重新归一化
+        """
+        sides = [
+            ("semantic", semantic_results, self.semantic_weight),
+            ("keyword", keyword_results, self.keyword_weight)
+        ]
+        sides = [(name, results, weight) for name, results, weight in sides if results is not None]
+        total_weight = sum(weight for _, _, weight in sides) or 1.0
+
+        fused: Dict[str, Dict[str, Any]] = {}
+        for name, results, weight in sides:
+            if not results:
+                continue
+            weight /= total_weight
+            for rank, result in enumerate(results, start=1):
+                normalized = self._normalize(name, result.get("score"))
+                if normalized < self.relevancy_threshold:
+                    continue
+                key = self._doc_key(result)
+                if key not in fused:
+                    fused[key] = {**result, "score": 0.0}
+                entry = fused[key]
+                entry[f"{name}_score"] = result.get("score")
+                if self.fusion == "weighted":
+                    entry["score"] += weight * normalized
+                else:
+                    entry["score"] += weight / (self.rrf_k + rank)
+
+        ranked = sorted(fused.values(), key=lambda r: r["score"], reverse=True)
+        return ranked[:self.top_k]  # 截断到top_k
+
+    def _get_cache_key(self, query: str, filters: Optional[Dict[str, Any]] = None,
+                       top_k: Optional[int] = None) -> str:
+        """生成缓存键（结合查询、过滤条件与 context 中的 top_k，domain 已包含在过滤条件中；
+        context 原样传给子策略，top_k 决定关键词检索的候选深度）"""
+        key = filters_key(filters)
+        query = f"{top_k}:{query}" if top_k is not None else query
+        return f"{key}:{query}" if key else query
 
     def _get_cached_results(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
-        """获取缓存结果（带过期检查）"""
-        with self._lock:
-            if cache_key in self._cache:
-                cache_time = self._cache_times[cache_key]
-                if time.time() - cache_time < self.cache_ttl:
-                    return self._cache[cache_key]
-                # 清理过期缓存
-                del self._cache[cache_key]
-                del self._cache_times[cache_key]
-        return None
+        """获取缓存结果（过期与淘汰由 LRUTTLCache 处理）"""
+        return self._cache.get(cache_key)
 
     def _set_cached_results(self, cache_key: str, results: List[Dict[str, Any]]) -> None:
         """设置缓存结果"""
-        with self._lock:
-            self._cache[cache_key] = results
-            self._cache_times[cache_key] = time.time()
+        self._cache.set(cache_key, results)
 
     def get_strategy_info(self) -> Dict[str, Any]:
         """返回策略配置信息（包含子策略信息）"""
@@ -102,8 +190,14 @@ class HybridRetrievalStrategy(RetrievalStrategy):
             "keyword_weight": self.keyword_weight,
             "top_k": self.top_k,
             "relevancy_threshold": self.relevancy_threshold,
+            "fusion": self.fusion,
+            "rrf_k": self.rrf_k,
+            "keyword_score_scale": self.keyword_score_scale,
+            "latency_budget": self.latency_budget,
+            "timeouts": dict(self._timeouts),
             "semantic_strategy": self.semantic_strategy.get_strategy_info(),
             "keyword_strategy": self.keyword_strategy.get_strategy_info(),
             "cache_enabled": self.cache_enabled,
-            "cache_ttl": self.cache_ttl
+            "cache_ttl": self.cache_ttl,
+            "cache_stats": self._cache.stats()
         }
\ No newline at end of file
@@ -1,28 +1,226 @@
+import hashlib
 import json
-from llama_index.core import VectorStoreIndex, Document
-from llama_index.readers.file import PandasCSVReader
+import os
+import queue
+import threading
+import time
+import uuid
+import warnings
+from llama_index.core.schema import TextNode
+from retrieval_strategies.payload_filter import FILTER_FIELDS
+from tool_chain.data_loader import data_loader
+
+# 规则点 id = uuid5(命名空间, rule_name)，同名规则在任何一次入库中都落到同一个点上
+RULE_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "risk_rules")
+# CSV 行点 id = uuid5(命名空间, 文件绝对路径#行号)
+ROW_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "applicant_rows")
 
 class DataIngestor:
     def __init__(self, config):
         self.config = config
 
-    def ingest_csv(self, file_path):
-        """处理 CSV 用户数据"""
-        print(f"正在读取文件并进行向量化: {file_path}...")
-        reader = PandasCSVReader()
-        documents = reader.load_data(file_path=file_path)
-        
-        storage_context = self.config.get_storage_context()
-        index = VectorStoreIndex.from_documents(
-            documents, 
-            storage_context=storage_context
+    # 流水线各阶段之间队列中的结束标记
+    _DONE = object()
+
+    def ingest_csv(self, file_path, batch_size=256, embed_workers=2, queue_size=4, report_every=5.0,
+                   collection_name=None):
+        """
+        流式处理 CSV 用户数据：三段流水线
+          解析线程（按块读取 CSV，每行一个节点） -> 向量化线程池（分批计算向量） -> 当前线程（分批 upsert 到 Qdrant）
+        各段之间用有界队列连接，下游跟不上时上游阻塞等待，内存占用只与 batch_size * queue_size 有关；
+        点 id 由文件路径与行号确定，重复入库同一文件是幂等的；
+        申请人行写入 config.applicant_collection_name，不与规则混在同一集合，DataRetriever 检索规则时不会返回它们
+        Args:
+            batch_size: 每批行数（同时是向量化与 upsert 的批大小）
+            embed_workers: 向量化线程数
+            queue_size: 每个队列最多缓存的批数
+            report_every: 进度输出间隔（秒）
+            collection_name: 目标集合，默认 config.applicant_collection_name
+        Returns:
+            {"rows": 写入行数, "seconds": 耗时, "rows_per_sec": 吞吐}
+        """
+        collection_name = collection_name or self.config.applicant_collection_name
+        if collection_name == self.config.collection_name:
+            raise ValueError(f"申请人数据不能写入规则集合: {collection_name}")
+        vector_store = self.config.get_vector_store(collection_name)
+        print(f"正在流式读取文件并进行向量化: {file_path} -> {collection_name}...")
+        parsed = queue.Queue(maxsize=queue_size)
+        embedded = queue.Queue(maxsize=queue_size)
+        stop = threading.Event()
+        errors = []
+        counters = {"parsed": 0, "embedded": 0}
+        counter_lock = threading.Lock()
+        source = os.path.abspath(file_path)
+
+        def put(q, item):
+            """可被 stop 打断的阻塞 put，下游出错时上游不会永远卡在满队列上"""
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def parse():
+            try:
+                row_index = 0
+                for chunk in data_loader(file_path, use_store=False).iter_chunks(file_path, batch_size=batch_size):
+                    columns = list(chunk.columns)
+                    batch = []
+                    for values in chunk.itertuples(index=False, name=None):
+                        text = ", ".join(f"{col}: {val}" for col, val in zip(columns, values) if val != "")
+                        batch.append((self.row_id(source, row_index), text, {"source": source, "row": row_index}))
+                        row_index += 1
+                    if not put(parsed, batch):
+                        return
+                    with counter_lock:
+                        counters["parsed"] += len(batch)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                for _ in range(embed_workers):
+                    put(parsed, self._DONE)
+
+        def embed():
+            try:
+                while not stop.is_set():
+                    try:
+                        batch = parsed.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+                    if batch is self._DONE:
+                        break
+                    vectors = self.config.embedding_model.embed([text for _, text, _ in batch])
+                    if not put(embedded, (batch, vectors)):
+                        return
+                    with counter_lock:
+                        counters["embedded"] += len(batch)
+            except Exception as e:
+                errors.append(e)
+                stop.set()
+            finally:
+                put(embedded, self._DONE)
+
+        threads = [threading.Thread(target=parse, name="ingest-parse", daemon=True)]
+        threads += [threading.Thread(target=embed, name=f"ingest-embed-{i}", daemon=True) for i in range(embed_workers)]
+        for t in threads:
+            t.start()
+
+        # 当前线程负责写入：所有向量化线程都结束后退出
+        written = finished = 0
+        started = last_report = time.perf_counter()
+        try:
+            while finished < embed_workers and not stop.is_set():
+                try:
+                    item = embedded.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is self._DONE:
+                    finished += 1
+                    continue
+                batch, vectors = item
+                vector_store.add([
+                    TextNode(id_=point_id, text=text, metadata=metadata, embedding=vector.tolist())
+                    for (point_id, text, metadata), vector in zip(batch, vectors)
+                ])
+                written += len(batch)
+                now = time.perf_counter()
+                if now - last_report >= report_every:
+                    last_report = now
+                    print(f"[CSV 入库] 已解析 {counters['parsed']} 行，已向量化 {counters['embedded']} 行，"
+                          f"已写入 {written} 行，{written / (now - started):.1f} 行/秒")
+        finally:
+            stop.set()
+            for t in threads:
+                t.join()
+        if errors:
+            raise errors[0]
+
+        seconds = time.perf_counter() - started
+        summary = {"rows": written, "seconds": seconds, "rows_per_sec": written / seconds if seconds else 0.0}
+        print(f"CSV 数据入库成功！共处理 {written} 条数据，耗时 {seconds:.1f} 秒，"
+              f"{summary['rows_per_sec']:.1f} 行/秒。")
+        return summary
+
+    @staticmethod
+    def row_id(source, row_index):
+        return str(uuid.uuid5(ROW_ID_NAMESPACE, f"{source}#{row_index}"))
+
+    @staticmethod
+    def rule_text(rule):
+        """构建语义文本：将 JSON 字段拼接成一段自然语言，便于向量检索匹配"""
+        return (
+            f"规则名称: {rule.get('rule_name')}\n"
+            f"风险判定: {rule.get('risk_verdict')}\n"
+            f"逻辑表达式: {rule.get('logic_expression')}"
         )
-        print(f"CSV 数据入库成功！共处理 {len(documents)} 条数据。")
-        return index
+
+    @staticmethod
+    def rule_id(rule_name):
+        return str(uuid.uuid5(RULE_ID_NAMESPACE, rule_name))
+
+    @staticmethod
+    def content_hash(text, metadata):
+        raw = json.dumps({"text": text, "metadata": metadata}, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def ensure_payload_indexes(self):
+        """
+        为 risk_verdict / domain / rule_version 建立 keyword 类型的 payload 索引（已存在时 Qdrant 直接返回），
+        带过滤条件的检索由索引先选出候选点，而不是检索后再在 Python 中筛选；
+        本地文件模式不支持 payload 索引（小集合走内存精确检索，同样在打分前过滤），这里忽略其提示
+        """
+        client = self.config.client
+        if not client.collection_exists(self.config.collection_name):
+            return
+        from qdrant_client.http.models import PayloadSchemaType
+        with warnings.catch_warnings():
+            warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+            for field in FILTER_FIELDS:
+                client.create_payload_index(
+                    collection_name=self.config.collection_name,
+                    field_name=field,
+                    field_schema=PayloadSchemaType.KEYWORD
+                )
+
+    def manifest_path(self):
+        """清单文件与 Qdrant 本地存储放在一起"""
+        return os.path.join(self.config.storage_path, f"{self.config.collection_name}.manifest.json")
+
+    def _stored_hashes(self):
+        """
+        读取集合中现有规则点的 id -> content_hash（旧版全量入库的点没有 content_hash，记为 None）
+        没有 rule_name 的点（如旧版 ingest_csv 写入规则集合的申请人数据）不属于规则，不参与比对和删除
+        """
+        client = self.config.client
+        if not client.collection_exists(self.config.collection_name):
+            return {}
+        stored, offset = {}, None
+        while True:
+            points, offset = client.scroll(
+                collection_name=self.config.collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=["content_hash", "rule_name"],
+                with_vectors=False
+            )
+            for p in points:
+                payload = p.payload or {}
+                if payload.get("rule_name") is not None:
+                    stored[str(p.id)] = payload.get("content_hash")
+            if offset is None:
+                break
+        return stored
 
     def ingest_rules(self, file_path):
         """
-        专门处理 rule.json 规则文件
+        专门处理 rule.json 规则文件（增量、幂等）
+        以 rule_name 确定点 id、以规则内容哈希判断是否变化：
+        只对新增或修改过的规则计算向量并 upsert，删除文件中已不存在的规则，最后写入入库清单
+        Returns:
+            {"added": [...], "updated": [...], "deleted": n, "unchanged": n}
         """
         print(f"正在解析规则文件: {file_path}...")
         
@@ -32,37 +230,85 @@ class DataIngestor:
                 data = json.load(f)
                 
             rules_list = data.get("rules", [])
-            documents = []
-            
+            desired = {}
             for rule in rules_list:
-                # 2. 构建语义文本：将 JSON 字段提取出来拼接成一段自然语言，便于向量检索匹配
-                text_content = (
-                    f"规则名称: {rule.get('rule_name')}\n"
-                    f"风险判定: {rule.get('risk_verdict')}\n"
-                    f"逻辑表达式: {rule.get('logic_expression')}"
-                )
-                
-                # 3. 构建元数据：保留结构化信息，方便后续在检索结果中直接引用字段
+                # 2. 构建元数据：保留结构化信息，方便后续在检索结果中直接引用字段
                 metadata = {
                     "rule_name": rule.get("rule_name"),
                     "logic_expression": rule.get("logic_expression"),
                     "risk_verdict": rule.get("risk_verdict")
                 }
-                
-                # 4. 封装为 LlamaIndex 的 Document 对象
-                doc = Document(text=text_content, metadata=metadata)
-                documents.append(doc)
-
-            # 5. 调用 config 获取 Qdrant 存储上下文并构建索引
-            storage_context = self.config.get_storage_context()
-            index = VectorStoreIndex.from_documents(
-                documents,
-                storage_context=storage_context
-            )
-            print(f"规则库构建成功！已成功将 {len(documents)} 条规则存入 Qdrant。")
-            return index
+                # 可选的过滤字段（产品线、规则版本）只在规则中给出时写入，未使用它们的规则内容哈希不变
+                for field in ("domain", "rule_version"):
+                    if rule.get(field) is not None:
+                        metadata[field] = rule[field]
+                if not metadata["rule_name"]:
+                    print(f"[警告] 规则缺少 rule_name，已跳过: {rule}")
+                    continue
+                point_id = self.rule_id(metadata["rule_name"])
+                if point_id in desired:
+                    print(f"[警告] 规则名称重复，以后出现的为准: {metadata['rule_name']}")
+                text_content = self.rule_text(rule)
+                desired[point_id] = (text_content, metadata, self.content_hash(text_content, metadata))
+
+            # 3. 与向量库现状比对
+            stored = self._stored_hashes()
+            changed = [pid for pid, (_, _, h) in desired.items() if stored.get(pid) != h]
+            removed = [pid for pid in stored if pid not in desired]
+
+            # 4. 只为新增/修改的规则计算向量（经过嵌入缓存），以固定 id upsert
+            if changed:
+                texts = [desired[pid][0] for pid in changed]
+                vectors = self.config.embedding_model.embed(texts)
+                nodes = []
+                for pid, vector in zip(changed, vectors):
+                    text_content, metadata, content_hash = desired[pid]
+                    nodes.append(TextNode(
+                        id_=pid,
+                        text=text_content,
+                        metadata={**metadata, "content_hash": content_hash},
+                        excluded_embed_metadata_keys=["content_hash"],
+                        excluded_llm_metadata_keys=["content_hash"],
+                        embedding=vector.tolist()
+                    ))
+                self.config.vector_store.add(nodes)
+
+            # 5. 删除文件中已不存在的规则（含旧版全量入库留下的重复点）
+            if removed:
+                from qdrant_client.http.models import PointIdsList
+                self.config.client.delete(
+                    collection_name=self.config.collection_name,
+                    points_selector=PointIdsList(points=removed)
+                )
+
+            # 6. 为过滤字段建立 payload 索引
+            self.ensure_payload_indexes()
+
+            # 7. 记录入库清单
+            manifest = {
+                "collection_name": self.config.collection_name,
+                "rule_file": os.path.abspath(file_path),
+                "updated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "rules": {
+                    metadata["rule_name"]: {"id": pid, "content_hash": content_hash}
+                    for pid, (_, metadata, content_hash) in desired.items()
+                }
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path())), exist_ok=True)
+            with open(self.manifest_path(), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+            summary = {
+                "added": [desired[pid][1]["rule_name"] for pid in changed if pid not in stored],
+                "updated": [desired[pid][1]["rule_name"] for pid in changed if pid in stored],
+                "deleted": len(removed),
+                "unchanged": len(desired) - len(changed)
+            }
+            print(f"规则库同步完成：新增 {len(summary['added'])} 条，更新 {len(summary['updated'])} 条，"
+                  f"删除 {summary['deleted']} 条，未变化 {summary['unchanged']} 条。")
+            return summary
             
         except json.JSONDecodeError:
             print("错误：rule.json 格式非法，请检查括号或引号。")
         except Exception as e:
-            print(f"入库过程中发生错误: {e}")
\ No newline at end of file
+            print(f"入库过程中发生错误: {e}")
@@ -1,4 +1,13 @@
-from config import RAGConfig
+import argparse
+import json
+import os
+import time
+import numpy as np
+from retrieval_strategies.config import RAGConfig
+
+# 各向量数据类型每个分量的字节数（未设置 datatype 时 Qdrant 按 float32 存储）
+DATATYPE_BYTES = {"float32": 4, "float16": 2, "uint8": 1}
+
 #查看向量库中所有内容
 def fetch_all_rules():
     config = RAGConfig()
@@ -35,12 +44,282 @@ def fetch_all_rules():
     return results
 
 
+def _value(v):
+    """枚举取 value，其余原样返回"""
+    return getattr(v, "value", v)
+
+
+def _dump(model):
+    """pydantic 配置对象 -> dict（None 原样返回）"""
+    if model is None:
+        return None
+    return model.model_dump(exclude_none=True) if hasattr(model, "model_dump") else model.dict(exclude_none=True)
+
+
+def _json_bytes(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+def _distribution(sizes):
+    if not sizes:
+        return {"count": 0}
+    arr = np.asarray(sizes)
+    return {
+        "count": len(sizes),
+        "total": float(arr.sum()),
+        "min": float(arr.min()),
+        "p50": float(np.percentile(arr, 50)),
+        "p95": float(np.percentile(arr, 95)),
+        "max": float(arr.max())
+    }
+
+
+def _vector_layout(info):
+    """每个（命名）向量的维度、距离、数据类型、存储位置与估算的内存占用"""
+    vectors = info.config.params.vectors
+    named = vectors if isinstance(vectors, dict) else {"": vectors}
+    points = info.points_count or 0
+    layout = {}
+    for name, params in named.items():
+        dtype = str(_value(params.datatype) or "float32")
+        vector_bytes = params.size * DATATYPE_BYTES.get(dtype, 4)
+        quantization = _dump(params.quantization_config or info.config.quantization_config)
+        layout[name or "default"] = {
+            "dim": params.size,
+            "distance": _value(params.distance),
+            "datatype": dtype,
+            "on_disk": bool(params.on_disk),
+            "vector_bytes": vector_bytes,
+            "raw_bytes": points * vector_bytes,
+            "quantization": quantization,
+            "quantized_bytes": _quantized_bytes(quantization, params.size, points)
+        }
+    return layout
+
+
+def _quantized_bytes(quantization, dim, points):
+    """量化后向量的常驻内存估算：scalar 每分量 1 字节，binary 每分量 1 位，product 按压缩比"""
+    if not quantization:
+        return None
+    if "scalar" in quantization:
+        return points * dim
+    if "binary" in quantization:
+        return points * ((dim + 7) // 8)
+    if "product" in quantization:
+        ratio = int(str(_value(quantization["product"].get("compression", "x16"))).lstrip("x"))
+        return points * dim * 4 // ratio
+    return None
+
+
+def _disk_layout(storage_path, collection_name):
+    """
+    本地模式下统计集合目录的文件布局（按一级子目录汇总）；
+    服务端模式的数据在服务器上，这里返回 None
+    """
+    root = os.path.join(storage_path, "collection", collection_name) if storage_path else None
+    if not root or not os.path.isdir(root):
+        return None
+    groups, total = {}, 0
+    for dirpath, _, files in os.walk(root):
+        rel = os.path.relpath(dirpath, root)
+        group = rel.split(os.sep)[0] if rel != "." else "."
+        for name in files:
+            size = os.path.getsize(os.path.join(dirpath, name))
+            key = name if group == "." else group
+            entry = groups.setdefault(key, {"files": 0, "bytes": 0})
+            entry["files"] += 1
+            entry["bytes"] += size
+            total += size
+    return {"path": root, "bytes": total, "layout": groups}
+
+
+def _payload_profile(client, collection_name, max_points):
+    """
+    扫描至多 max_points 个点的 payload：整体大小分布、各字段字节占比，
+    以及 llama_index 的 _node_content 中与顶层字段重复存储的字节数和节点正文（完整规则文本）的字节数
+    """
+    sizes, field_bytes, duplicated, text_bytes, offset, scanned = [], {}, 0, 0, None, 0
+    while scanned < max_points:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=min(256, max_points - scanned),
+            offset=offset,
+            with_payload=True,
+            with_vectors=False
+        )
+        for p in points:
+            payload = p.payload or {}
+            sizes.append(_json_bytes(payload))
+            for key, value in payload.items():
+                field_bytes[key] = field_bytes.get(key, 0) + _json_bytes(value)
+            content = payload.get("_node_content")
+            if content:
+                try:
+                    node = json.loads(content)
+                except (TypeError, ValueError):
+                    node = {}
+                text_bytes += _json_bytes(node.get("text", ""))
+                metadata = node.get("metadata") or {}
+                duplicated += sum(_json_bytes(v) for k, v in metadata.items() if payload.get(k) == v)
+        scanned += len(points)
+        if offset is None:
+            break
+    total = sum(sizes)
+    return {
+        "scanned_points": scanned,
+        "size": _distribution(sizes),
+        "fields": {
+            k: {"bytes": b, "share": b / total if total else 0.0}
+            for k, b in sorted(field_bytes.items(), key=lambda kv: -kv[1])
+        },
+        "duplicated_bytes": duplicated,
+        "duplicated_share": duplicated / total if total else 0.0,
+        "node_text_bytes": text_bytes,
+        "node_text_share": text_bytes / total if total else 0.0
+    }
+
+
+def _time_queries(client, collection_name, samples, top_k, warm_runs):
+    """
+    用集合中已有点的向量作为查询（无需加载嵌入模型）：
+    每条查询第一次执行计为冷查询，随后重复 warm_runs 次计为热查询
+    """
+    if samples <= 0:
+        return None
+    points, _ = client.scroll(collection_name=collection_name, limit=samples, with_payload=False, with_vectors=True)
+    cold, warm = [], []
+    for p in points:
+        vector = p.vector
+        using = None
+        if isinstance(vector, dict):
+            using, vector = next(iter(vector.items()))
+        for run in range(warm_runs + 1):
+            started = time.perf_counter()
+            client.query_points(collection_name=collection_name, query=vector, using=using,
+                                limit=top_k, with_payload=True)
+            (cold if run == 0 else warm).append((time.perf_counter() - started) * 1000)
+    return {"top_k": top_k, "cold_ms": _distribution(cold), "warm_ms": _distribution(warm)}
+
+
+def profile_collection(config, collection_name=None, max_payload_points=10000, query_samples=5,
+                       top_k=3, warm_runs=5):
+    """
+    集合容量画像，用于主机选型与发现 payload 膨胀
+    Returns:
+        点数 / 段数 / 向量布局与内存估算 / 索引参数 / 磁盘布局 / payload 分布 / 冷热查询耗时
+    """
+    started = time.perf_counter()
+    client = config.client
+    open_ms = (time.perf_counter() - started) * 1000
+    collection_name = collection_name or config.collection_name
+    info = client.get_collection(collection_name)
+    hnsw = _dump(info.config.hnsw_config) or {}
+    vectors = _vector_layout(info)
+    # HNSW 第 0 层每个点最多 2m 条边，每条边是 4 字节的点号
+    hnsw_bytes = (info.indexed_vectors_count or 0) * 2 * hnsw.get("m", 16) * 4
+
+    return {
+        "collection": collection_name,
+        "status": _value(info.status),
+        "points": info.points_count,
+        "indexed_vectors": info.indexed_vectors_count,
+        "segments": info.segments_count,
+        "vectors": vectors,
+        "memory_bytes_estimate": sum(v["quantized_bytes"] or v["raw_bytes"] for v in vectors.values()
+                                     if not v["on_disk"] or v["quantized_bytes"]) + hnsw_bytes,
+        "index": {
+            "type": "hnsw" if info.indexed_vectors_count else "plain (full scan)",
+            "hnsw": hnsw,
+            "hnsw_links_bytes_estimate": hnsw_bytes,
+            "indexing_threshold": info.config.optimizer_config.indexing_threshold,
+            "memmap_threshold": info.config.optimizer_config.memmap_threshold,
+            "on_disk_payload": info.config.params.on_disk_payload,
+            "payload_indexes": {k: _value(v.data_type) for k, v in (info.payload_schema or {}).items()}
+        },
+        "disk": _disk_layout(getattr(config, "storage_path", None), collection_name),
+        "payload": _payload_profile(client, collection_name, max_payload_points),
+        "queries": dict(_time_queries(client, collection_name, query_samples, top_k, warm_runs) or {},
+                        client_open_ms=open_ms)
+    }
+
+
+def _mb(n):
+    """字节数 -> 便于阅读的单位"""
+    if n is None:
+        return "-"
+    for unit in ("B", "KB", "MB"):
+        if abs(n) < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.2f} GB"
+
+
+def format_profile(p):
+    lines = [f"集合 {p['collection']}（{p['status']}）：{p['points']} 个点，{p['segments']} 个段，"
+             f"已建索引向量 {p['indexed_vectors']}"]
+    for name, v in p["vectors"].items():
+        lines.append(f"  向量 {name}: {v['dim']} 维 {v['datatype']} {v['distance']}，"
+                     f"{'磁盘' if v['on_disk'] else '内存'}，原始 {_mb(v['raw_bytes'])}，"
+                     f"量化 {v['quantization'] or '无'}（{_mb(v['quantized_bytes'])}）")
+    idx = p["index"]
+    lines.append(f"  索引: {idx['type']}，hnsw m={idx['hnsw'].get('m')} ef_construct={idx['hnsw'].get('ef_construct')} "
+                 f"full_scan_threshold={idx['hnsw'].get('full_scan_threshold')}，"
+                 f"indexing_threshold={idx['indexing_threshold']}，图估算 {_mb(idx['hnsw_links_bytes_estimate'])}")
+    lines.append(f"  payload 索引: {idx['payload_indexes'] or '无'}，on_disk_payload={idx['on_disk_payload']}")
+    lines.append(f"  常驻内存估算（向量 + 图）: {_mb(p['memory_bytes_estimate'])}")
+    if p["disk"]:
+        lines.append(f"  磁盘占用: {_mb(p['disk']['bytes'])}（{p['disk']['path']}）")
+        for name, entry in sorted(p["disk"]["layout"].items()):
+            lines.append(f"    {name:<24} {entry['files']:>5} 个文件 {_mb(entry['bytes']):>12}")
+    pl = p["payload"]
+    size = pl["size"]
+    if size["count"]:
+        lines.append(f"  payload（扫描 {pl['scanned_points']} 个点）: 合计 {_mb(size['total'])}，"
+                     f"单点 min/p50/p95/max = {size['min']:.0f}/{size['p50']:.0f}/{size['p95']:.0f}/{size['max']:.0f} 字节")
+        for key, f in pl["fields"].items():
+            lines.append(f"    {key:<24} {_mb(f['bytes']):>12} {f['share']:>7.1%}")
+        lines.append(f"    _node_content 中与顶层字段重复: {_mb(pl['duplicated_bytes'])}（{pl['duplicated_share']:.1%}），"
+                     f"其中节点正文: {_mb(pl['node_text_bytes'])}（{pl['node_text_share']:.1%}）")
+    q = p["queries"]
+    lines.append(f"  客户端打开: {q['client_open_ms']:.1f} ms")
+    if q.get("cold_ms", {}).get("count"):
+        lines.append(f"  查询 top_{q['top_k']}: 冷 p50 {q['cold_ms']['p50']:.2f} ms / max {q['cold_ms']['max']:.2f} ms，"
+                     f"热 p50 {q['warm_ms']['p50']:.2f} ms / p95 {q['warm_ms']['p95']:.2f} ms")
+    return "\n".join(lines)
+
+
+def profile_all(config, **kwargs):
+    """对存储中的每个集合做画像"""
+    return [profile_collection(config, c.name, **kwargs) for c in config.client.get_collections().collections]
+
+
 if __name__ == "__main__":
-    rules = fetch_all_rules()
-    print(f"向量库中共有 {len(rules)} 条规则：\n")
-
-    for r in rules:
-        print("规则名称:", r["rule_name"])
-        print("逻辑表达式:", r["logic_expression"])
-        print("风险判定:", r["risk_verdict"])
-        print("-" * 50)
+    parser = argparse.ArgumentParser(description="查看向量库内容或做集合容量画像")
+    parser.add_argument("--profile", action="store_true", help="输出集合画像而不是规则列表")
+    parser.add_argument("--all", action="store_true", help="画像存储中的全部集合")
+    parser.add_argument("--collection", default="risk_rules_collection")
+    parser.add_argument("--storage-path", default="./qdrant_storage")
+    parser.add_argument("--max-payload-points", type=int, default=10000, help="payload 统计最多扫描的点数")
+    parser.add_argument("--samples", type=int, default=5, help="计时用的查询条数")
+    parser.add_argument("--warm-runs", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出画像")
+    args = parser.parse_args()
+
+    if args.profile:
+        config = RAGConfig(collection_name=args.collection, storage_path=args.storage_path)
+        options = {"max_payload_points": args.max_payload_points, "query_samples": args.samples,
+                   "warm_runs": args.warm_runs}
+        profiles = profile_all(config, **options) if args.all else [profile_collection(config, **options)]
+        if args.json:
+            print(json.dumps(profiles, ensure_ascii=False, indent=2, default=str))
+        else:
+            print("\n\n".join(format_profile(p) for p in profiles))
+    else:
+        rules = fetch_all_rules()
+        print(f"向量库中共有 {len(rules)} 条规则：\n")
+
+        for r in rules:
+            print("规则名称:", r["rule_name"])
+            print("逻辑表达式:", r["logic_expression"])
+            print("风险判定:", r["risk_verdict"])
+            print("-" * 50)
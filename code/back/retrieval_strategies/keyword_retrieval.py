@@ -1,11 +1,15 @@
 from typing import Dict, List, Any, Optional
-import time
+import json
+import os
 import threading
-from retrieval_strategy import RetrievalStrategy
+from core_abstract.ttl_cache import LRUTTLCache
+from retrieval_strategies.payload_filter import filters_key
+from retrieval_strategies.retrieval_strategy import RetrievalStrategy
+from retrieval_strategies.bm25_index import BM25Index
 
 
 class KeywordRetrievalStrategy(RetrievalStrategy):
-    """基于关键词匹配的检索策略"""
+    """基于关键词匹配的检索策略（BM25 倒排索引，不依赖嵌入模型）"""
 
     def __init__(self, config: Dict[str, Any]):
         """初始化关键词检索策略
@@ -15,29 +19,70 @@ class KeywordRetrievalStrategy(RetrievalStrategy):
                 - min_score: 最低分数阈值
                 - cache_enabled: 是否启用缓存
                 - cache_ttl: 缓存过期时间（秒）
+                - cache_max_entries / cache_max_bytes: 缓存条目数 / 字节数上限
+                - index_path: 磁盘索引目录，存在时以内存映射方式加载
+                - rule_file: 无磁盘索引时用于建索引的规则文件，默认同目录下的 rule.json
+                - k1 / b: BM25 参数
+                - ngram_range: 中文字 n-gram 范围，默认 (1, 2)
+                - dictionary: 额外作为完整词元的领域词表（如“公积金”）
         """
         self.top_k = config.get("top_k", 10)
         self.min_score = config.get("min_score", 0.2)
         self.cache_enabled = config.get("cache_enabled", True)
         self.cache_ttl = config.get("cache_ttl", 3600)  # 默认1小时过期
+        self.index_path = config.get("index_path")
+        self.rule_file = config.get(
+            "rule_file", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rule.json")
+        )
         
         # 缓存相关属性
-        self._cache: Dict[str, List[Dict[str, Any]]] = {}
-        self._cache_times: Dict[str, float] = {}
-        self._lock = threading.Lock()
+        self._cache = LRUTTLCache(
+            max_entries=config.get("cache_max_entries", 1024),
+            max_bytes=config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
+        self._lock = threading.Lock()  # 索引写入锁
+
+        # 倒排索引：优先加载磁盘索引，否则由规则文件构建
+        if self.index_path and os.path.exists(os.path.join(self.index_path, "meta.json")):
+            self.index = BM25Index.load(self.index_path)
+        else:
+            self.index = BM25Index(
+                k1=config.get("k1", 1.5),
+                b=config.get("b", 0.75),
+                ngram_range=tuple(config.get("ngram_range", (1, 2))),
+                dictionary=config.get("dictionary")
+            )
+            if self.rule_file and os.path.exists(self.rule_file):
+                with open(self.rule_file, "r", encoding="utf-8") as f:
+                    self.add_rules(json.load(f).get("rules", []))
 
     def retrieve(self, query: str, context: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """执行关键词检索（框架实现，具体逻辑待补充）"""
+        """执行关键词检索：BM25 打分（只对满足过滤条件的规则打分），返回字段与 DataRetriever.search_rules 一致"""
+        filters = self.get_filters(context)
+        top_k = context.get("top_k", self.top_k)
         # 1. 检查缓存
-        cache_key = self._get_cache_key(query, context.get("domain"))
+        cache_key = self._get_cache_key(query, filters, top_k)
         if self.cache_enabled:
             cached_result = self._get_cached_results(cache_key)
             if cached_result is not None:
                 return cached_result
         
-        # 2. 实际检索逻辑（待实现）
-        # 此处仅为框架，实际需基于关键词匹配算法实现
+        # 2. BM25 检索
         results = []
+        for doc_id, score, rule in self.index.search(query, top_k=top_k, filters=filters):
+            if score < self.min_score:
+                continue
+            results.append({
+                "id": doc_id,
+                "rule_name": rule.get("rule_name"),
+                "logic_expression": rule.get("logic_expression"),
+                "risk_verdict": rule.get("risk_verdict"),
+                "domain": rule.get("domain"),
+                "rule_version": rule.get("rule_version"),
+                "score": score,
+                "full_text": self.rule_text(rule)
+            })
         
         # 3. 缓存结果
         if self.cache_enabled:
@@ -45,27 +90,51 @@ class KeywordRetrievalStrategy(RetrievalStrategy):
         
         return results
 
-    def _get_cache_key(self, query: str, domain: Optional[str] = None) -> str:
-        """生成缓存键"""
-        return f"{domain}:{query}" if domain else query
+    @staticmethod
+    def rule_text(rule: Dict[str, Any]) -> str:
+        """与向量入库时相同的规则文本"""
+        return (
+            f"规则名称: {rule.get('rule_name')}\n"
+            f"风险判定: {rule.get('risk_verdict')}\n"
+            f"逻辑表达式: {rule.get('logic_expression')}"
+        )
 
-    def _get_cached_results(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
-        """获取缓存结果（带过期检查）"""
+    def add_rules(self, rules: List[Dict[str, Any]]) -> None:
+        """增量写入规则（以 rule_name 为文档 id，同名规则覆盖）"""
+        with self._lock:
+            for rule in rules:
+                self.index.add(rule.get("rule_name"), self.rule_text(rule), rule)
+            self._cache.clear()
+
+    def remove_rules(self, rule_names: List[str]) -> int:
+        """按 rule_name 删除规则，返回实际删除的数量"""
+        with self._lock:
+            removed = sum(1 for name in rule_names if self.index.remove(name))
+            self._cache.clear()
+        return removed
+
+    def save_index(self, path: Optional[str] = None) -> None:
+        """将索引写入磁盘，之后可通过 index_path 以内存映射方式加载"""
+        path = path or self.index_path
+        if not path:
+            raise ValueError("未配置 index_path")
         with self._lock:
-            if cache_key in self._cache:
-                cache_time = self._cache_times[cache_key]
-                if time.time() - cache_time < self.cache_ttl:
-                    return self._cache[cache_key]
-                # 清理过期缓存
-                del self._cache[cache_key]
-                del self._cache_times[cache_key]
-        return None
+            self.index.save(path)
+
+    def _get_cache_key(self, query: str, filters: Optional[Dict[str, Any]] = None,
+                       top_k: Optional[int] = None) -> str:
+        """生成缓存键（结合查询、过滤条件与 top_k，domain 已包含在过滤条件中；top_k 可由 context 逐次指定）"""
+        key = filters_key(filters)
+        query = f"{top_k if top_k is not None else self.top_k}:{query}"
+        return f"{key}:{query}" if key else query
+
+    def _get_cached_results(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
+        """获取缓存结果（过期与淘汰由 LRUTTLCache 处理）"""
+        return self._cache.get(cache_key)
 
     def _set_cached_results(self, cache_key: str, results: List[Dict[str, Any]]) -> None:
         """设置缓存结果"""
-        with self._lock:
-            self._cache[cache_key] = results
-            self._cache_times[cache_key] = time.time()
+        self._cache.set(cache_key, results)
 
     def get_strategy_info(self) -> Dict[str, Any]:
         """返回策略配置信息"""
@@ -74,5 +143,11 @@ class KeywordRetrievalStrategy(RetrievalStrategy):
             "top_k": self.top_k,
             "min_score": self.min_score,
             "cache_enabled": self.cache_enabled,
-            "cache_ttl": self.cache_ttl
+            "cache_ttl": self.cache_ttl,
+            "cache_stats": self._cache.stats(),
+            "index_path": self.index_path,
+            "document_count": len(self.index),
+            "k1": self.index.k1,
+            "b": self.index.b,
+            "ngram_range": self.index.ngram_range
         }
\ No newline at end of file
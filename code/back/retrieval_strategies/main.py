@@ -1,6 +1,6 @@
 import os
-from config import RAGConfig
-from ingestion import DataIngestor
+from retrieval_strategies.config import RAGConfig
+from retrieval_strategies.ingestion import DataIngestor
 
 def run_ingestion():
     # 获取当前脚本所在目录
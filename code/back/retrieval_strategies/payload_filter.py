@@ -0,0 +1,80 @@
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+import numpy as np
+
+# 规则集合中建 payload 索引、供检索过滤的字段
+FILTER_FIELDS = ("risk_verdict", "domain", "rule_version")
+
+# 过滤条件：{字段: 取值 或 取值列表}，字段之间为 AND，同一字段的多个取值为 OR
+Filters = Mapping[str, Any]
+
+
+def normalize_filters(filters: Optional[Filters]) -> Dict[str, Tuple[Hashable, ...]]:
+    """统一为 {字段: 取值元组}，去掉取值为 None 的字段"""
+    normalized = {}
+    for field, value in (filters or {}).items():
+        if value is None:
+            continue
+        values = tuple(value) if isinstance(value, (list, tuple, set, frozenset)) else (value,)
+        normalized[field] = values
+    return normalized
+
+
+def filters_key(filters: Optional[Filters]) -> Tuple:
+    """可作为缓存键的过滤条件表示"""
+    return tuple(sorted((field, tuple(sorted(map(str, values))))
+                        for field, values in normalize_filters(filters).items()))
+
+
+def to_qdrant_filter(filters: Optional[Filters]):
+    """转换为 Qdrant Filter，在向量检索内部过滤；没有条件时返回 None"""
+    normalized = normalize_filters(filters)
+    if not normalized:
+        return None
+    from qdrant_client.http.models import FieldCondition, Filter, MatchAny, MatchValue
+    return Filter(must=[
+        FieldCondition(key=field, match=MatchValue(value=values[0]) if len(values) == 1 else MatchAny(any=list(values)))
+        for field, values in normalized.items()
+    ])
+
+
+class PayloadFieldIndex:
+    """
+    内存检索后端（ExactVectorIndex / BM25Index）的 payload 倒排：字段 -> 取值 -> 行号数组
+    按字段在第一次过滤时才建立；数据增删后调用 invalidate()
+    payload 字段为列表时，其中任一元素匹配即算命中（与 Qdrant 的 keyword 匹配一致）
+    """
+
+    def __init__(self, payloads: Sequence[Any]):
+        self._payloads = payloads
+        self._fields: Dict[str, Dict[Hashable, np.ndarray]] = {}
+
+    def invalidate(self) -> None:
+        self._fields.clear()
+
+    def _field(self, field: str) -> Dict[Hashable, np.ndarray]:
+        index = self._fields.get(field)
+        if index is None:
+            rows: Dict[Hashable, List[int]] = {}
+            for row, payload in enumerate(self._payloads):
+                value = payload.get(field) if isinstance(payload, dict) else None
+                for v in value if isinstance(value, list) else [value]:
+                    if v is not None and isinstance(v, Hashable):
+                        rows.setdefault(v, []).append(row)
+            index = self._fields[field] = {v: np.asarray(r, dtype=np.int64) for v, r in rows.items()}
+        return index
+
+    def mask(self, filters: Optional[Filters]) -> Optional[np.ndarray]:
+        """返回满足条件的行掩码；没有条件时返回 None（表示不过滤）"""
+        normalized = normalize_filters(filters)
+        if not normalized:
+            return None
+        result = np.ones(len(self._payloads), dtype=bool)
+        for field, values in normalized.items():
+            index = self._field(field)
+            allowed = np.zeros(len(self._payloads), dtype=bool)
+            for v in values:
+                rows = index.get(v)
+                if rows is not None:
+                    allowed[rows] = True
+            result &= allowed
+        return result
@@ -1,28 +1,104 @@
-from llama_index.core import VectorStoreIndex
+import threading
+import numpy as np
+from core_abstract.startup_timer import startup_timer
+from retrieval_strategies.exact_index import ExactVectorIndex
+from retrieval_strategies.payload_filter import to_qdrant_filter
 
 class DataRetriever:
-    def __init__(self, config):
+    """
+    规则检索
+    集合规模不超过 exact_max_size 时，把全部向量读入内存用 ExactVectorIndex 精确检索（一次矩阵乘）；
+    更大的集合直接向 Qdrant 发批量查询（查询向量由带缓存的 EmbeddingModel 计算，不再经过 llama_index 检索器）
+    filters（如 {"risk_verdict": "高风险背债人", "domain": [...]}）在检索内部生效：
+    精确检索只对满足条件的行打分，Qdrant 后端作为查询的 filter 交给带 payload 索引的检索
+    """
+
+    # 自动选用精确检索的集合规模上限
+    EXACT_MAX_SIZE = 5000
+
+    def __init__(self, config, exact_max_size: int = EXACT_MAX_SIZE, exact_dtype=np.float32):
+        """
+        Args:
+            config: RAGConfig
+            exact_max_size: 集合条数不超过该值时使用内存精确检索，0 表示始终使用 Qdrant
+            exact_dtype: 精确检索矩阵的存储精度，np.float32 或 np.float16
+        """
         self.config = config
-        # 从现有的向量库加载索引
-        self.index = VectorStoreIndex.from_vector_store(
-            vector_store=self.config.vector_store
-        )
+        self.exact_max_size = exact_max_size
+        self.exact_dtype = exact_dtype
+        self._lock = threading.Lock()
+        self._exact_index = None
+        self.backend = None
+        self.refresh()
+
+    def refresh(self) -> None:
+        """按当前集合规模重新选择后端；集合内容变化（如重新入库）后调用"""
+        with self._lock:
+            count = self.config.client.count(collection_name=self.config.collection_name).count
+            if count <= self.exact_max_size:
+                with startup_timer.measure("exact_index", "init"):
+                    self._exact_index = ExactVectorIndex.from_qdrant(
+                        self.config.client, self.config.collection_name, dtype=self.exact_dtype
+                    )
+                self.backend = "exact"
+            else:
+                self._exact_index = None
+                self.backend = "qdrant"
+
+    @staticmethod
+    def _format(payload, score, text):
+        return {
+            "rule_name": payload.get("rule_name"),
+            "logic_expression": payload.get("logic_expression"),
+            "risk_verdict": payload.get("risk_verdict"),
+            "domain": payload.get("domain"),
+            "rule_version": payload.get("rule_version"),
+            "score": score,
+            "full_text": text
+        }
 
-    def search_rules(self, query_text, top_k=3):
+    def search_rules(self, query_text, top_k=3, filters=None):
         """
         纯检索逻辑：只返回最匹配的规则内容和元数据
         """
-        retriever = self.index.as_retriever(similarity_top_k=top_k)
-        nodes = retriever.retrieve(query_text)
-
-        results = []
-        for node in nodes:
-            results.append({
-                "rule_name": node.metadata.get("rule_name"),
-                "logic_expression": node.metadata.get("logic_expression"),
-                "risk_verdict": node.metadata.get("risk_verdict"),
-                "score": node.score,
-                # ✅ 关键修复点
-                "full_text": node.get_content()
-            })
-        return results
+        return self.search_rules_batch([query_text], top_k=top_k, filters=filters)[0]
+
+    def search_rules_batch(self, queries, top_k=3, filters=None):
+        """
+        批量检索：所有查询一次性向量化（嵌入模型去重 + 缓存），再发起一次批量向量检索
+        - 精确检索后端：一次矩阵-矩阵乘
+        - Qdrant 后端：一次 query_batch_points 请求
+        Args:
+            filters: payload 过滤条件 {字段: 取值或取值列表}，对批内所有查询生效
+        Returns:
+            与 queries 顺序一致的结果列表，每项为 search_rules 形状的 dict 列表
+        """
+        queries = list(queries)
+        if not queries:
+            return []
+        return self.search_vectors(self.config.embedding_model.embed(queries, kind="query"),
+                                   top_k=top_k, filters=filters)
+
+    def search_vectors(self, query_vectors, top_k=3, filters=None):
+        """按已计算好的查询向量 (m, dim) 批量检索，返回形状同 search_rules_batch"""
+        exact_index = self._exact_index
+        if exact_index is not None:
+            return [
+                [self._format(payload, score, ExactVectorIndex.payload_text(payload)) for _, score, payload in hits]
+                for hits in exact_index.search_batch(query_vectors, top_k=top_k, filters=filters)
+            ]
+
+        from qdrant_client.http.models import QueryRequest
+        query_filter = to_qdrant_filter(filters)
+        responses = self.config.client.query_batch_points(
+            collection_name=self.config.collection_name,
+            requests=[QueryRequest(query=vector.tolist(), filter=query_filter, limit=top_k, with_payload=True)
+                      for vector in query_vectors]
+        )
+        return [
+            [
+                self._format(point.payload or {}, point.score, ExactVectorIndex.payload_text(point.payload or {}))
+                for point in response.points
+            ]
+            for response in responses
+        ]
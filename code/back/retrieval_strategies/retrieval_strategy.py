@@ -16,6 +16,17 @@ class RetrievalStrategy(ABC):
         """
         pass
 
+    @staticmethod
+    def get_filters(context: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        从上下文取 payload 过滤条件：context["filters"]（{字段: 取值或取值列表}），
+        context["domain"] 非空时同时按 domain 字段过滤
+        """
+        filters = dict(context.get("filters") or {})
+        if context.get("domain") is not None:
+            filters.setdefault("domain", context["domain"])
+        return filters
+
     @abstractmethod
     def get_strategy_info(self) -> Dict[str, Any]:
         """获取检索策略的配置信息
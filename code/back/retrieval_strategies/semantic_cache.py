@@ -0,0 +1,118 @@
+import threading
+import time
+from typing import Any, Dict, Hashable, List, Optional
+import numpy as np
+
+
+class SemanticQueryCache:
+    """
+    按查询向量做近似命中的结果缓存
+    LLM 生成的特征描述措辞每次略有不同，精确字符串缓存几乎不会命中；
+    这里把已检索过的查询向量（L2 归一化）放在一个固定容量的矩阵里，新查询与其做一次矩阵-向量乘，
+    余弦相似度不低于 threshold 且 domain 相同的最相近条目即视为命中，直接返回其检索结果
+    容量满时淘汰最久未使用的条目，过期条目在查找时视为空位
+    domain 按引用计数映射为整数 id：槽位被覆盖时释放旧 id，最后一个条目被替换后映射随之删除，
+    映射大小不超过 max_entries
+    """
+
+    def __init__(self, dim: int, threshold: float = 0.95, max_entries: int = 1024, ttl: Optional[float] = 3600):
+        """
+        Args:
+            dim: 查询向量维度
+            threshold: 命中所需的最低余弦相似度
+            max_entries: 最大条目数
+            ttl: 过期时间（秒），None 表示永不过期
+        """
+        self.dim = dim
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._expires = np.full(max_entries, -np.inf)  # -inf 表示空位
+        self._last_used = np.zeros(max_entries)
+        self._domains = np.full(max_entries, -1, dtype=np.int64)
+        self._values: List[Any] = [None] * max_entries
+        self._domain_ids: Dict[Hashable, int] = {}
+        self._domain_keys: Dict[int, Hashable] = {}
+        self._domain_refs: Dict[int, int] = {}
+        self._next_domain_id = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def _acquire_domain(self, domain: Hashable) -> int:
+        domain_id = self._domain_ids.get(domain)
+        if domain_id is None:
+            domain_id = self._domain_ids[domain] = self._next_domain_id
+            self._domain_keys[domain_id] = domain
+            self._domain_refs[domain_id] = 0
+            self._next_domain_id += 1
+        self._domain_refs[domain_id] += 1
+        return domain_id
+
+    def _release_domain(self, domain_id: int) -> None:
+        self._domain_refs[domain_id] -= 1
+        if self._domain_refs[domain_id] == 0:
+            del self._domain_refs[domain_id]
+            del self._domain_ids[self._domain_keys.pop(domain_id)]
+
+    @staticmethod
+    def _normalize(vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def get(self, vector: np.ndarray, domain: Hashable = None) -> Optional[Any]:
+        """返回与 vector 足够相近的已缓存结果，没有则返回 None"""
+        query = self._normalize(vector)
+        now = time.monotonic()
+        with self._lock:
+            domain_id = self._domain_ids.get(domain)
+            valid = (self._expires > now) & (self._domains == domain_id) if domain_id is not None else None
+            if valid is not None and valid.any():
+                scores = np.where(valid, self._vectors @ query, -np.inf)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._last_used[best] = now
+                    self._stats["hits"] += 1
+                    return self._values[best]
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, vector: np.ndarray, value: Any, domain: Hashable = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            free = np.flatnonzero(self._expires <= now)
+            if free.size:
+                slot = int(free[0])
+            else:
+                slot = int(np.argmin(self._last_used))
+                self._stats["evictions"] += 1
+            self._vectors[slot] = self._normalize(vector)
+            self._expires[slot] = now + self.ttl if self.ttl is not None else np.inf
+            self._last_used[slot] = now
+            domain_id = self._acquire_domain(domain)
+            if self._domains[slot] >= 0:
+                self._release_domain(int(self._domains[slot]))
+            self._domains[slot] = domain_id
+            self._values[slot] = value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expires[:] = -np.inf
+            self._domains[:] = -1
+            self._values = [None] * self.max_entries
+            self._domain_ids.clear()
+            self._domain_keys.clear()
+            self._domain_refs.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                "entries": int(np.count_nonzero(self._expires > time.monotonic())),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "ttl": self.ttl
+            }
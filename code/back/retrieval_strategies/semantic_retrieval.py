@@ -1,7 +1,8 @@
 from typing import Dict, List, Any, Optional
-import time
-import threading
-from retrieval_strategy import RetrievalStrategy
+from core_abstract.ttl_cache import LRUTTLCache
+from retrieval_strategies.payload_filter import filters_key
+from retrieval_strategies.retrieval_strategy import RetrievalStrategy
+from retrieval_strategies.semantic_cache import SemanticQueryCache
 
 
 class SemanticRetrievalStrategy(RetrievalStrategy):
@@ -16,6 +17,12 @@ class SemanticRetrievalStrategy(RetrievalStrategy):
                 - batch_size: 批量处理大小
                 - cache_enabled: 是否启用缓存
                 - cache_ttl: 缓存过期时间（秒）
+                - cache_max_entries / cache_max_bytes: 缓存条目数 / 字节数上限
+                - retriever: DataRetriever 实例（未提供时检索结果为空）
+                - embedding_model: 查询向量化模型，默认取 retriever.config.embedding_model
+                - semantic_cache_enabled: 是否启用按查询向量近似命中的第二级缓存
+                - semantic_cache_threshold: 近似命中所需的最低余弦相似度
+                - semantic_cache_max_entries / semantic_cache_ttl: 第二级缓存的条目数上限 / 过期时间（秒）
         """
         self.top_k = config.get("top_k", 10)
         self.similarity_threshold = config.get("similarity_threshold", 0.5)
@@ -23,51 +30,84 @@ class SemanticRetrievalStrategy(RetrievalStrategy):
         self.cache_enabled = config.get("cache_enabled", True)
         self.cache_ttl = config.get("cache_ttl", 3600)  # 默认1小时过期
         
-        # 缓存相关属性
-        self._cache: Dict[str, List[Dict[str, Any]]] = {}  # 缓存键:检索结果
-        self._cache_times: Dict[str, float] = {}  # 缓存键:创建时间
-        self._lock = threading.Lock()  # 缓存操作锁
+        # 缓存相关属性：有界 LRU + TTL，缓存键:检索结果
+        self._cache = LRUTTLCache(
+            max_entries=config.get("cache_max_entries", 1024),
+            max_bytes=config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
+
+        self.retriever = config.get("retriever")
+        self.embedding_model = config.get("embedding_model")
+        if self.embedding_model is None and self.retriever is not None:
+            self.embedding_model = self.retriever.config.embedding_model
+
+        # 第二级缓存：措辞不同但语义几乎相同的查询直接复用检索结果；向量维度在第一次写入时确定
+        self.semantic_cache_enabled = config.get("semantic_cache_enabled", True)
+        self.semantic_cache_threshold = config.get("semantic_cache_threshold", 0.95)
+        self.semantic_cache_max_entries = config.get("semantic_cache_max_entries", 1024)
+        self.semantic_cache_ttl = config.get("semantic_cache_ttl", self.cache_ttl)
+        self._semantic_cache: Optional[SemanticQueryCache] = None
+
+    def warmup(self) -> None:
+        """提前加载查询向量化模型，使首次检索的耗时不包含模型加载"""
+        if self.embedding_model is not None:
+            self.embedding_model.load()
 
     def retrieve(self, query: str, context: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """执行语义检索（框架实现，具体逻辑待补充）"""
+        """执行语义检索：精确缓存 -> 查询向量近似缓存 -> 向量检索（payload 过滤在向量检索内部生效）"""
+        filters = self.get_filters(context)
+        scope = filters_key(filters)  # 近似缓存只在过滤条件相同的查询之间命中
         # 1. 检查缓存
-        cache_key = self._get_cache_key(query, context.get("domain"))
+        cache_key = self._get_cache_key(query, filters)
         if self.cache_enabled:
             cached_result = self._get_cached_results(cache_key)
             if cached_result is not None:
                 return cached_result
-        
-        # 2. 实际检索逻辑（待实现）
-        # 此处仅为框架，实际需调用嵌入模型计算向量并匹配
-        results = []
-        
-        # 3. 缓存结果
+
+        if self.retriever is None or self.embedding_model is None:
+            return []
+
+        # 2. 查询向量化后先查近似缓存，命中则跳过向量检索
+        query_vector = self.embedding_model.embed(query, kind="query")
+        use_semantic_cache = self.cache_enabled and self.semantic_cache_enabled
+        if use_semantic_cache and self._semantic_cache is not None:
+            results = self._semantic_cache.get(query_vector, scope)
+            if results is not None:
+                self._set_cached_results(cache_key, results)
+                return results
+
+        # 3. 向量检索 + 相似度过滤
+        hits = self.retriever.search_vectors(query_vector[None, :], top_k=self.top_k, filters=filters)[0]
+        results = [hit for hit in hits if hit["score"] >= self.similarity_threshold]
+
+        # 4. 写入两级缓存
         if self.cache_enabled:
             self._set_cached_results(cache_key, results)
-        
+        if use_semantic_cache:
+            if self._semantic_cache is None:
+                self._semantic_cache = SemanticQueryCache(
+                    dim=len(query_vector),
+                    threshold=self.semantic_cache_threshold,
+                    max_entries=self.semantic_cache_max_entries,
+                    ttl=self.semantic_cache_ttl
+                )
+            self._semantic_cache.set(query_vector, results, scope)
+
         return results
 
-    def _get_cache_key(self, query: str, domain: Optional[str] = None) -> str:
-        """生成缓存键（结合查询和领域）"""
-        return f"{domain}:{query}" if domain else query
+    def _get_cache_key(self, query: str, filters: Optional[Dict[str, Any]] = None) -> str:
+        """生成缓存键（结合查询和过滤条件，domain 已包含在过滤条件中）"""
+        key = filters_key(filters)
+        return f"{key}:{query}" if key else query
 
     def _get_cached_results(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
-        """获取缓存结果（带过期检查）"""
-        with self._lock:
-            if cache_key in self._cache:
-                cache_time = self._cache_times[cache_key]
-                if time.time() - cache_time < self.cache_ttl:
-                    return self._cache[cache_key]
-                # 过期缓存清理
-                del self._cache[cache_key]
-                del self._cache_times[cache_key]
-        return None
+        """获取缓存结果（过期与淘汰由 LRUTTLCache 处理）"""
+        return self._cache.get(cache_key)
 
     def _set_cached_results(self, cache_key: str, results: List[Dict[str, Any]]) -> None:
         """设置缓存结果"""
-        with self._lock:
-            self._cache[cache_key] = results
-            self._cache_times[cache_key] = time.time()
+        self._cache.set(cache_key, results)
 
     def get_strategy_info(self) -> Dict[str, Any]:
         """返回策略配置信息"""
@@ -77,5 +117,8 @@ class SemanticRetrievalStrategy(RetrievalStrategy):
             "similarity_threshold": self.similarity_threshold,
             "batch_size": self.batch_size,
             "cache_enabled": self.cache_enabled,
-            "cache_ttl": self.cache_ttl
+            "cache_ttl": self.cache_ttl,
+            "cache_stats": self._cache.stats(),
+            "semantic_cache_enabled": self.semantic_cache_enabled,
+            "semantic_cache_stats": self._semantic_cache.stats() if self._semantic_cache is not None else None
         }
\ No newline at end of file
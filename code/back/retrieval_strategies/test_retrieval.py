@@ -1,5 +1,5 @@
-from config import RAGConfig
-from retrieval import DataRetriever
+from retrieval_strategies.config import RAGConfig
+from retrieval_strategies.retrieval import DataRetriever
 
 def main():
     config = RAGConfig(collection_name="risk_rules_collection")
@@ -1,37 +1,237 @@
-from tool_chain.state import State
-from langgraph.graph import START, StateGraph
+from core_abstract.startup_timer import startup_timer
+with startup_timer.measure("langgraph", "import"):
+    from langgraph.graph import START, StateGraph
+    from langchain_core.runnables import RunnableLambda
+    from langchain_core.runnables.config import get_executor_for_config
+import asyncio
+from concurrent.futures import FIRST_COMPLETED, wait
 from tool_chain.feature_matching import feature_matching
 from tool_chain.retrieval_node import RetrievalNode
 from tool_chain.risk_score import risk_score
 from tool_chain.risk_reporting import risk_reporting
 from tool_chain.state import State
 from tool_chain.data_loader import data_loader
-from retrieval_strategies.config import RAGConfig
+from tool_chain.rule_engine import RuleEngine
 
 
 class risk_graph:
 
-    def __init__(self):
-        config = RAGConfig(collection_name="risk_rules_collection")
-        self.node_data_loader = data_loader()
-        self.node_feature_matching = feature_matching()
-        self.node_retrieval_node = RetrievalNode(config)
-        self.node_risk_score = risk_score()
-        self.node_risk_reporting = risk_reporting()
+    def __init__(self, rag_config=None, reranker=None):
+        """
+        构建流水线时只创建轻量节点：检索依赖（llama_index、嵌入模型、Qdrant）和 DeepSeek 客户端
+        都在第一次用到时才初始化；常驻服务可调用 warmup() 提前完成
+        Args:
+            rag_config: 可选的 RAGConfig，默认首次检索时按 risk_rules_collection 创建
+            reranker: 可选的 RerankerModel，对检索出的规则做交叉编码器重排
+        """
+        with startup_timer.measure("rule_engine", "init"):
+            self.node_rule_engine = RuleEngine()
+        with startup_timer.measure("nodes", "init"):
+            self.node_data_loader = data_loader()
+            self.node_feature_matching = feature_matching()
+            self.node_retrieval_node = RetrievalNode(rag_config, reranker=reranker)
+            self.node_risk_score = risk_score()
+            self.node_risk_reporting = risk_reporting()
         self.graph = StateGraph(State)
+        self._app = None
+
+    def warmup(self):
+        """
+        一次性完成全部重量级初始化（检索依赖、DeepSeek 客户端、流水线编译），供常驻服务启动时调用
+        Returns:
+            各子系统的导入/初始化耗时报告
+        """
+        self.node_retrieval_node.warmup()
+        self.node_risk_score.llm
+        self.compile()
+        return startup_timer.report()
 
     def get_graph(self):
 
         self.graph.add_node("data_loader", self.node_data_loader.load_data)
-        self.graph.add_node("feature_matching", self.node_feature_matching.match_features)
+        self.graph.add_node("rule_engine", self.node_rule_engine.match_rules)
+        # LLM 节点同时注册同步/异步实现：app.invoke 走 invoke，app.ainvoke 走 ainvoke
+        self.graph.add_node("feature_matching", RunnableLambda(
+            self.node_feature_matching.match_features, afunc=self.node_feature_matching.amatch_features))
         self.graph.add_node("retrieval_node", self.node_retrieval_node.retrieve_rules)
-        self.graph.add_node("risk_score", self.node_risk_score.assess_risk)
-        self.graph.add_node("risk_reporting", self.node_risk_reporting.warn_risk)
+        self.graph.add_node("risk_score", RunnableLambda(
+            self.node_risk_score.assess_risk, afunc=self.node_risk_score.aassess_risk))
+        self.graph.add_node("risk_reporting", RunnableLambda(
+            self.node_risk_reporting.warn_risk, afunc=self.node_risk_reporting.awarn_risk))
 
         self.graph.add_edge(START, "data_loader")
-        self.graph.add_edge("data_loader", "feature_matching")
+        self.graph.add_edge("data_loader", "rule_engine")
+        self.graph.add_edge("rule_engine", "feature_matching")
         self.graph.add_edge("feature_matching", "retrieval_node")
         self.graph.add_edge("retrieval_node", "risk_score")
         self.graph.add_edge("risk_score", "risk_reporting")
 
-        return self.graph
\ No newline at end of file
+        return self.graph
+
+    def compile(self):
+        """编译并缓存流水线，批量模式下所有申请人复用同一个 app"""
+        if self._app is None:
+            with startup_timer.measure("langgraph", "init"):
+                self._app = self.get_graph().compile()
+        return self._app
+
+    @staticmethod
+    def initial_state(data=None, analysis_data: str = "") -> State:
+        return {
+            "data": data or [],
+            "analysis_data": analysis_data,
+            "text": "",
+            "new_feature": "",
+            "new_rule": "",
+            "feature": "",
+            "feature_matching": "",
+            "rule": "",
+            "rule_matching": "",
+            "report": "",
+            "risk": "",
+            "response": "开始启动风控流水线..."
+        }
+
+    @staticmethod
+    def _collect(inputs, idx, output) -> dict:
+        if isinstance(output, Exception):
+            return {"data": inputs[idx]["data"], "risk": "", "report": "", "error": str(output)}
+        return {
+            "data": inputs[idx]["data"],
+            "risk": output.get("risk", ""),
+            "report": output.get("report", ""),
+            "error": ""
+        }
+
+    def _iter_scored(self, rows, max_concurrency: int):
+        """对一批申请人并发执行流水线，按完成顺序产出 (序号, 结果)"""
+        app = self.compile()
+        inputs = [self.initial_state(row["data"], row["analysis_data"]) for row in rows]
+        config = {"max_concurrency": max_concurrency}
+        for idx, output in app.batch_as_completed(inputs, config=config, return_exceptions=True):
+            yield idx, self._collect(inputs, idx, output)
+
+    async def _aiter_scored(self, rows, max_concurrency: int):
+        """_iter_scored 的异步版本"""
+        app = self.compile()
+        inputs = [self.initial_state(row["data"], row["analysis_data"]) for row in rows]
+        config = {"max_concurrency": max_concurrency}
+        async for idx, output in app.abatch_as_completed(inputs, config=config, return_exceptions=True):
+            yield idx, self._collect(inputs, idx, output)
+
+    def score_rows(self, rows, max_concurrency: int = 8):
+        """
+        批量评分：每个申请人独立走一遍流水线，最多 max_concurrency 个并发
+        Args:
+            rows: data_loader.load_rows() 的返回值
+        Returns:
+            与 rows 顺序一致的结果列表，每项包含 data/risk/report/error
+        """
+        results = [None] * len(rows)
+        done = 0
+        for idx, result in self._iter_scored(rows, max_concurrency):
+            results[idx] = result
+            done += 1
+            if done % 100 == 0 or done == len(rows):
+                print(f"[批量评分] 已完成 {done}/{len(rows)}")
+        return results
+
+    def _iter_file_rows(self, file_path: str, batch_size: int):
+        """把按批读取的申请人展平为逐行迭代，读取仍按 batch_size 分块进行"""
+        for rows in self.node_data_loader.iter_rows(file_path, batch_size=batch_size):
+            yield from rows
+
+    def iter_score_file(self, file_path: str = None, max_concurrency: int = 8, batch_size: int = 1000):
+        """
+        流式评分：边读取 CSV 边评分，每完成一个申请人即产出其结果（按完成顺序）
+        在途申请人是一个跨批次的滑动窗口：每完成一个就从文件中补上下一个，并发始终保持 max_concurrency，
+        不会在每个读取批次的末尾降到零；内存占用只与 batch_size 和 max_concurrency 有关
+        """
+        app = self.compile()
+        rows = self._iter_file_rows(file_path, batch_size)
+        pending = {}
+        done = 0
+        with get_executor_for_config({"max_concurrency": max_concurrency}) as executor:
+            def submit(row) -> None:
+                state = self.initial_state(row["data"], row["analysis_data"])
+                pending[executor.submit(app.invoke, state)] = state
+
+            for row in rows:
+                submit(row)
+                if len(pending) >= max_concurrency:
+                    break
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    state = pending.pop(future)
+                    error = future.exception()
+                    yield self._collect([state], 0, error if error is not None else future.result())
+                    done += 1
+                    if done % 100 == 0:
+                        print(f"[批量评分] 已完成 {done}")
+                    row = next(rows, None)
+                    if row is not None:
+                        submit(row)
+        print(f"[批量评分] 全部完成，共 {done} 人")
+
+    def score_file(self, file_path: str = None, max_concurrency: int = 8):
+        """读取 CSV 并按行批量评分"""
+        rows = self.node_data_loader.load_rows(file_path)
+        return self.score_rows(rows, max_concurrency=max_concurrency)
+
+    async def ainvoke(self, state: State) -> State:
+        """异步执行单个申请人的流水线"""
+        return await self.compile().ainvoke(state)
+
+    async def ascore_rows(self, rows, max_concurrency: int = 64):
+        """
+        score_rows 的异步版本：单个事件循环内保持最多 max_concurrency 个申请人在途，
+        LLM 节点走 ainvoke，不再为每个请求占用一个阻塞线程
+        """
+        results = [None] * len(rows)
+        done = 0
+        async for idx, result in self._aiter_scored(rows, max_concurrency):
+            results[idx] = result
+            done += 1
+            if done % 100 == 0 or done == len(rows):
+                print(f"[批量评分] 已完成 {done}/{len(rows)}")
+        return results
+
+    async def aiter_score_file(self, file_path: str = None, max_concurrency: int = 64, batch_size: int = 1000):
+        """iter_score_file 的异步版本：同样以跨批次的滑动窗口保持 max_concurrency 个申请人在途"""
+        app = self.compile()
+        rows = self._iter_file_rows(file_path, batch_size)
+        pending = {}
+        done = 0
+
+        def submit(row) -> None:
+            state = self.initial_state(row["data"], row["analysis_data"])
+            pending[asyncio.ensure_future(app.ainvoke(state))] = state
+
+        try:
+            for row in rows:
+                submit(row)
+                if len(pending) >= max_concurrency:
+                    break
+            while pending:
+                finished, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in finished:
+                    state = pending.pop(task)
+                    error = task.exception()
+                    yield self._collect([state], 0, error if error is not None else task.result())
+                    done += 1
+                    if done % 100 == 0:
+                        print(f"[批量评分] 已完成 {done}")
+                    row = next(rows, None)
+                    if row is not None:
+                        submit(row)
+        finally:
+            # 调用方提前停止迭代时取消仍在途的申请人
+            for task in pending:
+                task.cancel()
+        print(f"[批量评分] 全部完成，共 {done} 人")
+
+    async def ascore_file(self, file_path: str = None, max_concurrency: int = 64):
+        """读取 CSV 并按行异步批量评分"""
+        rows = self.node_data_loader.load_rows(file_path)
+        return await self.ascore_rows(rows, max_concurrency=max_concurrency)
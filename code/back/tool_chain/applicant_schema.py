@@ -0,0 +1,97 @@
+import re
+from typing import Dict, List, Optional
+import pandas as pd
+
+# 申请人表（1.csv / 2.csv）的列定义，规则引擎、特征打分、数据加载共用
+
+# 数值列：统一解析为数值，非法值记为 NaN
+NUMERIC_COLUMNS = [
+    "社保评分",
+    "近12个月申请贷款次数",
+    "首次成为我行用户时年龄",
+    "税前年收入（元）",
+    "手机在网时长（月）",
+]
+
+# 低基数类别列：适合字典编码
+CATEGORICAL_COLUMNS = [
+    "学历",
+    "公积金账户当前状态",
+    "申请产品类型",
+]
+
+# 其余列按字符串保留（身份证号、手机号等长数字不能转成数值）
+STRING_COLUMNS = [
+    "姓名",
+    "身份证号",
+    "居住地",
+    "手机号",
+    "申请时间",
+    "单位名称",
+    "户籍所在地",
+]
+
+# 规则/特征文本中的字段写法 -> 实际列名
+FIELD_ALIASES: Dict[str, str] = {
+    "公积金账户状态": "公积金账户当前状态",
+    "公积金状态": "公积金账户当前状态",
+    "公积金": "公积金账户当前状态",
+    "手机在网时长": "手机在网时长（月）",
+    "手机在网": "手机在网时长（月）",
+    "在网时长": "手机在网时长（月）",
+    "近12个月贷款申请次数": "近12个月申请贷款次数",
+    "申请贷款次数": "近12个月申请贷款次数",
+    "贷款申请次数": "近12个月申请贷款次数",
+    "借贷次数": "近12个月申请贷款次数",
+    "税前年收入": "税前年收入（元）",
+    "年收入": "税前年收入（元）",
+    "收入": "税前年收入（元）",
+    "首次成为我行用户年龄": "首次成为我行用户时年龄",
+    "首次成为我行用户时的年龄": "首次成为我行用户时年龄",
+    "社保": "社保评分",
+}
+
+_UNIT_SUFFIX = re.compile(r"[（(][^）)]*[）)]$")
+
+
+def normalize_field(name: str) -> str:
+    """去掉空白与末尾的单位括号，如“手机在网时长（月）”->“手机在网时长”"""
+    name = re.sub(r"\s+", "", name)
+    return _UNIT_SUFFIX.sub("", name)
+
+
+def resolve_column(name: str, columns: Optional[List[str]] = None) -> Optional[str]:
+    """
+    将规则文本中的字段名解析为表中的列名
+    依次尝试：原样匹配 -> 别名表 -> 去单位后匹配
+    """
+    columns = list(columns) if columns is not None else NUMERIC_COLUMNS + CATEGORICAL_COLUMNS + STRING_COLUMNS
+    name = re.sub(r"\s+", "", name)
+    if name in columns:
+        return name
+    alias = FIELD_ALIASES.get(name) or FIELD_ALIASES.get(normalize_field(name))
+    if alias in columns:
+        return alias
+    bare = normalize_field(name)
+    for col in columns:
+        if normalize_field(col) == bare:
+            return col
+    return None
+
+
+def coerce_types(df: pd.DataFrame) -> pd.DataFrame:
+    """按列定义转换类型：数值列转为 float，类别列转为 category，其余保持字符串"""
+    df = df.copy()
+    for col in df.columns:
+        if col in NUMERIC_COLUMNS:
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        elif col in CATEGORICAL_COLUMNS:
+            df[col] = df[col].astype("string").str.strip().astype("category")
+        else:
+            df[col] = df[col].astype("string")
+    return df
+
+
+def to_frame(records: List[Dict]) -> pd.DataFrame:
+    """将 State["data"] 中的 List[Dict] 转为带类型的 DataFrame"""
+    return coerce_types(pd.DataFrame.from_records(records))
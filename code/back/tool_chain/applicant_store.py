@@ -0,0 +1,247 @@
+import hashlib
+import os
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from tool_chain.applicant_schema import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS
+
+# 原文旁路列的前缀：数值列/类别列的原始单元格文本与类型化后再还原的文本不同时（如数值列中的“未知”“3万”），
+# 原文记在 RAW_PREFIX + 列名 中，其余行为空；只用于还原提示词文本，不出现在带类型的 DataFrame 中
+RAW_PREFIX = "__raw__"
+# 存储格式版本，格式变化后旧文件视为过期并重新转换
+STORE_VERSION = b"2"
+
+
+class ApplicantStore:
+    """
+    申请人表的列式存储（Arrow IPC / Feather v2 文件）
+    CSV 只在首次使用时解析一次：数值列存为 float64，低基数类别列做字典编码，其余列存为字符串；
+    之后通过内存映射打开，读取时不再解码 GBK 文本，也不再生成 List[Dict[str, str]]
+    类型化会丢失的原文（数值列中的非数字文本、类别列首尾空白等）保存在旁路列中，
+    to_records / load_records / iter_records 还原出的文本与 CSV 原文一致，只有 load_frame / iter_batches 使用类型化的值
+
+    源 CSV 的大小与修改时间记录在文件元数据中，源文件变化后自动重新转换
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        """
+        Args:
+            cache_dir: 列式文件存放目录，默认取环境变量 APPLICANT_STORE_DIR，
+                       未设置时为 code/back/.cache/applicants
+        """
+        if cache_dir is None:
+            base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            cache_dir = os.getenv("APPLICANT_STORE_DIR", os.path.join(base_dir, ".cache", "applicants"))
+        self.cache_dir = cache_dir
+
+    # ---- 转换 ----
+
+    def store_path(self, csv_path: str) -> str:
+        """同名 CSV 可能位于不同目录，用绝对路径的哈希区分"""
+        csv_path = os.path.abspath(csv_path)
+        stem = os.path.splitext(os.path.basename(csv_path))[0]
+        digest = hashlib.sha1(csv_path.encode("utf-8")).hexdigest()[:8]
+        return os.path.join(self.cache_dir, f"{stem}-{digest}.arrow")
+
+    @staticmethod
+    def _source_meta(csv_path: str) -> Dict[bytes, bytes]:
+        st = os.stat(csv_path)
+        return {b"source_size": str(st.st_size).encode(), b"source_mtime_ns": str(st.st_mtime_ns).encode(),
+                b"store_version": STORE_VERSION}
+
+    def is_fresh(self, csv_path: str) -> bool:
+        path = self.store_path(csv_path)
+        if not os.path.exists(path):
+            return False
+        try:
+            with pa.memory_map(path, "r") as source:
+                meta = ipc.open_file(source).schema.metadata or {}
+        except (pa.ArrowInvalid, OSError):
+            return False
+        expected = self._source_meta(csv_path)
+        return all(meta.get(k) == v for k, v in expected.items())
+
+    @staticmethod
+    def _schema(columns: List[str], metadata: Dict[bytes, bytes]) -> pa.Schema:
+        fields = []
+        for col in columns:
+            if col in NUMERIC_COLUMNS:
+                fields.append(pa.field(col, pa.float64()))
+            elif col in CATEGORICAL_COLUMNS:
+                fields.append(pa.field(col, pa.dictionary(pa.int32(), pa.string())))
+            else:
+                fields.append(pa.field(col, pa.string()))
+        fields += [pa.field(RAW_PREFIX + col, pa.string()) for col in columns
+                   if col in NUMERIC_COLUMNS or col in CATEGORICAL_COLUMNS]
+        return pa.schema(fields, metadata=metadata)
+
+    @staticmethod
+    def _format_numeric(values: np.ndarray, index: pd.Index) -> pd.Series:
+        """数值还原为文本：缺失值为空字符串，整数值不带小数点（58000.0 -> "58000"）"""
+        integral = np.isfinite(values) & (values == np.round(values))
+        text = pd.Series(values, index=index).astype(str)
+        text[integral] = pd.Series(values[integral], index=index[integral]).astype("int64").astype(str)
+        text[np.isnan(values)] = ""
+        return text
+
+    @staticmethod
+    def _raw_sidecar(raw: pd.Series, restored: pd.Series) -> pa.Array:
+        """只保留还原文本与原文不同的单元格"""
+        return pa.array(raw.where(raw != restored), type=pa.string(), from_pandas=True)
+
+    @staticmethod
+    def _encode(series: pd.Series, vocab: Dict[str, int]) -> pa.DictionaryArray:
+        """
+        按累积词表编码类别列：新值追加到词表末尾，
+        使后续批次的字典是前一批的扩展，写入时只需输出增量字典
+        """
+        values = series.str.strip()
+        for v in values.dropna().unique():
+            if v not in vocab:
+                vocab[v] = len(vocab)
+        indices = pa.array(values.map(vocab).to_numpy(dtype="float64"), from_pandas=True).cast(pa.int32())
+        return pa.DictionaryArray.from_arrays(indices, pa.array(list(vocab), type=pa.string()))
+
+    def convert(self, csv_path: str, batch_size: int = 50000) -> str:
+        """
+        流式将 CSV 转为列式文件，内存占用只与 batch_size 有关
+        Returns:
+            列式文件路径
+        """
+        for _ in self._convert_batches(csv_path, batch_size):
+            pass
+        return self.store_path(csv_path)
+
+    def _convert_batches(self, csv_path: str, batch_size: int) -> Iterator[pa.RecordBatch]:
+        """
+        边转换边产出：每解析一批就写入临时文件并交给调用方，首批数据不必等整个文件转换完；
+        全部写完才替换为正式文件，中途停止迭代时临时文件被删除
+        """
+        # 延迟导入，避免与 data_loader 循环依赖
+        from tool_chain.data_loader import data_loader
+
+        path = self.store_path(csv_path)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        metadata = self._source_meta(csv_path)
+        options = ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+        vocabs: Dict[str, Dict[str, int]] = {}
+        writer = None
+        rows = 0
+        try:
+            for chunk in data_loader(use_store=False).iter_chunks(csv_path, batch_size=batch_size):
+                if writer is None:
+                    schema = self._schema(list(chunk.columns), metadata)
+                    writer = ipc.new_file(tmp_path, schema, options=options)
+                arrays = {}
+                for name in chunk.columns:
+                    raw = chunk[name]
+                    # 空字符串视为缺失，与 keep_default_na=False 读出的空单元格对应
+                    col = raw.replace("", None)
+                    if name in NUMERIC_COLUMNS:
+                        values = pd.to_numeric(col, errors="coerce").to_numpy(dtype=float)
+                        arrays[name] = pa.array(values, type=pa.float64(), from_pandas=True)
+                        arrays[RAW_PREFIX + name] = self._raw_sidecar(raw, self._format_numeric(values, chunk.index))
+                    elif name in CATEGORICAL_COLUMNS:
+                        arrays[name] = self._encode(col, vocabs.setdefault(name, {}))
+                        arrays[RAW_PREFIX + name] = self._raw_sidecar(raw, col.str.strip().fillna(""))
+                    else:
+                        arrays[name] = pa.array(col, type=pa.string(), from_pandas=True)
+                batch = pa.record_batch([arrays[field.name] for field in schema], schema=schema)
+                writer.write_batch(batch)
+                rows += len(chunk)
+                yield batch
+            if writer is None:
+                raise ValueError(f"CSV 文件为空: {csv_path}")
+            writer.close()
+            writer = None
+            os.replace(tmp_path, path)
+        finally:
+            if writer is not None:
+                writer.close()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        print(f"[列式存储] 已转换 {rows} 行: {csv_path} -> {path}")
+
+    def ensure(self, csv_path: str) -> str:
+        """返回最新的列式文件路径，不存在或源文件已变化时先转换"""
+        if not self.is_fresh(csv_path):
+            return self.convert(csv_path)
+        return self.store_path(csv_path)
+
+    # ---- 读取 ----
+
+    def open_table(self, csv_path: str, columns: Optional[List[str]] = None) -> pa.Table:
+        """内存映射打开整张表（含原文旁路列），列数据不拷贝到堆内存"""
+        source = pa.memory_map(self.ensure(csv_path), "r")
+        table = ipc.open_file(source).read_all()
+        return table.select(columns) if columns else table
+
+    def load_frame(self, csv_path: str, columns: Optional[List[str]] = None,
+                   nrows: Optional[int] = None) -> pd.DataFrame:
+        """读取为带类型的 DataFrame，类别列为 category"""
+        table = self.open_table(csv_path, columns)
+        if nrows is not None:
+            table = table.slice(0, nrows)
+        return self._to_frame(table)
+
+    def _iter_tables(self, csv_path: str, batch_size: int) -> Iterator[pa.Table]:
+        """按批产出表切片（含原文旁路列）；列式文件不存在或已过期时边转换边产出，不必先完整转换一遍"""
+        if not self.is_fresh(csv_path):
+            for batch in self._convert_batches(csv_path, batch_size):
+                yield pa.Table.from_batches([batch])
+            return
+        table = self.open_table(csv_path)
+        for start in range(0, table.num_rows, batch_size):
+            yield table.slice(start, batch_size)
+
+    def iter_batches(self, csv_path: str, batch_size: int = 1000) -> Iterator[pd.DataFrame]:
+        """按批产出带类型的 DataFrame，供向量化计算使用"""
+        for table in self._iter_tables(csv_path, batch_size):
+            yield self._to_frame(table)
+
+    @staticmethod
+    def _to_frame(table: pa.Table) -> pd.DataFrame:
+        """带类型的 DataFrame，不含原文旁路列"""
+        table = table.select([name for name in table.column_names if not name.startswith(RAW_PREFIX)])
+        df = table.to_pandas()
+        for col in df.columns:
+            if col not in NUMERIC_COLUMNS and col not in CATEGORICAL_COLUMNS:
+                df[col] = df[col].astype("string")
+        return df
+
+    @staticmethod
+    def to_records(df: pd.DataFrame, raw: Optional[pa.Table] = None) -> List[Dict[str, str]]:
+        """
+        还原为与 csv.DictReader 相同形态的 List[Dict[str, str]]，供提示词使用
+        缺失值为空字符串，整数值不带小数点（58000.0 -> "58000"）；
+        raw 为同一批行的表（含原文旁路列）时，旁路列中有原文的单元格以原文为准
+        """
+        out = pd.DataFrame(index=df.index)
+        for col in df.columns:
+            if col in NUMERIC_COLUMNS:
+                out[col] = ApplicantStore._format_numeric(df[col].to_numpy(dtype=float), df.index)
+            else:
+                out[col] = df[col].astype("string").fillna("").astype(str)
+            if raw is not None and RAW_PREFIX + col in raw.column_names:
+                original = raw.column(RAW_PREFIX + col).to_pandas()
+                original.index = df.index
+                out[col] = original.where(original.notna(), out[col])
+        return out.to_dict("records")
+
+    def _table_records(self, table: pa.Table) -> List[Dict[str, str]]:
+        return self.to_records(self._to_frame(table), raw=table)
+
+    def load_records(self, csv_path: str, nrows: Optional[int] = None) -> List[Dict[str, str]]:
+        """读取为与 CSV 原文一致的 List[Dict[str, str]]"""
+        table = self.open_table(csv_path)
+        if nrows is not None:
+            table = table.slice(0, nrows)
+        return self._table_records(table)
+
+    def iter_records(self, csv_path: str, batch_size: int = 1000) -> Iterator[List[Dict[str, str]]]:
+        """按批产出与 CSV 原文一致的记录"""
+        for table in self._iter_tables(csv_path, batch_size):
+            yield self._table_records(table)
@@ -0,0 +1,233 @@
+from itertools import combinations
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from tool_chain.applicant_schema import CATEGORICAL_COLUMNS, NUMERIC_COLUMNS
+from tool_chain.rule_engine import RuleCompileError, RuleEngine, split_conjuncts
+
+# 单字节 popcount 查表，numpy 低版本没有 bitwise_count 时使用
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# 标签列中视为“是背债人”的取值
+_POSITIVE_LABELS = {"1", "是", "true", "yes", "y", "背债人"}
+
+# 无标签挖掘只能得到字段间的共现模式，与是否背债无关，统一标为待人工复核
+UNLABELED_VERDICT = "待人工复核"
+
+
+def _popcount(bits: np.ndarray) -> int:
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(bits).sum())
+    return int(_POPCOUNT[bits].sum())
+
+
+class AssociationMiner:
+    """
+    基于数据的关联规则挖掘与验证（不调用 LLM）
+    将申请人表离散化为“条件项”（如“近12个月申请贷款次数 >= 4”、“学历为大专”），
+    每个条件项对应一个按位压缩的行掩码，项集的支持度由掩码按位与后的 popcount 求出；
+    条件项本身就是规则引擎语法，有标签列时挖掘结果可直接写入 rule.json，也可用 verify 复核任意候选规则
+    """
+
+    def __init__(self, df: pd.DataFrame, label_column: Optional[str] = None,
+                 quantiles: Sequence[float] = (0.25, 0.5, 0.75)):
+        """
+        Args:
+            df: 带类型的申请人表（applicant_schema.coerce_types / ApplicantStore.load_frame 的结果）
+            label_column: 可选的标签列（1/是/true 为背债人），提供时规则以“命中即为背债人”计算置信度与提升度
+            quantiles: 数值列离散化使用的分位点
+        """
+        self.df = df
+        self.n = len(df)
+        self.engine = RuleEngine(rules=[], columns=list(df.columns))
+        self.quantiles = quantiles
+        self._memo: Dict[str, np.ndarray] = {}
+        self.label: Optional[np.ndarray] = None
+        self.labeled = label_column is not None
+        if label_column is not None:
+            if label_column not in df.columns:
+                raise ValueError(f"标签列不存在: {label_column}")
+            self.label = self._pack(self._parse_label(df[label_column]))
+
+    @staticmethod
+    def _parse_label(series: pd.Series) -> np.ndarray:
+        text = series.astype("string").str.strip().str.lower()
+        numeric = pd.to_numeric(series, errors="coerce")
+        return (text.isin(_POSITIVE_LABELS).fillna(False) | (numeric.fillna(0) != 0)).to_numpy(dtype=bool)
+
+    @staticmethod
+    def _pack(mask: np.ndarray) -> np.ndarray:
+        return np.packbits(mask.astype(bool))
+
+    def _mask(self, expression: str) -> np.ndarray:
+        """编译并求值一个表达式，返回压缩后的行掩码；同一次挖掘/验证内共享条件求值缓存"""
+        rule = self.engine.compile_rule({"rule_name": expression, "logic_expression": expression})
+        missing = [c for c in rule.columns if c not in self.df.columns]
+        if missing:
+            raise RuleCompileError(f"表中缺少字段: {', '.join(missing)}")
+        return self._pack(rule.evaluate(self.df, self._memo))
+
+    # ---- 离散化 ----
+
+    @staticmethod
+    def _format_number(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else f"{value:.2f}".rstrip("0").rstrip(".")
+
+    def items(self, min_support: float = 0.05) -> List[Tuple[str, str]]:
+        """
+        生成候选条件项 (字段, 条件文本)：
+        数值列在各分位点上生成“<= 分位数”与“>= 分位数”两类条件，类别列每个取值生成“为 取值”条件
+        """
+        result: List[Tuple[str, str]] = []
+        for col in self.df.columns:
+            if col in NUMERIC_COLUMNS:
+                values = pd.to_numeric(self.df[col], errors="coerce").dropna()
+                if values.empty:
+                    continue
+                cuts = sorted(set(values.quantile(list(self.quantiles)).round(2)))
+                for cut in cuts:
+                    v = self._format_number(cut)
+                    result.append((col, f"{col} <= {v}"))
+                    result.append((col, f"{col} >= {v}"))
+            elif col in CATEGORICAL_COLUMNS:
+                counts = self.df[col].astype("string").str.strip().value_counts()
+                for value, count in counts.items():
+                    if value and count / max(self.n, 1) >= min_support:
+                        result.append((col, f"{col}为{value}"))
+        return result
+
+    # ---- 挖掘 ----
+
+    def mine(self, min_support: float = 0.1, min_confidence: float = 0.6, min_lift: float = 1.2,
+             max_len: int = 3, risk_verdict: str = "疑似背债人", top_n: Optional[int] = 200) -> List[Dict[str, Any]]:
+        """
+        Apriori 逐层挖掘频繁项集并生成规则
+        - 有标签列：项集支持度在背债人样本中计算，规则为“项集 -> 背债人”
+        - 无标签列：在全表上计算，规则为“项集去掉一项 -> 该项”，按 logic_expression 的最后一个条件作为后件；
+          这只是字段间的共现模式，不能说明命中者是背债人，risk_verdict 固定为“待人工复核”（忽略传入值），
+          rule_name 为“关联模式xxx”，并附带 consequent 字段，不应直接写入 rule.json
+        Returns:
+            规则列表，附带 support/coverage/confidence/lift，按 lift、support 降序
+        """
+        self._memo = {}
+        base = self.label
+        base_count = _popcount(base) if base is not None else self.n
+        if base_count == 0:
+            return []
+        if base is None:
+            risk_verdict = UNLABELED_VERDICT
+
+        # L1：单项频繁集
+        item_bits: Dict[str, np.ndarray] = {}
+        item_field: Dict[str, str] = {}
+        for field, text in self.items(min_support if base is None else 0.0):
+            try:
+                bits = self._mask(text)
+            except RuleCompileError:
+                continue
+            scoped = bits & base if base is not None else bits
+            if _popcount(scoped) / base_count >= min_support:
+                item_bits[text] = bits
+                item_field[text] = field
+        names = sorted(item_bits)
+        frequent: Dict[Tuple[str, ...], np.ndarray] = {(name,): item_bits[name] for name in names}
+        all_frequent = dict(frequent)
+
+        # Lk：由 L(k-1) 中前缀相同的项集连接生成候选，剪掉含非频繁子集的候选
+        for _ in range(2, max_len + 1):
+            keys = sorted(frequent)
+            candidates: Dict[Tuple[str, ...], np.ndarray] = {}
+            for a, b in combinations(keys, 2):
+                if a[:-1] != b[:-1] or item_field[a[-1]] == item_field[b[-1]]:
+                    continue
+                itemset = a + (b[-1],)
+                if any(sub not in frequent for sub in combinations(itemset, len(itemset) - 1)):
+                    continue
+                bits = frequent[a] & item_bits[b[-1]]
+                scoped = bits & base if base is not None else bits
+                if _popcount(scoped) / base_count >= min_support:
+                    candidates[itemset] = bits
+            if not candidates:
+                break
+            frequent = candidates
+            all_frequent.update(candidates)
+
+        rules = []
+        for itemset, bits in all_frequent.items():
+            if base is not None:
+                metrics = self._metrics(bits, self.label)
+                rules.append((list(itemset), metrics))
+            elif len(itemset) >= 2:
+                for consequent in itemset:
+                    antecedent = [i for i in itemset if i != consequent]
+                    metrics = self._metrics(self._and(antecedent, all_frequent), item_bits[consequent])
+                    rules.append((antecedent + [consequent], {"consequent": consequent, **metrics}))
+
+        result = []
+        for conditions, m in rules:
+            if m["lift"] is None or m["confidence"] < min_confidence or m["lift"] < min_lift:
+                continue
+            result.append({"logic_expression": " AND ".join(conditions), "risk_verdict": risk_verdict, **m})
+        result.sort(key=lambda r: (r["lift"], r["support"]), reverse=True)
+        if top_n is not None:
+            result = result[:top_n]
+        prefix = "数据挖掘规则" if base is not None else "关联模式"
+        for i, rule in enumerate(result):
+            rule["rule_name"] = f"{prefix}{i + 1:03d}"
+            rule["reasoning"] = (f"支持度 {rule['support']:.2%}，置信度 {rule['confidence']:.2%}，"
+                                 f"提升度 {rule['lift']:.2f}")
+        return [{"rule_name": r.pop("rule_name"), **r} for r in result]
+
+    @staticmethod
+    def _and(itemset: List[str], frequent: Dict[Tuple[str, ...], np.ndarray]) -> np.ndarray:
+        """项集的子集必然也是频繁项集，直接取已计算好的掩码"""
+        return frequent[tuple(sorted(itemset))]
+
+    def _metrics(self, antecedent: np.ndarray, consequent: Optional[np.ndarray]) -> Dict[str, Any]:
+        """
+        support = P(前件 ∧ 后件)，coverage = P(前件)，
+        confidence = P(后件 | 前件)，lift = confidence / P(后件)；无后件时只给出 support/coverage
+        """
+        n = max(self.n, 1)
+        hit = _popcount(antecedent)
+        metrics: Dict[str, Any] = {"support": hit / n, "coverage": hit / n, "count": hit,
+                                   "confidence": None, "lift": None}
+        if consequent is None:
+            return metrics
+        both = _popcount(antecedent & consequent)
+        prior = _popcount(consequent) / n
+        metrics["support"], metrics["count"] = both / n, both
+        if hit:
+            metrics["confidence"] = both / hit
+            metrics["lift"] = metrics["confidence"] / prior if prior else None
+        return metrics
+
+    # ---- 验证 ----
+
+    def verify(self, rules: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        在全表上复核 rule.json 格式的候选规则（含 LLM 提出的规则）
+        - 有标签列：后件为“是背债人”
+        - 无标签列：后件为 logic_expression 最外层 AND 的最后一个条件，其余条件为前件；只有一个条件时只给出支持度
+        无法编译的规则在结果中带 error 字段
+        Returns:
+            原规则字段 + support/coverage/count/confidence/lift
+        """
+        self._memo = {}
+        result = []
+        for rule in rules:
+            expression = rule.get("logic_expression") or ""
+            try:
+                if self.label is not None:
+                    metrics = self._metrics(self._mask(expression), self.label)
+                else:
+                    parts = split_conjuncts(expression)
+                    if len(parts) < 2:
+                        metrics = self._metrics(self._mask(expression), None)
+                    else:
+                        metrics = self._metrics(self._mask(" AND ".join(parts[:-1])), self._mask(parts[-1]))
+            except RuleCompileError as e:
+                result.append({**rule, "error": str(e)})
+                continue
+            result.append({**rule, **metrics})
+        return result
@@ -1,30 +1,116 @@
+import codecs
 import csv
 import io
 import os
+from typing import Dict, Iterator, List
+import pandas as pd
+from tool_chain.applicant_schema import coerce_types
+from tool_chain.applicant_store import ApplicantStore
 from tool_chain.state import State
 
 class data_loader:
-    def __init__(self, file_path: str = "2.csv"):
+    # 编码探测读取的字节数，只需覆盖表头和前若干行
+    SNIFF_BLOCK_SIZE = 64 * 1024
+
+    def __init__(self, file_path: str = "2.csv", use_store: bool = True):
+        """
+        Args:
+            file_path: 申请人 CSV，相对路径基于 code/back
+            use_store: 批量读取（iter_batches/iter_rows/load_rows）是否走列式存储，
+                       首次读取时边转换边产出批次，之后内存映射打开
+        """
         base_dir = os.path.dirname(os.path.abspath(__file__))
         self.file_path = os.path.join(os.path.dirname(base_dir), file_path)
-    
+        self.store = ApplicantStore() if use_store else None
+
+    def sniff_encoding(self, file_path: str) -> str:
+        """只读取首块字节判断编码：UTF-8（含 BOM）优先，失败时回退 GBK"""
+        with open(file_path, mode='rb') as f:
+            block = f.read(self.SNIFF_BLOCK_SIZE)
+        if block.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        # 增量解码：块末尾被截断的多字节字符不视为错误
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        try:
+            decoder.decode(block, final=len(block) < self.SNIFF_BLOCK_SIZE)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            # 常见于 Windows Excel 导出的文件
+            print(f"[警告] 文件不是 UTF-8 编码，按 GBK 读取: {file_path}")
+            return 'gbk'
+
+    def _read_text(self, file_path: str) -> str:
+        """按探测到的编码一次性读取文件全文"""
+        with open(file_path, mode='r', encoding=self.sniff_encoding(file_path)) as f:
+            return f.read()
+
+    def iter_chunks(self, file_path: str = None, batch_size: int = 1000) -> Iterator[pd.DataFrame]:
+        """
+        流式读取 CSV：按探测到的编码边读边解码，每次产出 batch_size 行的原始字符串 DataFrame
+        内存占用只与 batch_size 有关，与文件大小无关
+        """
+        file_path = file_path or self.file_path
+        reader = pd.read_csv(
+            file_path,
+            encoding=self.sniff_encoding(file_path),
+            dtype=str,
+            keep_default_na=False,
+            chunksize=batch_size
+        )
+        with reader:
+            for chunk in reader:
+                yield chunk
+
+    def iter_batches(self, file_path: str = None, batch_size: int = 1000) -> Iterator[pd.DataFrame]:
+        """流式产出按 applicant_schema 转换类型后的批次，供规则引擎/特征打分等向量化计算使用"""
+        if self.store is not None:
+            yield from self.store.iter_batches(file_path or self.file_path, batch_size)
+            return
+        for chunk in self.iter_chunks(file_path, batch_size):
+            yield coerce_types(chunk)
+
+    def iter_rows(self, file_path: str = None, batch_size: int = 1000) -> Iterator[List[dict]]:
+        """流式版 load_rows：每次产出 batch_size 个申请人的 State 增量"""
+        if self.store is not None:
+            batches = self.store.iter_records(file_path or self.file_path, batch_size)
+        else:
+            batches = (chunk.to_dict("records") for chunk in self.iter_chunks(file_path, batch_size))
+        for records in batches:
+            fieldnames = list(records[0]) if records else []
+            yield [
+                {"data": [row], "analysis_data": self.row_to_text(fieldnames, row)}
+                for row in records
+            ]
+
+    @staticmethod
+    def row_to_text(fieldnames: List[str], row: Dict) -> str:
+        """将单行数据还原为“表头+数据行”的 CSV 文本，作为单个申请人的 analysis_data"""
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerow(row)
+        return buffer.getvalue()
+
+    def load_rows(self, file_path: str = None) -> List[dict]:
+        """
+        批量模式：按行拆分 CSV，每个申请人生成一份独立的 State 增量
+        返回示例: [{"data": [row], "analysis_data": "表头\\n数据行\\n"}, ...]
+        大文件请使用 iter_rows 流式处理
+        """
+        return [row for batch in self.iter_rows(file_path) for row in batch]
+
     def load_data(self, state: State) -> dict:
+        # 批量模式下调用方已为每个申请人填好 analysis_data，直接透传
+        if state.get("analysis_data"):
+            return {"response": state["response"] + "执行成功data_loader"}
         try:
             # --- 修改开始：增加编码兼容性逻辑 ---
-            content = ""
-            # 优先尝试 UTF-8
-            try:
-                with open(self.file_path, mode='r', encoding='utf-8') as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                # 如果失败，尝试 GBK (常见于 Windows Excel 文件)
-                print(f"[警告] UTF-8 读取失败，正在尝试 GBK 编码: {self.file_path}")
-                with open(self.file_path, mode='r', encoding='gbk') as f:
-                    content = f.read()
-            
+            # 先探测编码再读取，不再整文件 UTF-8 失败后重读
+            content = self._read_text(self.file_path)
+
             # 保存原始文本
             raw_content = content
-            
+
             # 解析 CSV
             f_obj = io.StringIO(content)
             reader = csv.DictReader(f_obj)
@@ -32,7 +118,7 @@ class data_loader:
             # --- 修改结束 ---
 
             return {
-                "analysis_data": raw_content, 
+                "analysis_data": raw_content,
                 "data": structured_data,
                 "response": state["response"] + "执行成功data_loader"
             }
@@ -41,6 +127,6 @@ class data_loader:
             print(f"致命错误: {e}")
             return {
                 # 强烈建议：这里返回特定的错误标记，让后续节点知道出错了
-                "analysis_data": "ERROR_DATA_LOAD_FAILED", 
+                "analysis_data": "ERROR_DATA_LOAD_FAILED",
                 "response": f"错误：文件读取失败 - {str(e)}"
-            }
\ No newline at end of file
+            }
@@ -1,12 +1,15 @@
-from model_components.deepseek_model import DeepSeekLLM
-from state import State
+from model_components.deepseek_model import get_deepseek_llm
+from tool_chain.state import State
 import json
 
 class data_processing:
 
+    @property
+    def llm(self):
+        """共享的 DeepSeek 客户端，首次调用时才创建"""
+        return get_deepseek_llm()
+
     def __init__(self):
-        deepseek_client = DeepSeekLLM()
-        self.llm = deepseek_client.llm
         self.prompt_template = """
 你是银行风控领域的资深数据标准化专家，专注于背债人判定场景的CSV数据标准化处理，严格遵循以下规则完成非标数据智能化解析与标准化：
 
@@ -1,12 +1,18 @@
-from model_components.deepseek_model import DeepSeekLLM
+from model_components.deepseek_model import get_deepseek_llm
+from tool_chain.feature_registry import FeatureRegistry
 from tool_chain.state import State
 
 
 class feature_matching:
 
+    @property
+    def llm(self):
+        """共享的 DeepSeek 客户端；确定性特征足够时不会创建"""
+        return get_deepseek_llm()
+
     def __init__(self):
-        deepseek_client = DeepSeekLLM()
-        self.llm = deepseek_client.llm
+        # 可由数据字段直接判定的特征在本地向量化打分，提示词中只保留需 LLM 判断的特征
+        self.registry = FeatureRegistry()
         self.prompt_template = """
 一、任务背景
 在银行贷款领域，职业背债人的数量在快速上升，此类群体的存在严重扰乱金融秩序，加剧银行信贷风险，对金融机构风控体系构成重大挑战。
@@ -42,64 +48,7 @@ class feature_matching:
 
 六、前置条件（特征库及案例提示、额外信息）
 职业背债人已挖掘特征库
-{
-  "mined_features": [
-    {
-      "feature_value": "公积金账户状态异常（未缴纳/冻结）",
-      "risk_level": "高",
-      "reason": "用户3、9、11、12、13、15、19、21、23、25、32、42、44、46等共14名用户公积金状态为“未缴纳”或“冻结”，占比28%。此状态与申报的稳定职业及贷款需求严重不符，是职业背债人伪造工作证明的典型特征。",
-      "confidence": 0.85
-    },
-    {
-      "feature_value": "近12个月贷款申请次数>=3次",
-      "risk_level": "高",
-      "reason": "用户1(6次)、2(5次)、4(4次)、14(2次)、15(4次)、18(3次)、19(5次)、20(3次)、23(4次)、24(4次)、25(5次)、26(3次)、39(4次)、40(3次)、41(3次)、42(3次)、43(4次)、44(4次)、49(3次)等19名用户存在频繁申贷行为，占比38%。符合背债人短期内多头借贷、快速套现的行为模式。",
-      "confidence": 0.9
-    },
-    {
-      "feature_value": "手机在网时长短（<=6个月）",
-      "risk_level": "中",
-      "reason": "用户2(8个月)、5(6个月)、7(4个月)、13(3个月)、16(5个月)、17(2个月)、31(7个月)、32(5个月)、36(3个月)、42(5个月)、46(6个月)等11名用户手机号使用时间较短，占比22%。新办手机号常被用于切断历史联系，躲避催收，是背债人身份不稳定的表现。",
-      "confidence": 0.75
-    },
-    {
-      "feature_value": "社保评分与收入/职业的明显不匹配",
-      "risk_level": "中",
-      "reason": "用户20社保评分仅26分，但其申报年收入为53000元，单位名称为“文具店”，评分极低与相对“正常”的收入和职业描述矛盾，疑似社保缴纳基数异常或单位异常。用户34社保评分68分，单位“电器销售公司”，收入43000，评分也偏低。低社保评分可能反映单位规模小、缴纳不规范或挂靠单位。",
-      "confidence": 0.7
-    },
-    {
-      "feature_value": "首次成为我行用户年龄小（<=22岁）且当前有贷款申请",
-      "risk_level": "中",
-      "reason": "用户1(22岁)、3(21岁)、6(20岁)、7(22岁)、13(20岁)、16(22岁)、17(21岁)、22(22岁)、25(20岁)、26(21岁)、30(22岁)、36(20岁)、39(22岁)、42(22岁)、46(22岁)、50(22岁)等16名用户，在非常年轻的年龄即成为银行客户，并在当前时点（数据中申请时间）有新的贷款申请。可能被中介过早开发为“白户”资源进行培养和利用。",
-      "confidence": 0.65
-    },
-    {
-      "feature_value": "户籍所在地与居住地/工作地跨省分离",
-      "risk_level": "低",
-      "reason": "几乎所有用户户籍地与居住地均不一致，且多为跨省（如河北户籍在北京、江苏户籍在上海）。虽然人口流动普遍，但结合其他高风险特征（如公积金异常、频繁申贷），这种分离可能被中介利用，增加信息核查难度和违约后追索成本。",
-      "confidence": 0.6
-    },
-    {
-      "feature_value": "工作单位名称特征（小型、个体经营、高频行业）",
-      "risk_level": "低",
-      "reason": "大量用户工作单位名称为“XX店”、“XX中心”、“XX工作室”、“XX餐饮公司”、“XX物流”、“XX科技”（疑似空壳）等，如“水果店”、“宠物店”、“花店”、“网吧”、“便利店”、“美容院”、“家政服务”。这些行业门槛低、经营变动大，易于伪造工作证明，是中介包装背债人的常用选择。",
-      "confidence": 0.7
-    },
-    {
-      "feature_value": "学历集中在中专、高中、大专",
-      "risk_level": "低",
-      "reason": "用户数据中本科学历仅约10人，其余均为大专、高中、中专。较低学历群体可能对金融风险认知不足，经济压力相对较大，更易被中介以“轻松获利”话术诱导成为背债人。",
-      "confidence": 0.55
-    },
-    {
-      "feature_value": "数据缺失关键字段（无负债总额、无具体逾期记录、无流水信息）",
-      "risk_level": "中",
-      "reason": "提供的用户数据中，缺失对判断还款能力与意愿至关重要的字段，如：现有负债总额、历史逾期详情、银行流水细节、资产证明真伪核查记录、贷款资金流向。这些数据的缺失导致无法挖掘“负债收入比畸高”、“流水造假”、“资金快进快出至关联账户”等核心背债特征，严重限制了特征挖掘的深度。",
-      "confidence": 1.0
-    }
-  ]
-}
+{mined_features}
 
 
 七、输出格式示例
@@ -110,10 +59,25 @@ class feature_matching:
 
 """
 
-    def match_features(self, state: State) -> dict:
+    def _build_prompt(self, state: State) -> str:
         # Avoid str.format interpreting JSON braces as placeholders.
-        prompt = self.prompt_template.replace("{user_data}", state["analysis_data"])
-        response = self.llm.invoke(prompt)
-        return {"response": state["response"] + "已经执行feature_matching", "feature": response.content}
-        
-    
+        prompt = self.prompt_template.replace("{mined_features}", self.registry.llm_features_json())
+        return prompt.replace("{user_data}", state["analysis_data"])
+
+    def _merge(self, state: State, llm_output: str = "") -> str:
+        """合并确定性命中的特征与 LLM 判断的特征"""
+        deterministic = self.registry.format_matches(state.get("data") or [])
+        return "\n".join(part for part in (deterministic, llm_output.strip()) if part)
+
+    def match_features(self, state: State) -> dict:
+        llm_output = ""
+        if self.registry.llm_features:
+            llm_output = self.llm.invoke(self._build_prompt(state)).content
+        return {"response": state["response"] + "已经执行feature_matching", "feature": self._merge(state, llm_output)}
+
+    async def amatch_features(self, state: State) -> dict:
+        """match_features 的异步版本，等待 HTTP 响应时不占用线程"""
+        llm_output = ""
+        if self.registry.llm_features:
+            llm_output = (await self.llm.ainvoke(self._build_prompt(state))).content
+        return {"response": state["response"] + "已经执行feature_matching", "feature": self._merge(state, llm_output)}
@@ -1,12 +1,29 @@
-from model_components.deepseek_model import DeepSeekLLM
+from model_components.deepseek_model import get_deepseek_llm
 from tool_chain.state import State
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
 import json
+import re
+import unicodedata
+
+# feature_value 中特征名与取值之间的分隔（比较符或冒号，NFKC 之后全角已转为半角）
+_FEATURE_SPLIT = re.compile(r"(>=|<=|==|!=|≥|≤|=|>|<|:)")
+# 规范化时保留的标点：影响取值含义（小数点、百分号、区间/正负号）
+_KEEP_PUNCT = set(".%-/")
 
 class feature_mining:
 
+    # 分片模式下单个提示词的 token 上限（含提示词模板本身）
+    SHARD_MAX_TOKENS = 24000
+    # 每轮并发提交的分片数 = max_concurrency * SHARD_WAVE_FACTOR，控制内存中同时存在的提示词数量
+    SHARD_WAVE_FACTOR = 4
+
+    @property
+    def llm(self):
+        """共享的 DeepSeek 客户端，首次挖掘时才创建"""
+        return get_deepseek_llm()
+
     def __init__(self):
-        deepseek_client = DeepSeekLLM()
-        self.llm = deepseek_client.llm
         self.prompt_template = """
 一、任务背景
 在银行贷款领域，职业背债人的数量在快速上升，此类群体的存在严重扰乱金融秩序，加剧银行信贷风险，对金融机构风控体系构成重大挑战。
@@ -104,11 +121,21 @@ class feature_mining:
 用户数据：{user_data}
 """
 
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """粗略估算 token 数：中文约 1 字 1 token，其余字符约 3 字符 1 token，宁多勿少"""
+        non_ascii = sum(1 for ch in text if ord(ch) > 127)
+        return non_ascii + (len(text) - non_ascii) // 3 + 1
+
+    @staticmethod
+    def format_user(index: int, record: Dict) -> str:
+        return f"用户{index + 1}: {str(record)}\n"
+
     def mine_features(self, state: State) -> dict:
         # 将 List[Dict] 转换为更易读的文本格式
       user_data_str = ""
       for i, d in enumerate(state["data"]):
-         user_data_str += f"用户{i+1}: {str(d)}\n"
+         user_data_str += self.format_user(i, d)
       prompt = self.prompt_template.format(user_data=user_data_str)
       response = self.llm.invoke(prompt)
       # 将挖掘出的特征结果存入state的new_feature字段
@@ -122,5 +149,158 @@ class feature_mining:
         
       return state
 
-
-      #return {"text": state["text"] + "feature_mining", "response": response.content}
\ No newline at end of file
+    # ---- 分片挖掘（map-reduce） ----
+
+    def iter_shards(self, records: Iterable[Dict], max_tokens: int = None) -> Iterator[Tuple[str, int]]:
+        """
+        按 token 预算把用户数据切成分片，用户编号全局连续，便于合并后仍能定位到具体用户
+        Yields:
+            (分片的用户数据文本, 分片内用户数)
+        """
+        budget = (max_tokens or self.SHARD_MAX_TOKENS) - self.estimate_tokens(self.prompt_template)
+        if budget <= 0:
+            raise ValueError("max_tokens 小于提示词模板本身的长度")
+        lines: List[str] = []
+        used = 0
+        for i, record in enumerate(records):
+            line = self.format_user(i, record)
+            cost = self.estimate_tokens(line)
+            if lines and used + cost > budget:
+                yield "".join(lines), len(lines)
+                lines, used = [], 0
+            lines.append(line)
+            used += cost
+        if lines:
+            yield "".join(lines), len(lines)
+
+    @staticmethod
+    def parse_features(content: str) -> List[Dict[str, Any]]:
+        """从模型输出中解析 mined_features，兼容 ```json 代码块包裹，解析失败返回空列表"""
+        match = re.search(r"\{.*\}", content, re.S)
+        if not match:
+            return []
+        try:
+            features = json.loads(match.group(0)).get("mined_features", [])
+        except (json.JSONDecodeError, AttributeError):
+            return []
+        return [f for f in features if isinstance(f, dict) and f.get("feature_value")]
+
+    @staticmethod
+    def _normalize_feature_text(text: str) -> str:
+        """NFKC（全角转半角）、小写，去掉空白与不影响含义的标点；比较符、小数点、百分号、正负号保留"""
+        text = unicodedata.normalize("NFKC", str(text)).lower()
+        return "".join(
+            ch for ch in text
+            if not ch.isspace() and (not unicodedata.category(ch).startswith("P") or ch in _KEEP_PUNCT)
+        )
+
+    @classmethod
+    def _feature_key(cls, feature: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        特征去重键 (特征名, 规范化取值)：
+        特征名取 feature_name 字段，没有时取 feature_value 中第一个比较符/冒号之前的部分，取值为其余部分
+        只合并书写差异（空白、全半角、大小写、无关标点），“负债>50万”与“负债<50万”、“1.5”与“15”不会被合并；
+        同义改写（“离异”与“婚姻状况=离婚”）或单位不同（“60万”与“600000”）仍视为不同特征
+        """
+        normalize = cls._normalize_feature_text
+        value = unicodedata.normalize("NFKC", str(feature["feature_value"]))
+        name = feature.get("feature_name")
+        if name:
+            return normalize(name), normalize(value)
+        parts = _FEATURE_SPLIT.split(value, maxsplit=1)
+        if len(parts) == 1:
+            return "", normalize(value)
+        # 冒号只是分隔符，比较符属于取值的一部分
+        return normalize(parts[0]), normalize(("" if parts[1] == ":" else parts[1]) + parts[2])
+
+    def merge_features(self, shard_results: List[Tuple[List[Dict[str, Any]], int]]) -> List[Dict[str, Any]]:
+        """
+        reduce：合并各分片挖掘出的特征
+        - 同一特征（_feature_key 相同：特征名与规范化取值都相同）只保留一条，理由取置信度最高的分片
+        - confidence 为报告该特征的分片按用户数加权的平均置信度
+        - support 为报告该特征的分片覆盖的用户占全部用户的比例
+        - risk_level 取按用户数加权后票数最多的等级，并列时取更高等级
+        结果按 confidence × support 降序排列
+        """
+        total_rows = sum(n for _, n in shard_results) or 1
+        level_rank = {"高": 3, "中": 2, "低": 1}
+        merged: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for features, n in shard_results:
+            seen = set()
+            for f in features:
+                key = self._feature_key(f)
+                if key in seen:
+                    continue
+                seen.add(key)
+                try:
+                    confidence = min(max(float(f.get("confidence", 0)), 0.0), 1.0)
+                except (TypeError, ValueError):
+                    confidence = 0.0
+                entry = merged.setdefault(key, {
+                    "feature": f, "best": -1.0, "weighted": 0.0, "rows": 0, "shards": 0,
+                    "levels": defaultdict(int)
+                })
+                if confidence > entry["best"]:
+                    entry["feature"], entry["best"] = f, confidence
+                entry["weighted"] += confidence * n
+                entry["rows"] += n
+                entry["shards"] += 1
+                entry["levels"][f.get("risk_level", "低")] += n
+
+        result = []
+        for entry in merged.values():
+            level = max(entry["levels"].items(), key=lambda kv: (kv[1], level_rank.get(kv[0], 0)))[0]
+            result.append({
+                "feature_value": entry["feature"]["feature_value"],
+                "risk_level": level,
+                "reason": entry["feature"].get("reason", ""),
+                "confidence": round(entry["weighted"] / entry["rows"], 4),
+                "support": round(entry["rows"] / total_rows, 4),
+                "shards": entry["shards"]
+            })
+        result.sort(key=lambda f: f["confidence"] * f["support"], reverse=True)
+        return result
+
+    def mine_features_sharded(self, records: Iterable[Dict], max_concurrency: int = 8,
+                              max_tokens: int = None) -> dict:
+        """
+        分片模式：按 token 预算切分全部用户数据，各分片并发调用大模型挖掘特征（map），
+        再合并去重并汇总置信度（reduce）。records 可以是生成器，分片按轮次提交，
+        内存中最多同时保留 max_concurrency * SHARD_WAVE_FACTOR 个分片的提示词
+        Returns:
+            {"mined_features": [...], "shards": 分片数, "failed_shards": 失败分片数, "rows": 用户数}
+        """
+        wave_size = max(1, max_concurrency * self.SHARD_WAVE_FACTOR)
+        config = {"max_concurrency": max_concurrency}
+        shard_results: List[Tuple[List[Dict[str, Any]], int]] = []
+        failed = 0
+        wave: List[Tuple[str, int]] = []
+
+        def run_wave():
+            nonlocal failed
+            prompts = [self.prompt_template.format(user_data=text) for text, _ in wave]
+            responses = self.llm.batch(prompts, config=config, return_exceptions=True)
+            for (_, n), response in zip(wave, responses):
+                if isinstance(response, Exception):
+                    # 失败分片不计入 support 的分母
+                    print(f"[特征挖掘] 分片调用失败: {response}")
+                    failed += 1
+                    continue
+                shard_results.append((self.parse_features(response.content), n))
+            print(f"[特征挖掘] 已完成 {len(shard_results) + failed} 个分片，"
+                  f"{sum(n for _, n in shard_results)} 名用户")
+            wave.clear()
+
+        for shard in self.iter_shards(records, max_tokens):
+            wave.append(shard)
+            if len(wave) >= wave_size:
+                run_wave()
+        if wave:
+            run_wave()
+
+        return {
+            "mined_features": self.merge_features(shard_results),
+            "shards": len(shard_results) + failed,
+            "failed_shards": failed,
+            "rows": sum(n for _, n in shard_results)
+        }
@@ -0,0 +1,151 @@
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from tool_chain.applicant_schema import to_frame
+from tool_chain.rule_engine import RuleCompileError, RuleEngine
+
+# 风险等级权重，用于把命中特征汇总为单一分值
+LEVEL_WEIGHTS = {"高": 3.0, "中": 2.0, "低": 1.0}
+
+# 直辖市/省会及主要城市 -> 所属省级行政区，用于“跨省”判断
+CITY_PROVINCE = {
+    "北京": "北京市", "上海": "上海市", "天津": "天津市", "重庆": "重庆市",
+    "石家庄": "河北省", "太原": "山西省", "沈阳": "辽宁省", "长春": "吉林省", "哈尔滨": "黑龙江省",
+    "南京": "江苏省", "杭州": "浙江省", "合肥": "安徽省", "福州": "福建省", "南昌": "江西省",
+    "济南": "山东省", "郑州": "河南省", "武汉": "湖北省", "长沙": "湖南省", "广州": "广东省",
+    "深圳": "广东省", "海口": "海南省", "成都": "四川省", "贵阳": "贵州省", "昆明": "云南省",
+    "西安": "陕西省", "兰州": "甘肃省", "西宁": "青海省", "呼和浩特": "内蒙古自治区",
+    "南宁": "广西壮族自治区", "拉萨": "西藏自治区", "银川": "宁夏回族自治区",
+    "乌鲁木齐": "新疆维吾尔自治区", "苏州": "江苏省", "宁波": "浙江省", "青岛": "山东省",
+    "厦门": "福建省", "大连": "辽宁省",
+}
+
+_PROVINCE = re.compile(r"^(.+?(?:省|自治区|特别行政区))")
+_MUNICIPALITY = re.compile(r"^(北京|上海|天津|重庆)")
+_CITY = re.compile(r"^(.+?)市")
+
+
+def _province_of(series: pd.Series) -> pd.Series:
+    """从地址中提取省级行政区，无法识别时为 NA"""
+    series = series.astype("string").str.strip()
+    province = series.str.extract(_PROVINCE, expand=False)
+    municipality = series.str.extract(_MUNICIPALITY, expand=False).map(CITY_PROVINCE, na_action="ignore")
+    city = series.str.extract(_CITY, expand=False).map(CITY_PROVINCE, na_action="ignore")
+    return province.fillna(municipality).fillna(city)
+
+
+def check_cross_province(df: pd.DataFrame) -> np.ndarray:
+    """户籍所在地与居住地跨省"""
+    if "户籍所在地" not in df.columns or "居住地" not in df.columns:
+        return np.zeros(len(df), dtype=bool)
+    home = _province_of(df["户籍所在地"])
+    live = _province_of(df["居住地"])
+    return (home.notna() & live.notna() & (home != live)).fillna(False).to_numpy(dtype=bool)
+
+
+# 无法用单列条件表达、但仍可向量化判断的内置检查
+BUILTIN_CHECKS: Dict[str, Callable[[pd.DataFrame], np.ndarray]] = {
+    "cross_province": check_cross_province,
+}
+
+
+class FeatureRegistry:
+    """
+    背债人特征库
+    特征定义保存在 feature_library.json；带 condition（规则引擎语法）或 check（内置检查）的特征
+    编译为列判定后对整张申请人表一次性打分，其余无法用列判定表达的特征才交给 LLM 判断
+    """
+
+    def __init__(self, library_file: Optional[str] = None):
+        if library_file is None:
+            library_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature_library.json")
+        with open(library_file, "r", encoding="utf-8") as f:
+            self.features: List[Dict[str, Any]] = json.load(f).get("mined_features", [])
+
+        self._engine = RuleEngine(rules=[])
+        self.compiled: List[Dict[str, Any]] = []  # 可向量化判定的特征
+        self.llm_features: List[Dict[str, Any]] = []  # 需交给 LLM 判断的特征
+        for feature in self.features:
+            predicate = self._compile(feature)
+            if predicate is None:
+                self.llm_features.append(feature)
+            else:
+                self.compiled.append({"feature": feature, "predicate": predicate})
+
+    def _compile(self, feature: Dict[str, Any]):
+        if feature.get("check"):
+            check = BUILTIN_CHECKS.get(feature["check"])
+            if check is None:
+                print(f"[警告] 未知的内置检查 {feature['check']}，特征交由 LLM 判断: {feature['feature_value']}")
+                return None
+            return lambda df, memo: check(df)
+        if feature.get("condition"):
+            try:
+                rule = self._engine.compile_rule({"rule_name": feature["feature_value"],
+                                                  "logic_expression": feature["condition"]})
+            except RuleCompileError as e:
+                print(f"[警告] 特征条件无法编译，交由 LLM 判断: {feature['feature_value']} - {e}")
+                return None
+            columns = rule.columns
+            return lambda df, memo: (rule.evaluate(df, memo) if all(c in df.columns for c in columns)
+                                     else np.zeros(len(df), dtype=bool))
+        return None
+
+    @staticmethod
+    def _public(feature: Dict[str, Any]) -> Dict[str, Any]:
+        """去掉 condition/check 等内部字段，保持与原特征库一致的结构"""
+        return {k: feature[k] for k in ("feature_value", "risk_level", "reason", "confidence") if k in feature}
+
+    def score(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        对整张申请人表打分
+        Returns:
+            与 df 行对齐的 DataFrame：每个可判定特征一列布尔命中，
+            feature_score 列为命中特征的 置信度×风险等级权重 之和
+        """
+        memo: Dict[str, np.ndarray] = {}
+        names = [c["feature"]["feature_value"] for c in self.compiled]
+        if not names:
+            return pd.DataFrame({"feature_score": np.zeros(len(df))}, index=df.index)
+        hits = np.column_stack([c["predicate"](df, memo) for c in self.compiled])
+        weights = np.array([
+            float(c["feature"].get("confidence", 0)) * LEVEL_WEIGHTS.get(c["feature"].get("risk_level"), 1.0)
+            for c in self.compiled
+        ])
+        result = pd.DataFrame(hits, columns=names, index=df.index)
+        result["feature_score"] = hits.astype(float) @ weights
+        return result
+
+    def match_records(self, records: List[Dict]) -> List[List[Dict[str, Any]]]:
+        """对 List[Dict] 形式的申请人数据判定，返回每个申请人命中的特征列表"""
+        if not records or not self.compiled:
+            return [[] for _ in records]
+        hits = self.score(to_frame(records)).drop(columns="feature_score").to_numpy()
+        return [
+            [self._public(c["feature"]) for c, hit in zip(self.compiled, row) if hit]
+            for row in hits
+        ]
+
+    def format_matches(self, records: List[Dict]) -> str:
+        """按 feature_matching 的输出格式渲染确定性命中结果"""
+        matched = self.match_records(records)
+        lines = []
+        for i, features in enumerate(matched):
+            prefix = f"用户{i + 1}: " if len(matched) > 1 else ""
+            for f in features:
+                lines.append(f"- {prefix}[{f['feature_value']}] | 风险等级：{f['risk_level']} | "
+                             f"原因：数据字段满足判定条件（置信度 {f['confidence']}）")
+        return "\n".join(lines)
+
+    def llm_features_json(self) -> str:
+        """只包含需 LLM 判断的特征，供 feature_matching 提示词使用"""
+        return json.dumps({"mined_features": [self._public(f) for f in self.llm_features]},
+                          ensure_ascii=False, indent=2)
+
+    def library_json(self) -> str:
+        """完整特征库，供 rule_mining 等提示词使用"""
+        return json.dumps({"mined_features": [self._public(f) for f in self.features]},
+                          ensure_ascii=False, indent=2)
@@ -1,9 +1,10 @@
 from typing import Dict, Any, List, Optional
 from core_abstract.tool_chain_component import ToolChainComponent
+from core_abstract.ttl_cache import LRUTTLCache
 
 from model_components.knowledge_graph_model import KnowledgeGraphModel
 from model_components.embedding_model import EmbeddingModel
-from knowledge_graph import KnowledgeExtractor
+from knowledge_graph.knowledge_extractor import KnowledgeExtractor
 
 
 class KnowledgeGraphComponent(ToolChainComponent):
@@ -20,9 +21,12 @@ class KnowledgeGraphComponent(ToolChainComponent):
         self.relevancy_threshold = 0.6
         self.entity_types: List[str] = []
         self.cache_enabled = True
-        self.cache_ttl = 3600
-        self._query_cache: Dict[str, Any] = {}
-        self._cache_times: Dict[str, float] = {}
+        self.cache_ttl = self.config.get("cache_ttl", 3600)
+        self._query_cache = LRUTTLCache(
+            max_entries=self.config.get("cache_max_entries", 1024),
+            max_bytes=self.config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
         self._lock = None  # 后续初始化线程锁
         
         # 加载组件特定配置
@@ -56,11 +60,11 @@ class KnowledgeGraphComponent(ToolChainComponent):
     
     def _get_cached_results(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """获取缓存的查询结果"""
-        pass
+        return self._query_cache.get(cache_key)
     
     def _set_cached_results(self, cache_key: str, results: Dict[str, Any]) -> None:
         """缓存查询结果"""
-        pass
+        self._query_cache.set(cache_key, results)
     
     def _extract_and_store_knowledge(self, context: Dict[str, Any]) -> None:
         """从上下文提取知识并存储到图谱"""
@@ -77,7 +81,6 @@ class KnowledgeGraphComponent(ToolChainComponent):
     def cleanup(self) -> None:
         """清理资源和缓存"""
         self._query_cache.clear()
-        self._cache_times.clear()
         if self.knowledge_graph_model:
             self.knowledge_graph_model.unload()
         self.initialized = False
\ No newline at end of file
@@ -1,5 +1,6 @@
 from typing import Dict, Any, List, Optional
 from core_abstract.tool_chain_component import ToolChainComponent
+from core_abstract.ttl_cache import LRUTTLCache
 
 
 
@@ -17,9 +18,12 @@ class MemorySystemComponent(ToolChainComponent):
         self.forget_threshold = 0.3
         self.importance_decay = 0.9
         self.cache_enabled = True
-        self.cache_ttl = 3600
-        self._recall_cache: Dict[str, List[Dict[str, Any]]] = {}
-        self._cache_times: Dict[str, float] = {}
+        self.cache_ttl = self.config.get("cache_ttl", 3600)
+        self._recall_cache = LRUTTLCache(
+            max_entries=self.config.get("cache_max_entries", 1024),
+            max_bytes=self.config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
         
         # 加载组件特定配置
         self._load_memory_config()
@@ -52,11 +56,11 @@ class MemorySystemComponent(ToolChainComponent):
     
     def _get_cached_memories(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
         """获取缓存的记忆"""
-        pass
+        return self._recall_cache.get(cache_key)
     
     def _set_cached_memories(self, cache_key: str, memories: List[Dict[str, Any]]) -> None:
         """缓存记忆结果"""
-        pass
+        self._recall_cache.set(cache_key, memories)
     
     def _recall_memories(self, query: str, context: Dict[str, Any]) -> List[Dict[str, Any]]:
         """召回相关记忆"""
@@ -77,5 +81,4 @@ class MemorySystemComponent(ToolChainComponent):
     def cleanup(self) -> None:
         """清理记忆缓存"""
         self._recall_cache.clear()
-        self._cache_times.clear()
         self.initialized = False
\ No newline at end of file
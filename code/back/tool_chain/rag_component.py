@@ -1,5 +1,7 @@
 from typing import Dict, Any, List, Optional
 from core_abstract.tool_chain_component import ToolChainComponent
+from core_abstract.ttl_cache import LRUTTLCache
+from model_components.reranker_model import RerankerModel
 from retrieval_strategies.retrieval_strategy import RetrievalStrategy
 
 
@@ -16,8 +18,13 @@ class RAGComponent(ToolChainComponent):
         self.max_context_length = 2000
         self.similarity_threshold = 0.7
         self._strategy: Optional[RetrievalStrategy] = None
-        self._cache: Dict[str, Any] = {}
-        self._cache_times: Dict[str, float] = {}
+        self._reranker: Optional[RerankerModel] = None
+        self.cache_ttl = self.config.get("cache_ttl", 3600)
+        self._cache = LRUTTLCache(
+            max_entries=self.config.get("cache_max_entries", 1024),
+            max_bytes=self.config.get("cache_max_bytes"),
+            ttl=self.cache_ttl
+        )
         
         # 加载组件特定配置
         self._load_rag_config()
@@ -34,6 +41,14 @@ class RAGComponent(ToolChainComponent):
     
     def initialize(self) -> None:
         """初始化RAG组件，创建检索策略实例"""
+        # 重排模型：config 中直接给出 reranker 实例，或给出 reranker_config 由组件创建（模型在首次重排时加载）
+        if self.rerank_enabled:
+            self._reranker = self.config.get("reranker")
+            if self._reranker is None and self.config.get("reranker_config") is not None:
+                self._reranker = RerankerModel(self.config["reranker_config"])
+            if self._reranker is None:
+                self._logger.warning("rerank_enabled 为 True 但未配置 reranker / reranker_config，已关闭重排")
+                self.rerank_enabled = False
         self.initialized = True
         # 后续将实现策略初始化逻辑
         pass
@@ -43,8 +58,17 @@ class RAGComponent(ToolChainComponent):
         if not self.initialized:
             raise RuntimeError("RAG组件未初始化，请先调用initialize()")
         
-        # 后续实现具体逻辑
+        # 检索结果重排（检索与生成后续实现）
+        if self.rerank_enabled and context.get("results"):
+            context["results"] = self._rerank_results(context.get("query", ""), context["results"])
         return context
+
+    def _rerank_results(self, query: str, results: List[Dict]) -> List[Dict]:
+        """按交叉编码器分数重排检索结果，截断到 reranker 的 top_k / min_score_threshold，原分数保留在 retrieval_score"""
+        by_text = {r.get("full_text") or r.get("content", ""): r for r in results}
+        reranked = self._reranker.rerank(query, list(by_text), [r.get("score", 0.0) for r in by_text.values()])
+        return [{**by_text[text], "retrieval_score": by_text[text].get("score"), "score": score}
+                for text, score in reranked]
     
     def _enhance_query_with_memories(self, query: str, memories: List[Dict]) -> str:
         """使用记忆增强查询"""
@@ -61,5 +85,6 @@ class RAGComponent(ToolChainComponent):
     def cleanup(self) -> None:
         """清理缓存和资源"""
         self._cache.clear()
-        self._cache_times.clear()
+        if self._reranker is not None:
+            self._reranker.unload()
         self.initialized = False
\ No newline at end of file
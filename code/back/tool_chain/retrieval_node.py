@@ -1,11 +1,109 @@
+import re
+import threading
+from typing import Dict, List
 from tool_chain.state import State
-from retrieval_strategies.retrieval import DataRetriever
-from retrieval_strategies.config import RAGConfig
+
+# feature_matching 输出的一行："- [用户1: ][特征] | 风险等级：高 | 原因：..."
+_FEATURE_LINE = re.compile(r"^[-*•\s]*(?:用户\d+[:：]\s*)?(?:\[(?P<name>[^\]]+)\])?(?P<rest>.*)$")
 
 class RetrievalNode:
-    def __init__(self, config):
-        self.data_retriever = DataRetriever(config)
+    """
+    规则检索节点
+    DataRetriever（连带 llama_index、嵌入模型与 Qdrant）在第一次检索时才创建，
+    构建流水线本身不加载任何检索依赖
+    匹配到的特征逐条作为独立查询，一次批量向量化 + 一次批量检索，命中的规则按规则名合并去重后重新打分；
+    配置了 reranker 时，合并后的候选再由交叉编码器按完整特征描述重排
+    """
+    def __init__(self, config=None, max_rules: int = 10, max_queries: int = 16, multi_hit_bonus: float = 0.05,
+                 reranker=None):
+        """
+        Args:
+            config: RAGConfig 实例；为 None 时首次检索才按默认集合创建
+            max_rules: 合并后最多返回的规则条数
+            max_queries: 最多拆分出的查询条数（特征过多时只取前面的）
+            multi_hit_bonus: 规则被多条特征同时检索到时的加分系数
+            reranker: RerankerModel 实例（可选），截断条数与分数阈值由其 top_k / min_score_threshold 决定
+        """
+        self._config = config
+        self.max_rules = max_rules
+        self.max_queries = max_queries
+        self.multi_hit_bonus = multi_hit_bonus
+        self.reranker = reranker
+        self._data_retriever = None
+        self._lock = threading.Lock()
+
+    @property
+    def data_retriever(self):
+        if self._data_retriever is None:
+            with self._lock:
+                if self._data_retriever is None:
+                    from retrieval_strategies.retrieval import DataRetriever
+                    if self._config is None:
+                        from retrieval_strategies.config import RAGConfig
+                        self._config = RAGConfig(collection_name="risk_rules_collection")
+                    self._data_retriever = DataRetriever(self._config)
+        return self._data_retriever
+
+    def warmup(self) -> None:
+        """提前完成检索依赖的全部初始化"""
+        self.data_retriever
+        if hasattr(self._config, "warmup"):
+            self._config.warmup()
+
+    def split_queries(self, feature_text: str) -> List[str]:
+        """把 feature_matching 的输出拆成逐条特征查询：特征名 + 原因，去掉列表符号、用户前缀和风险等级"""
+        queries, seen = [], set()
+        for line in (feature_text or "").splitlines():
+            line = line.strip()
+            if not line or line.startswith("---"):
+                continue
+            m = _FEATURE_LINE.match(line)
+            parts = [p.strip() for p in m.group("rest").split("|")]
+            parts = [re.sub(r"^原因[:：]\s*", "", p) for p in parts if p and not p.startswith("风险等级")]
+            query = "：".join(p for p in [m.group("name")] + parts if p)
+            if query and query not in seen:
+                seen.add(query)
+                queries.append(query)
+        if not queries and feature_text and feature_text.strip():
+            queries = [feature_text.strip()]
+        return queries[:self.max_queries]
+
+    def _merge(self, queries: List[str], hits_per_query: List[List[Dict]]) -> List[Dict]:
+        """
+        按规则名合并各查询的命中结果
+        分数 = 各查询中的最高相似度 + multi_hit_bonus * (命中查询数 - 1) / 查询数，
+        被多条特征同时指向的规则排在仅与单条特征相近的规则之前
+        """
+        merged: Dict[str, Dict] = {}
+        for query, hits in zip(queries, hits_per_query):
+            for hit in hits:
+                key = hit.get("rule_name") or hit.get("full_text")
+                entry = merged.get(key)
+                if entry is None:
+                    entry = merged[key] = {**hit, "max_score": hit["score"], "matched_features": []}
+                elif hit["score"] > entry["max_score"]:
+                    entry["max_score"] = hit["score"]
+                if query not in entry["matched_features"]:
+                    entry["matched_features"].append(query)
+        for entry in merged.values():
+            entry["score"] = entry["max_score"] + \
+                self.multi_hit_bonus * (len(entry["matched_features"]) - 1) / len(queries)
+        return sorted(merged.values(), key=lambda e: e["score"], reverse=True)
+
+    def _rerank(self, queries: List[str], candidates: List[Dict]) -> List[Dict]:
+        """用交叉编码器重排候选，原检索分数保留在 retrieval_score 中"""
+        by_text = {c.get("full_text") or c.get("rule_name"): c for c in candidates}
+        reranked = self.reranker.rerank("；".join(queries), list(by_text), [c["score"] for c in by_text.values()])
+        return [{**by_text[text], "retrieval_score": by_text[text]["score"], "score": score} for text, score in reranked]
 
     def retrieve_rules(self, state: State, top_k=3) -> dict:
-        results = self.data_retriever.search_rules(state["feature"], top_k=top_k)
-        return {"response": state["response"] + "已经执行retrieval_node","rule": results}
\ No newline at end of file
+        """
+        Args:
+            top_k: 每条特征查询取回的规则条数
+        """
+        queries = self.split_queries(state["feature"])
+        results = self._merge(queries, self.data_retriever.search_rules_batch(queries, top_k=top_k)) if queries else []
+        if self.reranker is not None and results:
+            results = self._rerank(queries, results)
+        results = results[:self.max_rules]
+        return {"response": state["response"] + "已经执行retrieval_node","rule": results}
@@ -1,11 +1,15 @@
-from model_components.deepseek_model import DeepSeekLLM
+from model_components.deepseek_model import get_deepseek_llm
 from tool_chain.state import State
+from tool_chain.rule_engine import format_rules_for_prompt
 
 class risk_reporting:
 
+    @property
+    def llm(self):
+        """共享的 DeepSeek 客户端，首次生成报告时才创建"""
+        return get_deepseek_llm()
+
     def __init__(self):
-        deepseek_client = DeepSeekLLM()
-        self.llm = deepseek_client.llm
         self.prompt_template = """
 一、任务背景
 在银行贷款领域，职业背债人数量呈快速上升趋势，此类群体的存在严重扰乱金融秩序，引发金融机构信贷风险，同时自身也深陷违法犯罪链条，沦为不法分子的“工具人”和“替罪羊”。
@@ -110,8 +114,17 @@ class risk_reporting:
 3.  排除项：说明用户数据中哪些特征/行为不属于背债风险，为何排除（如“用户资金转入第三方为直系亲属医疗支出，提供了医院缴费凭证，排除背债资金转移风险”）。
 """
 
+    def _build_prompt(self, state: State) -> str:
+      return self.prompt_template.format(user_data=state["analysis_data"],user_features=state["feature"],user_rules=format_rules_for_prompt(state),user_risk=state["risk"])
+
     def warn_risk(self, state: State) -> dict:
               
-      prompt = self.prompt_template.format(user_data=state["analysis_data"],user_features=state["feature"],user_rules=state["rule"],user_risk=state["risk"])
+      prompt = self._build_prompt(state)
       response = self.llm.invoke(prompt)
-      return {"response": state["response"] + "已经执行risk_reporting", "report": response.content}
\ No newline at end of file
+      return {"response": state["response"] + "已经执行risk_reporting", "report": response.content}
+
+    async def awarn_risk(self, state: State) -> dict:
+      """warn_risk 的异步版本"""
+      prompt = self._build_prompt(state)
+      response = await self.llm.ainvoke(prompt)
+      return {"response": state["response"] + "已经执行risk_reporting", "report": response.content}
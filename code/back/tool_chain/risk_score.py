@@ -1,11 +1,15 @@
-from model_components.deepseek_model import DeepSeekLLM
+from model_components.deepseek_model import get_deepseek_llm
 from tool_chain.state import State
+from tool_chain.rule_engine import format_rules_for_prompt
 import json
 class risk_score:
 
+    @property
+    def llm(self):
+        """共享的 DeepSeek 客户端，首次评分时才创建"""
+        return get_deepseek_llm()
+
     def __init__(self):
-        deepseek_client = DeepSeekLLM()
-        self.llm = deepseek_client.llm
         self.prompt_template = """
 一、任务背景
 在银行贷款领域，职业背债人的数量正快速上升，此类群体已成为扰乱金融秩序、引发金融诈骗风险的重要隐患。根据定义，职业背债人是指为获取即时经济利益，以牺牲自身信用、承担法律风险甚至刑事犯罪为代价，专门替他人有偿承担债务或配合实施骗取金融机构贷款等违法犯罪行为的群体。他们通常从一开始就没打算，也没有能力偿还所承担的债务，本质上是金融诈骗链条中的“工具人”和“替罪羊”。
@@ -74,8 +78,17 @@ class risk_score:
 ---
 """
 
+    def _build_prompt(self, state: State) -> str:
+      return self.prompt_template.format(user_data=state["analysis_data"],user_features=state["feature"],user_rules=format_rules_for_prompt(state))
+
     def assess_risk(self, state: State) -> dict:
 
-      prompt = self.prompt_template.format(user_data=state["analysis_data"],user_features=state["feature"],user_rules=state["rule"])
+      prompt = self._build_prompt(state)
       response = self.llm.invoke(prompt)
-      return {"response": state["response"] + "已经执行risk_score", "risk": response.content}
\ No newline at end of file
+      return {"response": state["response"] + "已经执行risk_score", "risk": response.content}
+
+    async def aassess_risk(self, state: State) -> dict:
+      """assess_risk 的异步版本"""
+      prompt = self._build_prompt(state)
+      response = await self.llm.ainvoke(prompt)
+      return {"response": state["response"] + "已经执行risk_score", "risk": response.content}
@@ -0,0 +1,263 @@
+import json
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import pandas as pd
+from tool_chain.applicant_schema import resolve_column, to_frame
+from tool_chain.state import State
+
+
+class RuleCompileError(ValueError):
+    """logic_expression 无法编译为确定性判定条件"""
+    pass
+
+
+# 单个条件的求值函数：输入申请人表与本次求值的条件缓存，输出逐行布尔数组
+Predicate = Callable[[pd.DataFrame, Dict[str, np.ndarray]], np.ndarray]
+
+_TOKEN = re.compile(r"\s*(\(|\)|\bAND\b|\bOR\b|\bNOT\b)\s*")
+_COMPARE = re.compile(
+    r"^(?P<field>.+?)\s*(?P<op>>=|<=|!=|==|≥|≤|=|>|<)\s*(?P<value>-?\d+(?:\.\d+)?)\s*(?P<unit>\D*)$"
+)
+_MEMBER = re.compile(r"^(?P<field>.+?)(?P<op>不包含|包含|不为|不是|为|是|属于)(?P<values>.+)$")
+_VALUE_SPLIT = re.compile(r"或|/|、|,|，|\|")
+_QUOTES = "'\"‘’“”「」"
+
+# 数值后缀 -> 倍数；未列出的后缀视为无法识别
+_UNIT_SCALE = {
+    "": 1, "个月": 1, "月": 1, "次": 1, "岁": 1, "分": 1, "元": 1, "天": 1, "人": 1, "个": 1, "家": 1,
+    "千": 1e3, "千元": 1e3, "k": 1e3, "K": 1e3, "万": 1e4, "万元": 1e4,
+}
+
+_OPS = {
+    ">=": np.greater_equal, "≥": np.greater_equal,
+    "<=": np.less_equal, "≤": np.less_equal,
+    ">": np.greater, "<": np.less,
+    "=": np.equal, "==": np.equal, "!=": np.not_equal,
+}
+
+
+class CompiledRule:
+    """编译后的规则：保留原始字段并持有可向量化求值的判定函数"""
+
+    def __init__(self, rule: Dict[str, Any], predicate: Predicate, columns: List[str]):
+        self.rule = rule
+        self.rule_name = rule.get("rule_name")
+        self.logic_expression = rule.get("logic_expression")
+        self.risk_verdict = rule.get("risk_verdict")
+        self.predicate = predicate
+        self.columns = columns
+
+    def evaluate(self, df: pd.DataFrame, memo: Optional[Dict[str, np.ndarray]] = None) -> np.ndarray:
+        return self.predicate(df, {} if memo is None else memo)
+
+
+class RuleEngine:
+    """
+    确定性规则引擎
+    将 rule.json 中的 logic_expression（如“公积金账户状态为'未缴纳'或'冻结' AND 近12个月申请贷款次数 >= 4”）
+    编译为 pandas/NumPy 向量化判定，一次遍历即可对整张申请人表求出每条规则的命中情况，全程不调用 LLM
+    """
+
+    def __init__(self, rules: Optional[List[Dict[str, Any]]] = None, rule_file: Optional[str] = None,
+                 columns: Optional[List[str]] = None):
+        """
+        Args:
+            rules: 规则列表，字段同 rule.json（rule_name/logic_expression/risk_verdict）
+            rule_file: 规则文件路径，未传 rules 时读取，默认 retrieval_strategies/rule.json
+            columns: 申请人表的列名，用于解析规则中的字段，默认使用 applicant_schema 中的列
+        """
+        if rules is None:
+            if rule_file is None:
+                base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+                rule_file = os.path.join(base_dir, "retrieval_strategies", "rule.json")
+            with open(rule_file, "r", encoding="utf-8") as f:
+                rules = json.load(f).get("rules", [])
+        self.columns = columns
+        self.compiled: List[CompiledRule] = []
+        self.skipped: List[Dict[str, Any]] = []
+        for rule in rules:
+            try:
+                self.compiled.append(self.compile_rule(rule))
+            except RuleCompileError as e:
+                self.skipped.append({"rule": rule, "reason": str(e)})
+                print(f"[警告] 规则无法编译，已跳过: {rule.get('rule_name')} - {e}")
+
+    # ---- 编译 ----
+
+    def compile_rule(self, rule: Dict[str, Any]) -> CompiledRule:
+        expression = rule.get("logic_expression") or ""
+        tokens = [t for t in _TOKEN.split(expression) if t and t.strip()]
+        if not tokens:
+            raise RuleCompileError("logic_expression 为空")
+        columns: List[str] = []
+        predicate, pos = self._parse_or(tokens, 0, columns)
+        if pos != len(tokens):
+            raise RuleCompileError(f"表达式存在多余内容: {' '.join(tokens[pos:])}")
+        return CompiledRule(rule, predicate, columns)
+
+    def _parse_or(self, tokens: List[str], pos: int, columns: List[str]):
+        left, pos = self._parse_and(tokens, pos, columns)
+        parts = [left]
+        while pos < len(tokens) and tokens[pos] == "OR":
+            right, pos = self._parse_and(tokens, pos + 1, columns)
+            parts.append(right)
+        if len(parts) == 1:
+            return left, pos
+        return (lambda df, memo: np.logical_or.reduce([p(df, memo) for p in parts])), pos
+
+    def _parse_and(self, tokens: List[str], pos: int, columns: List[str]):
+        left, pos = self._parse_atom(tokens, pos, columns)
+        parts = [left]
+        while pos < len(tokens) and tokens[pos] == "AND":
+            right, pos = self._parse_atom(tokens, pos + 1, columns)
+            parts.append(right)
+        if len(parts) == 1:
+            return left, pos
+        return (lambda df, memo: np.logical_and.reduce([p(df, memo) for p in parts])), pos
+
+    def _parse_atom(self, tokens: List[str], pos: int, columns: List[str]):
+        if pos >= len(tokens):
+            raise RuleCompileError("表达式不完整")
+        token = tokens[pos]
+        if token == "NOT":
+            inner, pos = self._parse_atom(tokens, pos + 1, columns)
+            return (lambda df, memo: ~inner(df, memo)), pos
+        if token == "(":
+            inner, pos = self._parse_or(tokens, pos + 1, columns)
+            if pos >= len(tokens) or tokens[pos] != ")":
+                raise RuleCompileError("括号不匹配")
+            return inner, pos + 1
+        if token in (")", "AND", "OR"):
+            raise RuleCompileError(f"意外的符号: {token}")
+        return self.compile_condition(token.strip(), columns), pos + 1
+
+    def compile_condition(self, text: str, columns: Optional[List[str]] = None) -> Predicate:
+        """编译单个条件，如“近12个月申请贷款次数 >= 4”、“学历为高中/中专”或“单位名称包含店/工作室”"""
+        m = _COMPARE.match(text)
+        if m:
+            col = self._resolve(m.group("field"), text)
+            op = _OPS[m.group("op")]
+            value = float(m.group("value"))
+            unit = m.group("unit").strip()
+            if unit == "年" and col.endswith("（月）"):
+                value *= 12
+            elif unit in _UNIT_SCALE:
+                value *= _UNIT_SCALE[unit]
+            else:
+                raise RuleCompileError(f"条件“{text}”中的单位“{unit}”无法识别")
+
+            def compare(df: pd.DataFrame, memo: Dict[str, np.ndarray]) -> np.ndarray:
+                if text not in memo:
+                    numeric = self._numeric(df, col, memo)
+                    with np.errstate(invalid="ignore"):
+                        memo[text] = op(numeric, value) & ~np.isnan(numeric)
+                return memo[text]
+        else:
+            m = _MEMBER.match(text)
+            if not m:
+                raise RuleCompileError(f"无法识别的条件: {text}")
+            col = self._resolve(m.group("field"), text)
+            values = [v.strip().strip(_QUOTES).strip() for v in _VALUE_SPLIT.split(m.group("values"))]
+            values = [v for v in values if v]
+            if not values:
+                raise RuleCompileError(f"条件缺少取值: {text}")
+            negate = m.group("op") in ("不为", "不是", "不包含")
+            contains = m.group("op") in ("包含", "不包含")
+            pattern = "|".join(re.escape(v) for v in values)
+
+            def compare(df: pd.DataFrame, memo: Dict[str, np.ndarray]) -> np.ndarray:
+                if text not in memo:
+                    series = df[col].astype("string").str.strip()
+                    if contains:
+                        hit = series.str.contains(pattern, regex=True)
+                    else:
+                        hit = series.isin(values)
+                    hit = hit.fillna(False).to_numpy(dtype=bool)
+                    memo[text] = ~hit if negate else hit
+                return memo[text]
+
+        if columns is not None and col not in columns:
+            columns.append(col)
+        return compare
+
+    def _resolve(self, field: str, text: str) -> str:
+        col = resolve_column(field, self.columns)
+        if col is None:
+            raise RuleCompileError(f"条件“{text}”中的字段“{field}”不在申请人表中")
+        return col
+
+    @staticmethod
+    def _numeric(df: pd.DataFrame, col: str, memo: Dict[str, np.ndarray]) -> np.ndarray:
+        """数值列只转换一次，供本次求值内所有条件复用"""
+        key = f"__numeric__:{col}"
+        if key not in memo:
+            memo[key] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+        return memo[key]
+
+    # ---- 求值 ----
+
+    def evaluate(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        对整张申请人表求值
+        Returns:
+            布尔 DataFrame，行与 df 对齐，每列对应一条规则（列名为 rule_name）
+        """
+        memo: Dict[str, np.ndarray] = {}
+        hits = {}
+        for rule in self.compiled:
+            missing = [c for c in rule.columns if c not in df.columns]
+            if missing:
+                hits[rule.rule_name] = np.zeros(len(df), dtype=bool)
+                continue
+            hits[rule.rule_name] = rule.evaluate(df, memo)
+        return pd.DataFrame(hits, index=df.index)
+
+    def match_records(self, records: List[Dict]) -> List[List[Dict[str, Any]]]:
+        """对 List[Dict] 形式的申请人数据求值，返回每个申请人命中的规则列表"""
+        if not records:
+            return []
+        hits = self.evaluate(to_frame(records)).to_numpy()
+        return [
+            [
+                {"rule_name": r.rule_name, "logic_expression": r.logic_expression, "risk_verdict": r.risk_verdict}
+                for r, hit in zip(self.compiled, row) if hit
+            ]
+            for row in hits
+        ]
+
+    def match_rules(self, state: State) -> dict:
+        """流水线节点：确定性规则匹配，结果写入 rule_matching"""
+        matched = self.match_records(state.get("data") or [])
+        lines = []
+        for i, rules in enumerate(matched):
+            prefix = f"用户{i + 1}: " if len(matched) > 1 else ""
+            for r in rules:
+                lines.append(f"- {prefix}[{r['rule_name']}] | 判定：{r['risk_verdict']} | 条件：{r['logic_expression']}")
+        rule_matching = "\n".join(lines) if lines else "未命中任何确定性规则"
+        return {"response": state["response"] + "已经执行rule_engine", "rule_matching": rule_matching}
+
+
+def split_conjuncts(expression: str) -> List[str]:
+    """按最外层的 AND 拆分表达式，如“A AND (B OR C)” -> ["A", "(B OR C)"]"""
+    parts: List[List[str]] = [[]]
+    depth = 0
+    for token in (t for t in _TOKEN.split(expression or "") if t and t.strip()):
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        if token == "AND" and depth == 0:
+            parts.append([])
+        else:
+            parts[-1].append(token.strip())
+    return [" ".join(p).replace("( ", "(").replace(" )", ")") for p in parts if p]
+
+
+def format_rules_for_prompt(state: State) -> str:
+    """拼接检索到的规则与规则引擎的确定性命中结果，供评分/报告节点写入提示词"""
+    rules = state.get("rule", "")
+    if state.get("rule_matching"):
+        return f"{rules}\n\n【规则引擎确定性命中】\n{state['rule_matching']}"
+    return rules